@@ -0,0 +1,236 @@
+#!/usr/bin/env python3
+"""
+Code Eval Reviewer - Batch Review Runner
+
+Usage:
+    python3 batch_review.py <problems-root | manifest.txt> [--workers N] [--docker-workers N] [--skip-docker] [--summary FILE] [--results FILE]
+"""
+
+import argparse
+import json
+import multiprocessing
+import os
+import time
+from concurrent.futures import FIRST_COMPLETED, ProcessPoolExecutor, ThreadPoolExecutor, wait
+from concurrent.futures.process import BrokenProcessPool
+from pathlib import Path
+from typing import Dict, List, Optional
+
+import result_cache
+import review_schema
+from review_problem import (
+    add_cache_arguments,
+    add_docker_arguments,
+    add_similarity_arguments,
+    analyze_problem,
+    analyze_solution,
+    analyze_tests,
+    assemble_review,
+    docker_options_from_args,
+    load_submission,
+    problem_cache_key,
+    run_io_stages,
+    save_review_state,
+    similarity_gate,
+    similarity_index_from_args,
+    similarity_reject,
+    write_result,
+)
+
+
+def discover_problem_dirs(source: Path) -> List[Path]:
+    if source.is_file():
+        dirs = []
+        for line in source.read_text(encoding="utf-8").splitlines():
+            line = line.strip()
+            if not line or line.startswith("#"):
+                continue
+            path = Path(line)
+            if not path.is_absolute():
+                path = source.parent / path
+            dirs.append(path.resolve())
+        return dirs
+    return sorted(p.resolve() for p in source.iterdir() if p.is_dir() and not p.name.startswith("."))
+
+
+def new_cpu_pool(workers: int) -> ProcessPoolExecutor:
+    # Docker/Git stages run on threads in this process; forking while they are alive is unsafe.
+    return ProcessPoolExecutor(max_workers=workers, mp_context=multiprocessing.get_context("spawn"))
+
+
+def run_batch(problem_dirs: List[Path], workers: int, docker_workers: int, skip_docker: bool, output_name: str, docker_options: Dict, use_cache: bool = True, index_path: Optional[Path] = None, results_path: Optional[Path] = None, write_json: bool = True) -> List[Dict]:
+    """Review every problem directory; each finished result is also appended to results_path as
+    one NDJSON line, in completion order."""
+    entries = [
+        {"problem_dir": str(d), "status": "pending", "decision": None, "quality_score": None, "error": None, "elapsed_seconds": None}
+        for d in problem_dirs
+    ]
+    states: Dict[int, Dict] = {}
+    started: Dict[int, float] = {}
+    pending: Dict = {}
+    retried = set()
+    results_file = results_path.open("w", encoding="utf-8") if results_path else None
+
+    def elapsed(idx: int) -> Dict[str, float]:
+        return {"total": round(time.monotonic() - started[idx], 3)}
+
+    def finish(idx: int, review: Dict) -> None:
+        # Serialized first: a result that fails its schema check writes nothing.
+        line = review_schema.dumps(review["result"])
+        output_path = problem_dirs[idx] / output_name
+        output_path.write_text(review["text"], encoding="utf-8")
+        if write_json:
+            write_result(output_path, review)
+        if results_file:
+            results_file.write(line + "\n")
+            results_file.flush()
+        entries[idx].update(status="done", decision=review["decision"], quality_score=review["quality_score"])
+        entries[idx]["elapsed_seconds"] = round(time.monotonic() - started[idx], 3)
+        print(f"[{entries[idx]['decision']}] {problem_dirs[idx]}")
+
+    def fail(idx: int, error: BaseException) -> None:
+        entries[idx].update(status="error", error=f"{type(error).__name__}: {error}")
+        entries[idx]["elapsed_seconds"] = round(time.monotonic() - started[idx], 3)
+        print(f"[Error] {problem_dirs[idx]}: {entries[idx]['error']}")
+
+    cpu_pool = new_cpu_pool(workers)
+    io_pool = ThreadPoolExecutor(max_workers=docker_workers)
+
+    def submit_cpu(idx: int, stage: str, fn, *args) -> None:
+        pending[cpu_pool.submit(fn, *args)] = (idx, stage, fn, args, cpu_pool)
+
+    def submit_io(idx: int, stage: str, fn, *args) -> None:
+        pending[io_pool.submit(fn, *args)] = (idx, stage, fn, args, io_pool)
+
+    try:
+        for idx, problem_dir in enumerate(problem_dirs):
+            started[idx] = time.monotonic()
+            try:
+                submission = load_submission(problem_dir)
+            except Exception as e:
+                fail(idx, e)
+                continue
+            states[idx] = {"submission": submission}
+            submit_cpu(idx, "similarity", similarity_gate, submission, index_path, use_cache)
+
+        while pending:
+            done, _ = wait(pending, return_when=FIRST_COMPLETED)
+            for future in done:
+                idx, stage, fn, args, pool = pending.pop(future)
+                if entries[idx]["status"] != "pending":
+                    continue
+                try:
+                    result = future.result()
+                except BrokenProcessPool as e:
+                    # A worker died (OOM, segfault). Give each affected stage one retry on a fresh pool.
+                    if (idx, stage) in retried:
+                        fail(idx, e)
+                        continue
+                    retried.add((idx, stage))
+                    # Every future of the broken pool raises this; only the first replaces it.
+                    if pool is cpu_pool:
+                        cpu_pool.shutdown(wait=False, cancel_futures=True)
+                        cpu_pool = new_cpu_pool(workers)
+                    submit_cpu(idx, stage, fn, *args)
+                    continue
+                except Exception as e:
+                    fail(idx, e)
+                    continue
+
+                state = states[idx]
+                submission = state["submission"]
+                state[stage] = result
+                try:
+                    if stage == "similarity":
+                        detected, reports, _ = result
+                        if detected:
+                            save_review_state(submission, result, index_path, None, docker_options)
+                            finish(idx, similarity_reject(submission, reports, elapsed(idx)))
+                            continue
+                        submit_io(idx, "io", run_io_stages, submission, skip_docker, docker_options, use_cache)
+                        # Cache lookups and stores stay in this process so the stats cover the whole batch.
+                        state["problem_key"] = problem_cache_key(submission["main_desc"])
+                        cached = result_cache.get("analyze_problem", state["problem_key"]) if use_cache else None
+                        if cached is not None:
+                            state["problem"] = cached
+                        else:
+                            submit_cpu(idx, "problem", analyze_problem, submission["main_desc"])
+                    elif stage == "problem":
+                        result_cache.put("analyze_problem", state["problem_key"], result)
+                    elif stage == "io":
+                        _, docker_results = result
+                        slim_results = {k: v for k, v in docker_results.items() if k != "logs"}
+                        submit_cpu(idx, "tests", analyze_tests, submission["test_patch"], submission["main_desc"], None, slim_results)
+                        submit_cpu(idx, "solution", analyze_solution, submission["solution_patch"], slim_results)
+
+                    if all(k in state for k in ("io", "problem", "tests", "solution")):
+                        repo_validation, docker_results = state["io"]
+                        review = assemble_review(submission, repo_validation, docker_results, state["problem"], state["tests"], state["solution"], state["similarity"], elapsed(idx))
+                        save_review_state(submission, state["similarity"], index_path, docker_results, docker_options)
+                        finish(idx, review)
+                        del states[idx]
+                except Exception as e:
+                    fail(idx, e)
+    finally:
+        io_pool.shutdown(wait=True)
+        cpu_pool.shutdown(wait=True)
+        if results_file:
+            results_file.close()
+
+    return entries
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Batch Code Eval Problem Reviewer")
+    parser.add_argument("source", help="Directory of problem directories, or a manifest file listing one problem directory per line")
+    parser.add_argument("--workers", type=int, default=os.cpu_count() or 1, help="Processes for static analysis")
+    parser.add_argument("--docker-workers", type=int, default=2, help="Concurrent GitHub/Git/Docker stages")
+    parser.add_argument("--skip-docker", action="store_true", help="Skip Docker verification")
+    parser.add_argument("--output", default="feedback.md", help="Output file name written in each problem directory")
+    parser.add_argument("--summary", help="Combined summary path (default: batch-summary.json next to the source)")
+    parser.add_argument("--results", help="NDJSON file of every review's full result (default: batch-results.ndjson next to the source)")
+    parser.add_argument("--no-json", action="store_true", help="Do not write each review's result as JSON next to its feedback file")
+    add_docker_arguments(parser)
+    add_cache_arguments(parser)
+    add_similarity_arguments(parser)
+    args = parser.parse_args()
+
+    source = Path(args.source).resolve()
+    if not source.exists():
+        print(f"Error: Source not found: {source}")
+        raise SystemExit(1)
+
+    problem_dirs = discover_problem_dirs(source)
+    if not problem_dirs:
+        print(f"Error: No problem directories found in {source}")
+        raise SystemExit(1)
+
+    output_root = source if source.is_dir() else source.parent
+    results_path = Path(args.results) if args.results else output_root / "batch-results.ndjson"
+    started = time.monotonic()
+    entries = run_batch(problem_dirs, max(1, args.workers), max(1, args.docker_workers), args.skip_docker, args.output, docker_options_from_args(args), not args.no_cache, similarity_index_from_args(args), results_path, not args.no_json)
+    elapsed = time.monotonic() - started
+
+    counts: Dict[str, int] = {}
+    for entry in entries:
+        key = entry["decision"] or "Error"
+        counts[key] = counts.get(key, 0) + 1
+
+    summary_path = Path(args.summary) if args.summary else output_root / "batch-summary.json"
+    summary = {
+        "total": len(entries),
+        "elapsed_seconds": round(elapsed, 3),
+        "counts": counts,
+        "cache": result_cache.stats(),
+        "reviews": entries,
+    }
+    summary_path.write_text(json.dumps(summary, indent=2), encoding="utf-8")
+    print(", ".join(f"{k}: {v}" for k, v in sorted(counts.items())))
+    print(f"Summary written to: {summary_path}")
+    print(f"Results written to: {results_path}")
+    if args.cache_stats:
+        print("\n".join(result_cache.format_stats(summary["cache"])))
+
+
+if __name__ == "__main__":
+    main()
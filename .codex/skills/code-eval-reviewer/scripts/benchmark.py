@@ -0,0 +1,330 @@
+#!/usr/bin/env python3
+"""
+Code Eval Reviewer - Analyzer Benchmark
+
+Generates synthetic problem directories and times each analyzer separately. Runs offline:
+Docker is skipped and GitHub is answered by a stub transport.
+
+Usage:
+    python3 benchmark.py [--sizes 1K,100K,1M,10M,50M] [--repeat N] [--corpus DIR]
+        [--baseline FILE] [--save-baseline FILE] [--tolerance PCT] [--output FILE]
+"""
+
+import argparse
+import json
+import math
+import os
+import platform
+import random
+import shutil
+import statistics
+import sys
+import tempfile
+import time
+import tracemalloc
+from datetime import datetime, timezone
+from pathlib import Path
+from typing import Callable, Dict, List, Tuple
+
+import github_client
+import text_engine
+from review_problem import (
+    analyze_problem,
+    analyze_solution,
+    analyze_tests,
+    detect_similarity,
+    diff_stats,
+    load_submission,
+    review_submission,
+    run_docker_verification,
+)
+
+CORPUS_VERSION = 2
+BASELINE_VERSION = 1
+DEFAULT_SIZES = "1K,100K,1M,10M,50M"
+# Description length and "Similar Problems" entries grow with the patch size, so the
+# larger cases also stress the text analyzers. A case uses the tier of the first limit
+# its patch size fits under.
+TIER_LIMITS = [1024, 100 * 1024, 1024 * 1024, 10 * 1024 * 1024]
+DESC_WORDS = [150, 600, 2500, 10000, 20000]
+SIMILAR_ENTRIES = [2, 10, 50, 200, 500]
+TESTS_PER_FILE = 200
+MIN_SAMPLE_SECONDS = 0.2
+
+VERBS = ["return", "raise", "accept", "reject", "preserve", "emit", "parse", "validate", "merge", "sort", "cache", "retry"]
+NOUNS = ["config", "payload", "token", "record", "schema", "window", "buffer", "request", "header", "segment", "index", "batch"]
+QUALIFIERS = ["empty", "duplicate", "nested", "unicode", "negative", "expired", "partial", "ordered", "missing", "oversized"]
+
+
+def parse_size(text: str) -> int:
+    text = text.strip().upper()
+    units = {"K": 1024, "M": 1024 * 1024, "G": 1024 * 1024 * 1024}
+    if text and text[-1] in units:
+        return int(float(text[:-1]) * units[text[-1]])
+    return int(text)
+
+
+def identifier(rng: random.Random) -> str:
+    return f"{rng.choice(VERBS)}_{rng.choice(NOUNS)}"
+
+
+def make_description(rng: random.Random, words: int, similar: int) -> str:
+    lines = ["# Task", "", "Background: the service needs stricter input handling.", "", "## Requirements", ""]
+    count = 0
+    while count < words:
+        sentence = (
+            f"- `{identifier(rng)}` must {rng.choice(VERBS)} the {rng.choice(QUALIFIERS)} "
+            f"{rng.choice(NOUNS)} and should {rng.choice(VERBS)} each {rng.choice(NOUNS)} in order."
+        )
+        lines.append(sentence)
+        count += len(sentence.split())
+    lines += ["", "## Similar Problems"]
+    for i in range(similar):
+        # Each entry uses its own vocabulary so detect_similarity has to score all of them.
+        lines.append(f"- Problem {i}: " + " ".join(f"term{i}x{j}" for j in range(12)))
+    return "\n".join(lines) + "\n"
+
+
+def patch_header(path: str) -> str:
+    return f"diff --git a/{path} b/{path}\n--- a/{path}\n+++ b/{path}\n"
+
+
+def modified_hunk(rng: random.Random, start: int, added: List[str]) -> str:
+    old = [f"    value = {rng.randint(0, 999)}", "    return value"]
+    body = [f" def {identifier(rng)}_{start}():"] + [f"-{line}" for line in old] + [f"+{line}" for line in added] + [" "]
+    return f"@@ -{start},{len(old) + 2} +{start},{len(added) + 2} @@\n" + "\n".join(body) + "\n"
+
+
+def test_function(rng: random.Random, n: int) -> List[str]:
+    name = f"test_{identifier(rng)}_{rng.choice(QUALIFIERS)}_{n}"
+    return [
+        f"def {name}():",
+        f"    result = {identifier(rng)}({rng.randint(0, 99)})",
+        f"    assert result == {rng.randint(0, 99)}",
+        f"    assert result is not None",
+        "",
+    ]
+
+
+def code_block(rng: random.Random, n: int) -> List[str]:
+    name = identifier(rng)
+    return [
+        f"def {name}_{n}(value):",
+        f"    # {rng.choice(VERBS)} the {rng.choice(NOUNS)}",
+        f"    if value is None:",
+        f"        raise ValueError('{rng.choice(QUALIFIERS)} {rng.choice(NOUNS)}')",
+        f"    return value + {rng.randint(0, 999)}",
+        "",
+    ]
+
+
+def write_patch(path: Path, rng: random.Random, size: int, block: Callable[[random.Random, int], List[str]], prefix: str, per_file: int) -> None:
+    written = 0
+    n = 0
+    file_no = 0
+    with open(path, "w", encoding="utf-8", newline="\n") as fh:
+        while written < size:
+            file_path = f"{prefix}/module_{file_no}.py"
+            lines: List[str] = []
+            for _ in range(per_file):
+                lines.extend(block(rng, n))
+                n += 1
+            added = "".join(f"+{line}\n" for line in lines)
+            chunk = patch_header(file_path) + modified_hunk(rng, 10, lines[:4]) + f"@@ -40,0 +42,{len(lines)} @@\n" + added
+            fh.write(chunk)
+            written += len(chunk)
+            file_no += 1
+
+
+def stub_transport(method: str, url: str, headers: Dict[str, str]) -> Tuple[int, Dict[str, str], bytes]:
+    if "/search/" in url:
+        body = {"total_count": 0, "items": []}
+    else:
+        body = {
+            "stargazers_count": 5000,
+            "language": "Python",
+            "license": {"spdx_id": "MIT"},
+            "pushed_at": datetime.now(timezone.utc).strftime("%Y-%m-%dT%H:%M:%SZ"),
+        }
+    return 200, {"etag": '"benchmark"', "x-ratelimit-remaining": "5000"}, json.dumps(body).encode("utf-8")
+
+
+def build_corpus(root: Path, sizes: List[int], seed: int) -> List[Path]:
+    manifest_path = root / "corpus.json"
+    manifest = {"version": CORPUS_VERSION, "sizes": sizes, "seed": seed}
+    case_dirs = [root / f"case-{i}-{size}" for i, size in enumerate(sizes)]
+    try:
+        if json.loads(manifest_path.read_text(encoding="utf-8")) == manifest:
+            return case_dirs
+    except (OSError, ValueError):
+        pass
+
+    root.mkdir(parents=True, exist_ok=True)
+    for size, case_dir in zip(sizes, case_dirs):
+        shutil.rmtree(case_dir, ignore_errors=True)
+        case_dir.mkdir()
+        rng = random.Random(f"{seed}:{size}")
+        tier = next((t for t, limit in enumerate(TIER_LIMITS) if size <= limit), len(TIER_LIMITS))
+        (case_dir / "setup.sh").write_text(
+            "REPO_URL=https://github.com/bench/synthetic\nCOMMIT=0123456789abcdef0123456789abcdef01234567\n",
+            encoding="utf-8",
+        )
+        (case_dir / "Problem-Description.txt").write_text(make_description(rng, DESC_WORDS[tier], SIMILAR_ENTRIES[tier]), encoding="utf-8")
+        write_patch(case_dir / "test.patch", rng, size, test_function, "tests", TESTS_PER_FILE)
+        write_patch(case_dir / "solution.patch", rng, size, code_block, "src", TESTS_PER_FILE)
+    manifest_path.write_text(json.dumps(manifest), encoding="utf-8")
+    return case_dirs
+
+
+def clear_caches() -> None:
+    # Repeats must not be answered from the per-text caches.
+    text_engine.document.cache_clear()
+    text_engine.token_profile.cache_clear()
+
+
+def measure(fn: Callable[[], object], repeat: int) -> Dict:
+    def sample(loops: int) -> float:
+        started = time.perf_counter()
+        for _ in range(loops):
+            clear_caches()
+            fn()
+        return (time.perf_counter() - started) / loops
+
+    # Fast benchmarks are looped until a sample takes MIN_SAMPLE_SECONDS, so that
+    # millisecond timings are not dominated by timer and scheduler noise.
+    first = sample(1)
+    loops = max(1, math.ceil(MIN_SAMPLE_SECONDS / first)) if first > 0 else 1
+    timings = [sample(loops) for _ in range(repeat)]
+    # One extra run under tracemalloc for peak allocation; it is not part of the timings.
+    clear_caches()
+    tracemalloc.start()
+    try:
+        fn()
+        _, peak = tracemalloc.get_traced_memory()
+    finally:
+        tracemalloc.stop()
+    return {"median": statistics.median(timings), "min": min(timings), "loops": loops, "peak_alloc_bytes": peak}
+
+
+def benchmark_case(case_dir: Path, repeat: int) -> Dict[str, Dict]:
+    submission = load_submission(case_dir)
+    docker_results = run_docker_verification(case_dir, submission["repo_url"], submission["commit_hash"], skip_docker=True)
+    desc_bytes = len(submission["main_desc"].encode("utf-8"))
+    test_bytes = submission["test_patch"].stat().st_size
+    solution_bytes = submission["solution_patch"].stat().st_size
+    similar_bytes = desc_bytes + sum(len(t.encode("utf-8")) for t in submission["extra_descs"])
+
+    benches = {
+        "analyze_problem": (lambda: analyze_problem(submission["main_desc"]), desc_bytes),
+        "analyze_tests": (lambda: analyze_tests(submission["test_patch"], submission["main_desc"], None, docker_results), test_bytes),
+        "analyze_solution": (lambda: analyze_solution(submission["solution_patch"], docker_results), solution_bytes),
+        "diff_stats": (lambda: diff_stats(submission["solution_patch"]), solution_bytes),
+        "detect_similarity": (lambda: detect_similarity(submission["main_desc"], submission["extra_descs"]), similar_bytes),
+        "review_submission": (
+            lambda: review_submission(submission, skip_docker=True, use_cache=False),
+            desc_bytes + test_bytes + solution_bytes,
+        ),
+    }
+    results = {}
+    for name, (fn, size) in benches.items():
+        result = measure(fn, repeat)
+        result["bytes"] = size
+        result["mb_per_s"] = size / (1024 * 1024) / result["median"] if result["median"] else 0.0
+        results[name] = result
+    return results
+
+
+def compare(results: Dict[str, Dict], baseline: Dict[str, Dict], tolerance: float) -> List[str]:
+    # Best-of-N times are compared: noise only ever makes a run slower.
+    regressions = []
+    for key, result in results.items():
+        base = baseline.get(key)
+        if not base or not base.get("min"):
+            continue
+        ratio = result["min"] / base["min"]
+        result["baseline_ratio"] = ratio
+        if ratio > 1 + tolerance / 100:
+            regressions.append(f"{key}: {ratio:.2f}x baseline ({base['min'] * 1000:.2f} ms -> {result['min'] * 1000:.2f} ms)")
+    return regressions
+
+
+def format_table(results: Dict[str, Dict]) -> List[str]:
+    lines = [f"{'case/benchmark':<40} {'bytes':>11} {'median ms':>10} {'min ms':>10} {'MB/s':>9} {'peak MB':>8} {'vs base':>8}"]
+    for key, r in results.items():
+        ratio = f"{r['baseline_ratio']:.2f}x" if "baseline_ratio" in r else "-"
+        lines.append(
+            f"{key:<40} {r['bytes']:>11} {r['median'] * 1000:>10.2f} {r['min'] * 1000:>10.2f} {r['mb_per_s']:>9.2f} "
+            f"{r['peak_alloc_bytes'] / (1024 * 1024):>8.2f} {ratio:>8}"
+        )
+    return lines
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark the review analyzers on a synthetic corpus")
+    parser.add_argument("--sizes", default=DEFAULT_SIZES, help="Comma-separated patch sizes, e.g. 1K,1M,50M")
+    parser.add_argument("--repeat", type=int, default=3, help="Timed runs per benchmark (the median is reported)")
+    parser.add_argument("--seed", type=int, default=1, help="Corpus generator seed")
+    parser.add_argument("--corpus", help="Keep the generated corpus in this directory and reuse it on later runs")
+    parser.add_argument("--baseline", help="Compare against a baseline written by --save-baseline")
+    parser.add_argument("--save-baseline", help="Write these results as a baseline file")
+    parser.add_argument("--tolerance", type=float, default=20.0, help="Slowdown over the baseline, in percent, that counts as a regression")
+    parser.add_argument("--output", help="Also write the full results as JSON")
+    args = parser.parse_args()
+
+    try:
+        sizes = [parse_size(s) for s in args.sizes.split(",") if s.strip()]
+    except ValueError:
+        print(f"Error: Invalid --sizes: {args.sizes}")
+        raise SystemExit(1)
+    repeat = max(1, args.repeat)
+
+    work_dir = Path(tempfile.mkdtemp(prefix="review_bench_"))
+    # Keep the user's result and GitHub caches out of the measurements.
+    os.environ["CODE_EVAL_CACHE_DIR"] = str(work_dir / "cache")
+    github_client.configure(base_url="https://github.invalid", transport=stub_transport, sleep=lambda _: None)
+    try:
+        corpus_root = Path(args.corpus).resolve() if args.corpus else work_dir / "corpus"
+        started = time.monotonic()
+        case_dirs = build_corpus(corpus_root, sizes, args.seed)
+        print(f"Corpus ready in {time.monotonic() - started:.1f}s: {corpus_root}", file=sys.stderr)
+
+        results: Dict[str, Dict] = {}
+        for case_dir in case_dirs:
+            for name, result in benchmark_case(case_dir, repeat).items():
+                results[f"{case_dir.name}/{name}"] = result
+            print(f"Finished {case_dir.name}", file=sys.stderr)
+    finally:
+        shutil.rmtree(work_dir, ignore_errors=True)
+
+    regressions: List[str] = []
+    if args.baseline:
+        try:
+            baseline = json.loads(Path(args.baseline).read_text(encoding="utf-8"))
+        except (OSError, ValueError) as e:
+            print(f"Error: Could not read baseline: {e}")
+            raise SystemExit(1)
+        if baseline.get("version") != BASELINE_VERSION or baseline.get("corpus") != {"sizes": sizes, "seed": args.seed}:
+            print("Warning: baseline was recorded with a different corpus; comparing matching cases only", file=sys.stderr)
+        regressions = compare(results, baseline.get("results", {}), args.tolerance)
+
+    print("\n".join(format_table(results)))
+    report = {
+        "version": BASELINE_VERSION,
+        "created": time.time(),
+        "python": platform.python_version(),
+        "platform": platform.platform(),
+        "corpus": {"sizes": sizes, "seed": args.seed},
+        "repeat": repeat,
+        "results": results,
+    }
+    for path in filter(None, [args.output, args.save_baseline]):
+        Path(path).write_text(json.dumps(report, indent=2), encoding="utf-8")
+        print(f"Results written to: {path}")
+    if regressions:
+        print(f"\nRegressions over {args.tolerance:g}%:")
+        print("\n".join(f"- {r}" for r in regressions))
+        raise SystemExit(1)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,28 @@
+import fcntl
+import os
+from contextlib import contextmanager
+from pathlib import Path
+
+
+def cache_root() -> Path:
+    root = os.environ.get("CODE_EVAL_CACHE_DIR")
+    return Path(root) if root else Path.home() / ".cache" / "code-eval-reviewer"
+
+
+def cache_dir(name: str) -> Path:
+    path = cache_root() / name
+    path.mkdir(parents=True, exist_ok=True)
+    return path
+
+
+@contextmanager
+def file_lock(path: Path, shared: bool = False, blocking: bool = True):
+    flags = fcntl.LOCK_SH if shared else fcntl.LOCK_EX
+    if not blocking:
+        flags |= fcntl.LOCK_NB
+    with open(path, "a+") as fh:
+        fcntl.flock(fh, flags)
+        try:
+            yield
+        finally:
+            fcntl.flock(fh, fcntl.LOCK_UN)
@@ -0,0 +1,156 @@
+import hashlib
+import json
+import os
+import re
+import shutil
+import tempfile
+import time
+from contextlib import contextmanager
+from pathlib import Path
+from typing import Dict, List, Optional, Tuple
+
+from cache_dirs import cache_dir, file_lock
+import timing_history
+import tracing
+from commands import run_command
+
+MIRROR_BUDGET_BYTES = int(os.environ.get("CODE_EVAL_MIRROR_BUDGET_MB", "20480")) * 1024 * 1024
+
+
+def git(args: List[str], cwd: Optional[Path] = None, timeout: int = 300) -> Tuple[int, str, str]:
+    return run_command(["git"] + args, cwd=str(cwd) if cwd else None, timeout=timeout)
+
+
+def timed_git(repo_url: str, phase: str, args: List[str], cwd: Optional[Path] = None) -> Tuple[int, str, Optional[int]]:
+    """Run a network git command under the repo's learned time limit and record how long it took.
+
+    Returns (exit code, stderr, the limit in seconds if it was hit, else None).
+    """
+    seconds = timing_history.limit(repo_url, phase)["seconds"]
+    started = time.monotonic()
+    code, _, stderr = git(args, cwd=cwd, timeout=seconds)
+    timed_out = code == -1 and stderr == "Command timed out"
+    if code == 0 or timed_out:
+        timing_history.record(repo_url, phase, time.monotonic() - started, timed_out)
+    return code, stderr, seconds if timed_out else None
+
+
+def mirror_key(repo_url: str) -> str:
+    # GitHub owner and repo names are case-insensitive, so differently cased URLs share a mirror.
+    url = repo_url.strip().rstrip("/").lower()
+    if url.endswith(".git"):
+        url = url[:-4]
+    name = re.sub(r"[^A-Za-z0-9_.-]+", "-", "-".join(url.split("/")[-2:])).strip("-.") or "repo"
+    digest = hashlib.sha256(url.encode("utf-8")).hexdigest()[:12]
+    return f"{name}-{digest}"
+
+
+def dir_size(path: Path) -> int:
+    total = 0
+    for root, _, files in os.walk(path):
+        for f in files:
+            try:
+                total += os.lstat(os.path.join(root, f)).st_size
+            except OSError:
+                pass
+    return total
+
+
+def read_meta(meta_path: Path) -> Dict:
+    try:
+        return json.loads(meta_path.read_text(encoding="utf-8"))
+    except (OSError, ValueError):
+        return {}
+
+
+def write_meta(meta_path: Path, meta: Dict) -> None:
+    tmp = meta_path.with_suffix(".tmp")
+    tmp.write_text(json.dumps(meta), encoding="utf-8")
+    os.replace(tmp, meta_path)
+
+
+def has_commit(mirror: Path, commit_hash: str) -> bool:
+    code, _, _ = git(["cat-file", "-e", f"{commit_hash}^{{commit}}"], cwd=mirror)
+    return code == 0
+
+
+def ensure_mirror(repo_url: str, commit_hash: str, root: Path) -> Tuple[Optional[Path], str]:
+    key = mirror_key(repo_url)
+    mirror = root / f"{key}.git"
+    meta_path = root / f"{key}.json"
+    with file_lock(root / f"{key}.fetch.lock"):
+        meta = read_meta(meta_path)
+        changed = False
+        if not (mirror / "HEAD").exists():
+            shutil.rmtree(mirror, ignore_errors=True)
+            code, stderr, timed_out = timed_git(repo_url, "clone", ["clone", "--mirror", "--quiet", repo_url, str(mirror)])
+            if code != 0:
+                shutil.rmtree(mirror, ignore_errors=True)
+                return None, f"Git clone timed out after {timed_out}s" if timed_out else f"Git clone failed: {stderr}"
+            changed = True
+        elif not has_commit(mirror, commit_hash):
+            code, stderr, timed_out = timed_git(repo_url, "fetch", ["fetch", "--prune", "--quiet", "origin"], cwd=mirror)
+            if code != 0:
+                return None, f"Git fetch timed out after {timed_out}s" if timed_out else f"Git fetch failed: {stderr}"
+            changed = True
+        meta["url"] = repo_url
+        meta["last_used"] = time.time()
+        if changed or "size_bytes" not in meta:
+            meta["size_bytes"] = dir_size(mirror)
+        write_meta(meta_path, meta)
+    return mirror, ""
+
+
+def evict_mirrors(root: Path, budget_bytes: int, keep: Optional[str] = None) -> List[str]:
+    entries = []
+    for meta_path in root.glob("*.json"):
+        key = meta_path.stem
+        if not (root / f"{key}.git").exists():
+            continue
+        meta = read_meta(meta_path)
+        entries.append((meta.get("last_used", 0.0), meta.get("size_bytes", 0), key))
+    total = sum(size for _, size, _ in entries)
+    evicted = []
+    for _, size, key in sorted(entries):
+        if total <= budget_bytes:
+            break
+        if key == keep:
+            continue
+        try:
+            with file_lock(root / f"{key}.use.lock", blocking=False):
+                with file_lock(root / f"{key}.fetch.lock", blocking=False):
+                    shutil.rmtree(root / f"{key}.git", ignore_errors=True)
+                    (root / f"{key}.json").unlink(missing_ok=True)
+        except BlockingIOError:
+            continue
+        total -= size
+        evicted.append(key)
+    return evicted
+
+
+@contextmanager
+def checkout(repo_url: str, commit_hash: str, budget_bytes: int = MIRROR_BUDGET_BYTES):
+    root = cache_dir("mirrors")
+    key = mirror_key(repo_url)
+    work_dir = Path(tempfile.mkdtemp(prefix="review_work_"))
+    repo_dir = work_dir / "repo"
+    try:
+        # A local clone hardlinks the mirror's objects where possible, so the work tree stays
+        # self-contained (tests may run git inside the container) without copying packs.
+        with tracing.span("checkout", "git", repo=repo_url, commit=commit_hash) as info:
+            with file_lock(root / f"{key}.use.lock", shared=True):
+                mirror, error = ensure_mirror(repo_url, commit_hash, root)
+                if mirror is not None:
+                    code, _, stderr = git(["clone", "--no-checkout", "--quiet", str(mirror), str(repo_dir)])
+                    if code != 0:
+                        error = f"Git clone failed: {stderr}"
+            if not error:
+                git(["checkout", "--quiet", commit_hash], cwd=repo_dir)
+            info["ok"] = not error
+        if error:
+            yield None, error
+            return
+        yield repo_dir, ""
+    finally:
+        shutil.rmtree(work_dir, ignore_errors=True)
+        evict_mirrors(root, budget_bytes, keep=key)
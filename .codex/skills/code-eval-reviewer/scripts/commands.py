@@ -0,0 +1,175 @@
+import os
+import resource
+import signal
+import subprocess
+import threading
+import time
+from collections import deque
+from pathlib import Path
+from typing import Callable, Dict, List, Optional, Tuple
+
+import tracing
+
+HEAD_BYTES = 64 * 1024
+TAIL_BYTES = 256 * 1024
+READ_CHUNK = 64 * 1024
+
+
+def _supervise(proc: subprocess.Popen, timeout: int, drain: Callable[[], None]) -> Tuple[bool, resource.struct_rusage]:
+    # The child is reaped with wait4 (rather than Popen.wait) so its own CPU time and peak
+    # RSS can be recorded; a timer kills it at the deadline, which also ends the drain. The
+    # timer signals the pid only until the child is seen to exit (waitid with WNOWAIT does
+    # not reap it), so it never steals the exit status or signals a reused pid. Whether the
+    # run timed out is read from how the child died, not from whether the timer fired.
+    deadline = time.monotonic() + timeout
+    lock = threading.Lock()
+    exited = threading.Event()
+
+    def expire() -> None:
+        with lock:
+            if not exited.is_set():
+                os.kill(proc.pid, signal.SIGKILL)
+
+    timer = threading.Timer(timeout, expire)
+    timer.start()
+    try:
+        drain()
+        os.waitid(os.P_PID, proc.pid, os.WEXITED | os.WNOWAIT)
+        with lock:
+            exited.set()
+        _, status, usage = os.wait4(proc.pid, 0)
+    except BaseException:
+        with lock:
+            exited.set()
+        timer.cancel()
+        proc.kill()
+        proc.wait()
+        raise
+    timer.cancel()
+    proc.returncode = os.waitstatus_to_exitcode(status)
+    killed = os.WIFSIGNALED(status) and os.WTERMSIG(status) == signal.SIGKILL
+    return killed and time.monotonic() >= deadline, usage
+
+
+def _record_usage(info: Dict, proc: subprocess.Popen, timed_out: bool, usage: resource.struct_rusage) -> None:
+    info.update(
+        exit_code=proc.returncode,
+        timed_out=timed_out,
+        child_cpu=round(usage.ru_utime + usage.ru_stime, 6),
+        child_peak_rss_kb=usage.ru_maxrss,
+    )
+
+
+def decode(data: bytes) -> str:
+    # Same result as text=True: UTF-8 with universal newlines.
+    return data.decode("utf-8", "replace").replace("\r\n", "\n").replace("\r", "\n")
+
+
+def run_command(cmd: List[str], cwd: Optional[str] = None, capture: bool = True, timeout: int = 300, input: Optional[bytes] = None) -> Tuple[int, str, str]:
+    with tracing.span(" ".join(cmd[:2]), "subprocess", argv=cmd, cwd=cwd) as info:
+        pipe = subprocess.PIPE if capture else None
+        chunks = {"stdout": b"", "stderr": b""}
+
+        def drain() -> None:
+            def read(name: str, stream) -> None:
+                chunks[name] = stream.read()
+
+            def write() -> None:
+                try:
+                    proc.stdin.write(input)
+                    proc.stdin.close()
+                except BrokenPipeError:
+                    pass
+
+            readers = [
+                threading.Thread(target=read, args=(name, stream), daemon=True)
+                for name, stream in (("stdout", proc.stdout), ("stderr", proc.stderr)) if stream is not None
+            ]
+            if input is not None:
+                readers.append(threading.Thread(target=write, daemon=True))
+            for reader in readers:
+                reader.start()
+            for reader in readers:
+                reader.join()
+
+        try:
+            stdin = subprocess.PIPE if input is not None else None
+            with subprocess.Popen(cmd, cwd=cwd, stdin=stdin, stdout=pipe, stderr=pipe) as proc:
+                timed_out, usage = _supervise(proc, timeout, drain)
+        except Exception as e:
+            info["exit_code"] = -1
+            return -1, "", str(e)
+        _record_usage(info, proc, timed_out, usage)
+        info.update(stdout_bytes=len(chunks["stdout"]), stderr_bytes=len(chunks["stderr"]))
+        if timed_out:
+            return -1, "", "Command timed out"
+        return proc.returncode, decode(chunks["stdout"]), decode(chunks["stderr"])
+
+
+def stream_command(cmd: List[str], log_path: Path, cwd: Optional[str] = None, timeout: int = 300, on_text: Optional[Callable[[str], None]] = None) -> Dict:
+    """Run cmd with stderr merged into stdout, writing the output to log_path as it arrives.
+
+    Only the first HEAD_BYTES and last TAIL_BYTES stay in memory. on_text is called with each
+    block of complete lines as it arrives, so parsers can follow the run without a re-read.
+    """
+    with tracing.span(" ".join(cmd[:2]), "subprocess", argv=cmd, cwd=cwd, log_path=str(log_path)) as info:
+        head = bytearray()
+        tail: deque = deque()
+        sizes = {"tail": 0, "total": 0}
+
+        def drain() -> None:
+            pending = b""
+            with open(log_path, "wb") as log:
+                for chunk in iter(lambda: proc.stdout.read1(READ_CHUNK), b""):
+                    log.write(chunk)
+                    sizes["total"] += len(chunk)
+                    rest = chunk
+                    if len(head) < HEAD_BYTES:
+                        room = HEAD_BYTES - len(head)
+                        head.extend(chunk[:room])
+                        rest = chunk[room:]
+                    if rest:
+                        tail.append(rest)
+                        sizes["tail"] += len(rest)
+                        while sizes["tail"] - len(tail[0]) >= TAIL_BYTES:
+                            sizes["tail"] -= len(tail.popleft())
+                    if on_text is None:
+                        continue
+                    # Lines are cut on b"\n" before decoding, so multi-byte characters are never
+                    # split; an unterminated line is carried into the next chunk, up to a bound.
+                    data = pending + chunk
+                    cut = data.rfind(b"\n") + 1
+                    pending = data[cut:]
+                    if len(pending) > READ_CHUNK:
+                        cut, pending = len(data), b""
+                    if cut:
+                        on_text(decode(data[:cut]))
+            if pending and on_text is not None:
+                on_text(decode(pending) + "\n")
+
+        result = {"exit_code": -1, "timed_out": False, "output": "", "total_bytes": 0, "truncated": False, "log_path": str(log_path)}
+        try:
+            with subprocess.Popen(cmd, cwd=cwd, stdout=subprocess.PIPE, stderr=subprocess.STDOUT) as proc:
+                timed_out, usage = _supervise(proc, timeout, drain)
+        except Exception as e:
+            info["exit_code"] = -1
+            result["output"] = str(e)
+            return result
+        _record_usage(info, proc, timed_out, usage)
+        info["output_bytes"] = sizes["total"]
+
+        omitted = sizes["total"] - len(head) - sizes["tail"]
+        output = decode(bytes(head))
+        if omitted > 0:
+            output += f"\n... [{omitted} bytes omitted, full log: {log_path}] ...\n"
+        output += decode(b"".join(tail))
+        if timed_out:
+            output += "\nCommand timed out"
+        result.update(
+            exit_code=-1 if timed_out else proc.returncode,
+            timed_out=timed_out,
+            output=output,
+            total_bytes=sizes["total"],
+            truncated=omitted > 0,
+        )
+        return result
@@ -0,0 +1,113 @@
+import http.client
+import json
+import socket
+import time
+from pathlib import Path
+from typing import Dict, Optional, Tuple
+from urllib.parse import urlsplit
+
+from cache_dirs import cache_dir
+
+# Seconds one status request may block waiting for a job to finish.
+WAIT_SLICE = 30
+
+
+class DaemonError(Exception):
+    def __init__(self, message: str, status: Optional[int] = None):
+        super().__init__(message)
+        self.status = status
+
+
+class UnixHTTPConnection(http.client.HTTPConnection):
+    def __init__(self, path: str, timeout: float):
+        super().__init__("localhost", timeout=timeout)
+        self.socket_path = path
+
+    def connect(self) -> None:
+        sock = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+        sock.settimeout(self.timeout)
+        try:
+            sock.connect(self.socket_path)
+        except OSError:
+            sock.close()
+            raise
+        self.sock = sock
+
+
+def default_socket() -> Path:
+    return cache_dir("daemon") / "review.sock"
+
+
+def token_path(port: int) -> Path:
+    """Where a daemon serving HTTP on port keeps the token its clients must send (mode 0600)."""
+    return cache_dir("daemon") / f"token-{port}"
+
+
+def read_token(address: str) -> Optional[str]:
+    if not address.startswith("http://"):
+        # The socket's own 0600 mode keeps other users out.
+        return None
+    try:
+        return token_path(urlsplit(address).port or 80).read_text(encoding="utf-8").strip()
+    except OSError:
+        return None
+
+
+def connect(address: str, timeout: float) -> http.client.HTTPConnection:
+    # An http:// URL means local TCP; anything else is a Unix socket path.
+    if address.startswith("http://"):
+        parts = urlsplit(address)
+        return http.client.HTTPConnection(parts.hostname or "127.0.0.1", parts.port or 80, timeout=timeout)
+    return UnixHTTPConnection(address, timeout)
+
+
+def request(address: str, method: str, path: str, body: Optional[Dict] = None, timeout: float = 60) -> Tuple[int, Dict]:
+    """One JSON request to the daemon; raises OSError when it is not reachable."""
+    conn = connect(address, timeout)
+    try:
+        data = json.dumps(body).encode("utf-8") if body is not None else None
+        headers = {"Content-Type": "application/json"} if data else {}
+        token = read_token(address)
+        if token:
+            headers["Authorization"] = f"Bearer {token}"
+        conn.request(method, path, body=data, headers=headers)
+        response = conn.getresponse()
+        payload = response.read()
+        return response.status, json.loads(payload) if payload else {}
+    finally:
+        conn.close()
+
+
+def health(address: str) -> Optional[Dict]:
+    """The daemon's health report, or None when nothing answers at address."""
+    try:
+        status, report = request(address, "GET", "/health", timeout=5)
+    except (OSError, ValueError, http.client.HTTPException):
+        return None
+    return report if status == 200 else None
+
+
+def find_daemon(address: Optional[str] = None) -> Optional[Tuple[str, Dict]]:
+    """(address, health) of a running daemon at address, or at the default socket."""
+    address = address or str(default_socket())
+    report = health(address)
+    return (address, report) if report else None
+
+
+def submit(address: str, job: Dict) -> Dict:
+    status, reply = request(address, "POST", "/jobs", job)
+    if status != 202:
+        raise DaemonError(reply.get("error", f"HTTP {status}"), status)
+    return reply
+
+
+def wait(address: str, job_id: str, timeout: Optional[float] = None) -> Dict:
+    """Block until the job finishes (or timeout passes) and return its status."""
+    deadline = None if timeout is None else time.monotonic() + timeout
+    while True:
+        remaining = WAIT_SLICE if deadline is None else min(WAIT_SLICE, max(0, deadline - time.monotonic()))
+        status, job = request(address, "GET", f"/jobs/{job_id}?wait={remaining:.0f}", timeout=remaining + 30)
+        if status != 200:
+            raise DaemonError(job.get("error", f"HTTP {status}"), status)
+        if job["state"] in ("done", "failed") or (deadline is not None and time.monotonic() >= deadline):
+            return job
@@ -0,0 +1,205 @@
+import http.client
+import json
+import os
+import threading
+import time
+from typing import Callable, Dict, Optional, Tuple
+from urllib.parse import urlsplit
+
+import result_cache
+import tracing
+
+Transport = Callable[[str, str, Dict[str, str]], Tuple[int, Dict[str, str], bytes]]
+
+# Freshness per endpoint prefix; stale entries are revalidated with If-None-Match,
+# and GitHub does not count 304 responses against the rate limit.
+ENDPOINT_TTLS = [
+    ("search/", 3600),
+    ("repos/", 6 * 3600),
+]
+DEFAULT_TTL = 3600
+MAX_RATE_LIMIT_WAIT = 3900
+TRANSIENT_RETRIES = 3
+LOW_REMAINING = 10
+
+
+class GitHubError(Exception):
+    def __init__(self, message: str, status: Optional[int] = None):
+        super().__init__(message)
+        self.status = status
+
+
+_config: Dict = {
+    "base_url": os.environ.get("GITHUB_API_URL", "https://api.github.com").rstrip("/"),
+    "token": os.environ.get("GITHUB_TOKEN") or os.environ.get("GH_TOKEN"),
+    "transport": None,
+    "sleep": time.sleep,
+}
+_rate: Dict[str, Optional[float]] = {"remaining": None, "reset": None}
+_rate_lock = threading.Lock()
+_memory: Dict[str, Dict] = {}
+_local = threading.local()
+
+
+def configure(base_url: Optional[str] = None, token: Optional[str] = None, transport: Optional[Transport] = None, sleep: Optional[Callable[[float], None]] = None) -> None:
+    if base_url is not None:
+        _config["base_url"] = base_url.rstrip("/")
+    if token is not None:
+        _config["token"] = token
+    if transport is not None:
+        _config["transport"] = transport
+    if sleep is not None:
+        _config["sleep"] = sleep
+    _memory.clear()
+    _rate.update(remaining=None, reset=None)
+
+
+def http_transport(method: str, url: str, headers: Dict[str, str]) -> Tuple[int, Dict[str, str], bytes]:
+    parts = urlsplit(url)
+    conns = getattr(_local, "conns", None)
+    if conns is None:
+        conns = _local.conns = {}
+    key = (parts.scheme, parts.netloc)
+    conn = conns.get(key)
+    if conn is None:
+        conn_cls = http.client.HTTPSConnection if parts.scheme == "https" else http.client.HTTPConnection
+        conn = conns[key] = conn_cls(parts.netloc, timeout=20)
+    path = parts.path + (f"?{parts.query}" if parts.query else "")
+    try:
+        conn.request(method, path, headers=headers)
+        resp = conn.getresponse()
+        body = resp.read()
+    except (http.client.HTTPException, OSError):
+        conn.close()
+        conns.pop(key, None)
+        raise
+    return resp.status, {k.lower(): v for k, v in resp.getheaders()}, body
+
+
+def api_path(path_or_url: str) -> str:
+    base = _config["base_url"]
+    if path_or_url.startswith(base + "/"):
+        return path_or_url[len(base) + 1:]
+    if "://" in path_or_url:
+        parts = urlsplit(path_or_url)
+        return parts.path.lstrip("/") + (f"?{parts.query}" if parts.query else "")
+    return path_or_url.lstrip("/")
+
+
+def ttl_for(path: str) -> int:
+    for prefix, ttl in ENDPOINT_TTLS:
+        if path.startswith(prefix):
+            return ttl
+    return DEFAULT_TTL
+
+
+def update_rate(headers: Dict[str, str]) -> None:
+    if "x-ratelimit-remaining" not in headers:
+        return
+    with _rate_lock:
+        try:
+            _rate["remaining"] = float(headers["x-ratelimit-remaining"])
+            _rate["reset"] = float(headers.get("x-ratelimit-reset", 0))
+        except ValueError:
+            pass
+
+
+def pace() -> None:
+    with _rate_lock:
+        remaining, reset = _rate["remaining"], _rate["reset"]
+    if remaining is None or reset is None or remaining >= LOW_REMAINING:
+        return
+    window = reset - time.time()
+    if window <= 0:
+        return
+    # Spread what is left of the quota over the rest of the window instead of hitting zero.
+    delay = window if remaining < 1 else window / remaining
+    _config["sleep"](min(delay, MAX_RATE_LIMIT_WAIT))
+
+
+def rate_limit_wait(status: int, headers: Dict[str, str]) -> Optional[float]:
+    if status not in (403, 429):
+        return None
+    if "retry-after" in headers:
+        try:
+            return float(headers["retry-after"])
+        except ValueError:
+            return 60.0
+    if headers.get("x-ratelimit-remaining") == "0":
+        try:
+            return max(1.0, float(headers.get("x-ratelimit-reset", 0)) - time.time() + 1)
+        except ValueError:
+            return 60.0
+    return None
+
+
+def fetch(path: str, cached: Optional[Dict]) -> Tuple[int, Dict[str, str], bytes]:
+    url = f"{_config['base_url']}/{path}"
+    headers = {"Accept": "application/vnd.github+json", "User-Agent": "code-eval-reviewer"}
+    if _config["token"]:
+        headers["Authorization"] = f"Bearer {_config['token']}"
+    if cached and cached.get("etag"):
+        headers["If-None-Match"] = cached["etag"]
+    transport = _config["transport"] or http_transport
+
+    waited = 0.0
+    attempt = 0
+    while True:
+        pace()
+        try:
+            status, resp_headers, body = transport("GET", url, headers)
+        except (http.client.HTTPException, OSError) as e:
+            attempt += 1
+            if attempt > TRANSIENT_RETRIES:
+                raise GitHubError(f"network error: {e}")
+            _config["sleep"](2 ** (attempt - 1))
+            continue
+        update_rate(resp_headers)
+        wait_for = rate_limit_wait(status, resp_headers)
+        if wait_for is not None:
+            if waited + wait_for > MAX_RATE_LIMIT_WAIT:
+                raise GitHubError("rate limited", status)
+            _config["sleep"](wait_for)
+            waited += wait_for
+            with _rate_lock:
+                _rate.update(remaining=None, reset=None)
+            continue
+        if status >= 500:
+            attempt += 1
+            if attempt > TRANSIENT_RETRIES:
+                raise GitHubError(f"HTTP {status}", status)
+            _config["sleep"](2 ** (attempt - 1))
+            continue
+        return status, resp_headers, body
+
+
+def get_json(path_or_url: str, use_cache: bool = True) -> Dict:
+    path = api_path(path_or_url)
+    with tracing.span(f"GET {path.split('?')[0]}", "github", path=path) as info:
+        key = result_cache.cache_key(path)
+        cached = _memory.get(path)
+        if cached is None:
+            cached = result_cache.get("github", key)
+            if not isinstance(cached, dict) or "body" not in cached:
+                cached = None
+        if use_cache and cached and time.time() - cached["fetched"] < ttl_for(path):
+            info["cache"] = "fresh"
+            return cached["body"]
+
+        status, headers, body = fetch(path, cached if use_cache else None)
+        info.update(status=status, response_bytes=len(body), rate_remaining=headers.get("x-ratelimit-remaining"))
+        if status == 304 and cached:
+            info["cache"] = "revalidated"
+            entry = dict(cached, fetched=time.time())
+        elif status == 200:
+            info["cache"] = "miss"
+            try:
+                data = json.loads(body.decode("utf-8"))
+            except ValueError:
+                raise GitHubError("invalid JSON response", status)
+            entry = {"etag": headers.get("etag"), "fetched": time.time(), "body": data}
+        else:
+            raise GitHubError(f"HTTP {status}", status)
+        _memory[path] = entry
+        result_cache.put("github", key, entry)
+        return entry["body"]
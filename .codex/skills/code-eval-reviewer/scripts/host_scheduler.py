@@ -0,0 +1,169 @@
+import json
+import os
+import re
+import shutil
+import time
+import uuid
+from contextlib import contextmanager
+from pathlib import Path
+from typing import Dict, Optional
+
+import tracing
+from cache_dirs import cache_dir, file_lock
+
+# Limits given to a container when the review sets none; a build is charged the same.
+DEFAULT_CONTAINER_CPUS = 2.0
+DEFAULT_CONTAINER_MEMORY_MB = 4096
+# Free space below which no build or run is admitted, on the cache disk and Docker's data root.
+DEFAULT_MIN_FREE_DISK_MB = 2048
+DOCKER_ROOT = Path(os.environ.get("CODE_EVAL_DOCKER_ROOT", "/var/lib/docker"))
+# A waiter that has not polled for this long is taken to be gone.
+WAITER_EXPIRY = 30
+POLL_INTERVAL = 0.5
+MAX_POLL_INTERVAL = 2.0
+MEMORY_SIZE = re.compile(r"^\s*(\d+(?:\.\d+)?)\s*([kmgt]?)b?\s*$", re.IGNORECASE)
+MEMORY_UNITS_MB = {"": 1 / (1024 * 1024), "k": 1 / 1024, "m": 1, "g": 1024, "t": 1024 * 1024}
+
+
+def parse_memory_mb(value: Optional[str]) -> Optional[int]:
+    """Megabytes in a docker --memory value such as 512m or 4g (plain numbers are bytes)."""
+    m = MEMORY_SIZE.match(str(value)) if value else None
+    return max(1, int(float(m.group(1)) * MEMORY_UNITS_MB[m.group(2).lower()])) if m else None
+
+
+def host_memory_mb() -> int:
+    try:
+        with open("/proc/meminfo", encoding="ascii") as fh:
+            for line in fh:
+                if line.startswith("MemTotal:"):
+                    return int(line.split()[1]) // 1024
+    except OSError:
+        pass
+    return 8192
+
+
+def budget() -> Dict:
+    """The host's Docker budget; CODE_EVAL_HOST_CPUS / _MEMORY_MB / CODE_EVAL_MIN_FREE_DISK_MB override it."""
+    return {
+        "cpus": float(os.environ.get("CODE_EVAL_HOST_CPUS") or os.cpu_count() or 1),
+        # Some memory is left for the reviewers themselves and the Docker daemon.
+        "memory_mb": int(os.environ.get("CODE_EVAL_HOST_MEMORY_MB") or host_memory_mb() * 0.8),
+        "min_free_disk_mb": int(os.environ.get("CODE_EVAL_MIN_FREE_DISK_MB") or DEFAULT_MIN_FREE_DISK_MB),
+    }
+
+
+def container_limits(cpus: Optional[str], memory: Optional[str]) -> Dict:
+    """The --cpus/--memory values for a container, filling in the defaults, capped at the budget."""
+    host = budget()
+    cpus_value = float(cpus) if cpus else min(DEFAULT_CONTAINER_CPUS, host["cpus"])
+    memory_mb = parse_memory_mb(memory) or min(DEFAULT_CONTAINER_MEMORY_MB, host["memory_mb"])
+    return {"cpus": cpus_value, "memory_mb": memory_mb, "memory": memory or f"{memory_mb}m"}
+
+
+def free_disk_mb() -> int:
+    roots = [cache_dir("scheduler")] + ([DOCKER_ROOT] if DOCKER_ROOT.exists() else [])
+    free = []
+    for root in roots:
+        try:
+            free.append(shutil.disk_usage(root).free // (1024 * 1024))
+        except OSError:
+            continue
+    return min(free) if free else 0
+
+
+def _alive(pid: int) -> bool:
+    try:
+        os.kill(pid, 0)
+    except ProcessLookupError:
+        return False
+    except PermissionError:
+        pass
+    return True
+
+
+def _load(path: Path) -> Dict:
+    try:
+        ledger = json.loads(path.read_text(encoding="utf-8"))
+    except (OSError, ValueError):
+        ledger = {}
+    now = time.time()
+    # Entries of processes that died without releasing them are dropped.
+    ledger["admitted"] = [e for e in ledger.get("admitted", []) if _alive(e["pid"])]
+    ledger["waiting"] = [w for w in ledger.get("waiting", []) if _alive(w["pid"]) and now - w["seen"] < WAITER_EXPIRY]
+    return ledger
+
+
+def _store(path: Path, ledger: Dict) -> None:
+    tmp = path.with_suffix(f".{os.getpid()}.tmp")
+    tmp.write_text(json.dumps(ledger), encoding="utf-8")
+    os.replace(tmp, path)
+
+
+def _fits(ledger: Dict, host: Dict, cpus: float, memory_mb: int) -> bool:
+    if not ledger["admitted"]:
+        # An idle host admits anything: a job larger than the budget still runs alone, and
+        # waiting on a full disk only helps while other jobs may still free space.
+        return True
+    used_cpus = sum(e["cpus"] for e in ledger["admitted"])
+    used_memory = sum(e["memory_mb"] for e in ledger["admitted"])
+    return (
+        used_cpus + cpus <= host["cpus"]
+        and used_memory + memory_mb <= host["memory_mb"]
+        and free_disk_mb() >= host["min_free_disk_mb"]
+    )
+
+
+def try_admit(ticket: Dict) -> bool:
+    """Admit ticket if it is the oldest waiter and the host has room for it; otherwise queue it."""
+    root = cache_dir("scheduler")
+    path = root / "ledger.json"
+    host = budget()
+    with file_lock(root / "ledger.lock"):
+        ledger = _load(path)
+        ticket["seen"] = time.time()
+        waiting = [w for w in ledger["waiting"] if w["id"] != ticket["id"]]
+        first = all(w["queued"] > ticket["queued"] or (w["queued"] == ticket["queued"] and w["id"] > ticket["id"]) for w in waiting)
+        admitted = first and _fits(ledger, host, ticket["cpus"], ticket["memory_mb"])
+        if admitted:
+            ledger["admitted"].append(ticket)
+            ledger["waiting"] = waiting
+        else:
+            ledger["waiting"] = waiting + [ticket]
+        _store(path, ledger)
+    return admitted
+
+
+def release(ticket_id: str) -> None:
+    root = cache_dir("scheduler")
+    path = root / "ledger.json"
+    with file_lock(root / "ledger.lock"):
+        ledger = _load(path)
+        ledger["admitted"] = [e for e in ledger["admitted"] if e["id"] != ticket_id]
+        ledger["waiting"] = [w for w in ledger["waiting"] if w["id"] != ticket_id]
+        _store(path, ledger)
+
+
+@contextmanager
+def admit(kind: str, cpus: float, memory_mb: int):
+    """Wait until the host has room for a build or run of this size, and hold it for the block.
+
+    Every reviewer process sharing the cache root draws on one budget, first come first served.
+    The yielded dict holds "waited", the seconds spent queued; callers' timeouts start after it.
+    """
+    ticket = {"id": uuid.uuid4().hex, "pid": os.getpid(), "kind": kind, "cpus": cpus, "memory_mb": memory_mb, "queued": time.time()}
+    info = {"waited": 0.0}
+    started = time.monotonic()
+    with tracing.span("admit", "scheduler", kind=kind, cpus=cpus, memory_mb=memory_mb) as span_info:
+        interval = POLL_INTERVAL
+        try:
+            while not try_admit(ticket):
+                time.sleep(interval)
+                interval = min(interval * 1.5, MAX_POLL_INTERVAL)
+        except BaseException:
+            release(ticket["id"])
+            raise
+        info["waited"] = span_info["waited"] = round(time.monotonic() - started, 3)
+    try:
+        yield info
+    finally:
+        release(ticket["id"])
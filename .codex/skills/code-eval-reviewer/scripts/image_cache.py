@@ -0,0 +1,346 @@
+import hashlib
+import json
+import posixpath
+import re
+import shlex
+import shutil
+import tempfile
+import time
+from functools import lru_cache
+from pathlib import Path
+from typing import Dict, List, Optional, Tuple
+
+import host_scheduler
+import image_pool
+import timing_history
+from cache_dirs import cache_dir, file_lock
+from commands import run_command
+from patch_model import PatchSource, parse_patch
+
+BASE_IMAGE_REPO = "shipd-cache/base"
+# Instructions after the source COPY that a thin layer may replay over an image that already
+# ran them: they only set metadata or are checked command by command (RUN).
+REPLAYABLE_KEYWORDS = {"RUN", "ENV", "ARG", "LABEL", "EXPOSE", "CMD", "ENTRYPOINT", "HEALTHCHECK", "STOPSIGNAL", "WORKDIR"}
+# Commands that give the same result when run a second time over their own output.
+RERUNNABLE_COMMAND = re.compile(
+    r"^(?:"
+    r"(?:python[\d.]* -m )?pip[\d.]* install\b"
+    r"|python[\d.]* setup\.py (?:build|build_ext|develop|egg_info)\b"
+    r"|python[\d.]* -m compileall\b"
+    r"|npm (?:ci|install|run build)\b|yarn(?: install| build)?$|pnpm (?:install|run build)\b"
+    r"|go (?:build|mod download|generate|vet)\b|cargo (?:build|fetch)\b|make\b"
+    r"|mkdir -p\b|rm -f\b|rm -rf\b|chmod\b|ln -sf\b|touch\b|cd\b|true$|echo\b"
+    r")"
+)
+# Pipes, appends and substitutions can make an allowlisted command do anything.
+UNSAFE_SHELL = re.compile(r"\||>>|`|\$\(")
+
+
+def docker(args: List[str], cwd: Optional[Path] = None) -> Tuple[int, str, str]:
+    return run_command(["docker"] + args, cwd=str(cwd) if cwd else None)
+
+
+def build_image(tag: str, context: Path, repo: Optional[str], phase: str) -> Tuple[int, str, str]:
+    """docker build under the repo's learned time limit for phase; raises TimeoutError when hit."""
+    seconds = timing_history.limit(repo, phase)["seconds"]
+    # Builds draw on the host-wide budget, charged like a container with the default limits.
+    limits = host_scheduler.container_limits(None, None)
+    with host_scheduler.admit("build", limits["cpus"], limits["memory_mb"]):
+        started = time.monotonic()
+        code, stdout, stderr = run_command(["docker", "build", "-t", tag, "-f", "Dockerfile", "."], cwd=str(context), timeout=seconds)
+        elapsed = time.monotonic() - started
+    timed_out = code == -1 and stderr == "Command timed out"
+    # Failed builds usually stop early, so only finished ones say how long a build takes.
+    if code == 0 or timed_out:
+        timing_history.record(repo, phase, elapsed, timed_out)
+    if timed_out:
+        raise TimeoutError(f"Docker build timed out after {seconds}s")
+    return code, stdout, stderr
+
+
+def image_exists(tag: str) -> bool:
+    code, _, _ = docker(["image", "inspect", tag])
+    return code == 0
+
+
+def base_image_tag(dockerfile_text: str, commit_hash: str) -> str:
+    digest = hashlib.sha256(dockerfile_text.encode("utf-8") + b"\0" + commit_hash.encode("utf-8")).hexdigest()
+    return f"{BASE_IMAGE_REPO}:{digest[:16]}"
+
+
+def changed_between(repo_dir: Path, old_commit: str, new_commit: str) -> Optional[List[str]]:
+    """Paths that differ between two commits of the clone at repo_dir, or None if git cannot tell."""
+    code, out, _ = run_command(["git", "diff", "--name-only", "-z", "--no-renames", old_commit, new_commit], cwd=str(repo_dir))
+    return [p for p in out.split("\0") if p] if code == 0 else None
+
+
+def ensure_base_image(repo_dir: Path, commit_hash: str, repo: Optional[str] = None) -> Tuple[Optional[str], str, str]:
+    """Build (or find) the base image of the checkout at repo_dir.
+
+    Returns (tag, how it was obtained: "cached", "warm" or "built", build stderr). When the
+    pool holds a warm image with the same repo, Dockerfile and dependency manifests, only the
+    sources that differ from its commit are layered over it; otherwise the full build that
+    follows becomes the warm image for the next checkout like this one.
+    """
+    dockerfile_text = (repo_dir / "Dockerfile").read_text(encoding="utf-8", errors="replace")
+    tag = base_image_tag(dockerfile_text, commit_hash)
+    key = image_pool.dependency_key(repo, dockerfile_instructions(dockerfile_text), repo_dir)
+    with file_lock(cache_dir("images") / f"{tag.split(':')[1]}.lock"):
+        if image_exists(tag):
+            image_pool.register(tag, key, repo, commit_hash)
+            return tag, "cached", ""
+        donor = image_pool.warm_donor(key)
+        changed = changed_between(repo_dir, donor["commit"], commit_hash) if donor else None
+        thin = False
+        if changed is None:
+            code, _, stderr = build_image(tag, repo_dir, repo, "build:base")
+        else:
+            # The clone's .git differs wholesale from the donor's, so it is replaced, not merged.
+            # A thin layer that fails is retried as a full build, which also covers a stale warm image.
+            code, stderr, thin = build_variant(repo_dir, donor["tag"], changed, tag, repo, replace_dirs=[".git"])
+        if code != 0:
+            return None, "built", stderr
+        image_pool.register(tag, key, repo, commit_hash, donor["tag"] if thin else None)
+    image_pool.evict(keep=tag)
+    return tag, "warm" if thin else "built", ""
+
+
+def dockerfile_instructions(text: str) -> List[str]:
+    instructions = []
+    current = ""
+    for line in text.splitlines():
+        stripped = line.strip()
+        if not current and (not stripped or stripped.startswith("#")):
+            continue
+        if stripped.endswith("\\"):
+            current += stripped[:-1] + " "
+            continue
+        instructions.append((current + stripped).strip())
+        current = ""
+    if current.strip():
+        instructions.append(current.strip())
+    return instructions
+
+
+def plan_thin_layer(dockerfile_text: str) -> Optional[Dict]:
+    instructions = dockerfile_instructions(dockerfile_text)
+    if sum(1 for i in instructions if i.split()[0].upper() == "FROM") != 1:
+        return None
+
+    workdir = None
+    copy_index = None
+    copy_workdir = None
+    copy_flags: List[str] = []
+    dest = None
+    # Context sources of every COPY/ADD, with the index of the instruction that copies them.
+    sources: List[Tuple[int, str]] = []
+    user = None
+    copy_user = None
+    for idx, instruction in enumerate(instructions):
+        parts = instruction.split()
+        keyword = parts[0].upper()
+        if keyword == "USER" and len(parts) == 2:
+            user = parts[1]
+        elif keyword == "WORKDIR" and len(parts) == 2:
+            workdir = parts[1] if parts[1].startswith("/") else posixpath.join(workdir or "/", parts[1])
+        elif keyword in {"COPY", "ADD"}:
+            flags = [p for p in parts[1:] if p.startswith("--")]
+            if any(f.startswith("--from") for f in flags):
+                continue
+            if instruction.rstrip().endswith("]"):
+                try:
+                    args = json.loads(instruction[instruction.index("["):])
+                except ValueError:
+                    return None
+                sources.extend((idx, src) for src in args[:-1])
+                continue
+            args = [p for p in parts[1:] if not p.startswith("--")]
+            sources.extend((idx, src) for src in args[:-1])
+            if len(args) != 2 or args[0] not in {".", "./"}:
+                continue
+            copy_index, copy_workdir, copy_flags, dest, copy_user = idx, workdir, flags, args[1], user
+
+    if copy_index is None or "$" in dest:
+        return None
+    tail = instructions[copy_index + 1:]
+    if not all(replayable(instruction) for instruction in tail):
+        return None
+    if not dest.startswith("/"):
+        if copy_workdir is None:
+            # Relative to the parent image's WORKDIR, which we cannot see from here.
+            return None
+        dest = posixpath.join(copy_workdir, dest)
+    return {
+        "dest": posixpath.normpath(dest),
+        "workdir": copy_workdir,
+        "flags": copy_flags,
+        # The base image's final user; the layer's own cleanup runs as root.
+        "user": copy_user,
+        "tail": tail,
+        # Steps before the source COPY are not replayed, so what they copy must not change.
+        "inputs": [src for idx, src in sources if idx < copy_index],
+    }
+
+
+def replayable(instruction: str) -> bool:
+    """Whether an instruction can safely run again on an image it already ran on.
+
+    COPY/ADD (the layer's context holds only the changed files) and USER never are. A RUN
+    qualifies only when every command in it matches RERUNNABLE_COMMAND: `mkdir build` or
+    `useradd app` fail the second time.
+    """
+    keyword, _, rest = instruction.partition(" ")
+    keyword = keyword.upper()
+    if keyword not in REPLAYABLE_KEYWORDS:
+        return False
+    if keyword != "RUN":
+        return True
+    rest = rest.strip()
+    if rest.startswith("[") or rest.startswith("--") or UNSAFE_SHELL.search(rest):
+        return False
+    commands = [c.strip() for c in re.split(r"&&|;", rest)]
+    return all(c and RERUNNABLE_COMMAND.match(c) for c in commands)
+
+
+@lru_cache(maxsize=1024)
+def path_glob(pattern: str) -> re.Pattern:
+    """pattern as Docker matches context paths: `*` and `?` stay within one path segment."""
+    out = []
+    i = 0
+    while i < len(pattern):
+        if pattern.startswith("**/", i):
+            # Any number of directories, including none.
+            out.append("(?:.*/)?")
+            i += 3
+        elif pattern.startswith("**", i):
+            out.append(".*")
+            i += 2
+        elif pattern[i] == "*":
+            out.append("[^/]*")
+            i += 1
+        elif pattern[i] == "?":
+            out.append("[^/]")
+            i += 1
+        elif pattern[i] == "[" and "]" in pattern[i + 2:]:
+            end = pattern.index("]", i + 2)
+            body = pattern[i + 1:end]
+            out.append("[" + ("^" + body[1:] if body.startswith(("!", "^")) else body) + "]")
+            i = end + 1
+        else:
+            out.append(re.escape(pattern[i]))
+            i += 1
+    return re.compile("".join(out) + r"\Z")
+
+
+def _prefix_matches(path: str, pattern: str) -> bool:
+    # A pattern naming a directory covers everything under it.
+    parts = path.split("/")
+    glob = path_glob(pattern)
+    return any(glob.match("/".join(parts[: i + 1])) for i in range(len(parts)))
+
+
+def copies_path(source: str, path: str) -> bool:
+    """Whether a COPY/ADD source from the build context brings in path."""
+    source = posixpath.normpath(source.lstrip("/"))
+    return source == "." or _prefix_matches(path, source)
+
+
+def patch_paths(patch: PatchSource) -> List[str]:
+    paths = []
+    for entry in parse_patch(patch)["files"]:
+        paths.extend(p for p in (entry["old_path"], entry["new_path"]) if p)
+    return list(dict.fromkeys(paths))
+
+
+def dockerignore_patterns(repo_dir: Path) -> Optional[List[str]]:
+    path = repo_dir / ".dockerignore"
+    if not path.exists():
+        return []
+    patterns = []
+    for line in path.read_text(encoding="utf-8", errors="replace").splitlines():
+        line = line.strip()
+        if not line or line.startswith("#"):
+            continue
+        if line.startswith("!"):
+            # Exceptions need the full Docker matcher; let the caller fall back to a real build.
+            return None
+        patterns.append(line.strip("/"))
+    return patterns
+
+
+def is_ignored(path: str, patterns: List[str]) -> bool:
+    return any(_prefix_matches(path, pattern) for pattern in patterns)
+
+
+def build_variant(repo_dir: Path, base_image: str, changed_paths: List[str], tag: str, repo: Optional[str] = None, replace_dirs: List[str] = ()) -> Tuple[int, str, bool]:
+    """Build tag as base_image plus changed_paths from repo_dir, replaying the Dockerfile's
+    steps after its source COPY. Builds repo_dir in full instead when that cannot be done
+    safely (a changed path copied by an earlier step, a step that cannot run twice), and
+    when the thin layer fails.
+
+    Each of replace_dirs that exists in repo_dir and is not dockerignored is removed from the
+    image and copied whole. Returns (exit code, stderr, whether a thin layer was built).
+    """
+    dockerfile_text = (repo_dir / "Dockerfile").read_text(encoding="utf-8", errors="replace")
+    plan = plan_thin_layer(dockerfile_text)
+    ignored = dockerignore_patterns(repo_dir)
+    if (
+        plan is None
+        or ignored is None
+        or any((repo_dir / p).is_dir() for p in changed_paths)
+        or any(copies_path(src, p) for src in plan["inputs"] for p in changed_paths)
+    ):
+        code, _, stderr = build_image(tag, repo_dir, repo, "build:base")
+        return code, stderr, False
+
+    ctx = Path(tempfile.mkdtemp(prefix="review_layer_"))
+    try:
+        files_dir = ctx / "files"
+        files_dir.mkdir()
+        removed = []
+        for rel in changed_paths:
+            if rel == "Dockerfile" or is_ignored(rel, ignored):
+                continue
+            src = repo_dir / rel
+            if src.exists() or src.is_symlink():
+                target = files_dir / rel
+                target.parent.mkdir(parents=True, exist_ok=True)
+                shutil.copy2(src, target, follow_symlinks=False)
+            else:
+                removed.append(posixpath.join(plan["dest"], rel))
+        replaced = []
+        for rel in replace_dirs:
+            src = repo_dir / rel
+            if src.is_dir() and not src.is_symlink() and not is_ignored(rel, ignored):
+                shutil.copytree(src, files_dir / rel, symlinks=True)
+                replaced.append(posixpath.join(plan["dest"], rel))
+
+        lines = [f"FROM {base_image}"]
+        if plan["user"]:
+            lines.append("USER root")
+        if plan["workdir"]:
+            lines.append(f"WORKDIR {plan['workdir']}")
+        if replaced:
+            lines.append("RUN rm -rf -- " + " ".join(shlex.quote(p) for p in replaced))
+        lines.append(" ".join(["COPY"] + plan["flags"] + ["files/", plan["dest"].rstrip("/") + "/"]))
+        if removed:
+            lines.append("RUN rm -rf -- " + " ".join(shlex.quote(p) for p in removed))
+        if plan["user"]:
+            lines.append(f"USER {plan['user']}")
+        # Anything after the source COPY saw the old tree, so replay it over the new files.
+        lines.extend(plan["tail"])
+        (ctx / "Dockerfile").write_text("\n".join(lines) + "\n", encoding="utf-8")
+
+        code, _, stderr = build_image(tag, ctx, repo, "build:layer")
+    finally:
+        shutil.rmtree(ctx, ignore_errors=True)
+    if code == 0:
+        return code, stderr, True
+    # Only a full build can tell a broken submission from a step that does not replay.
+    code, _, stderr = build_image(tag, repo_dir, repo, "build:base")
+    return code, stderr, False
+
+
+def remove_images(tags: List[str]) -> None:
+    if tags:
+        docker(["rmi", "-f"] + tags)
@@ -0,0 +1,147 @@
+import fnmatch
+import hashlib
+import json
+import os
+import time
+from pathlib import Path
+from typing import Dict, List, Optional
+
+from cache_dirs import cache_dir, file_lock
+from commands import run_command
+
+WARM_IMAGE_REPO = "shipd-cache/warm"
+POOL_BUDGET_BYTES = int(os.environ.get("CODE_EVAL_IMAGE_BUDGET_MB", "40960")) * 1024 * 1024
+# Images used this recently are never evicted: a review may still be layering on them.
+IN_USE_SECONDS = 3 * 3600
+# Files whose contents decide what a Dockerfile's dependency install produces (and
+# .dockerignore, which decides what the source COPY brings in).
+MANIFEST_PATTERNS = (
+    ".dockerignore", "requirements*.txt", "constraints*.txt", "pyproject.toml", "setup.py", "setup.cfg", "Pipfile", "Pipfile.lock",
+    "poetry.lock", "uv.lock", "package.json", "package-lock.json", "yarn.lock", "pnpm-lock.yaml",
+    "go.mod", "go.sum", "Cargo.toml", "Cargo.lock", "Gemfile", "Gemfile.lock", "composer.json", "composer.lock",
+    "pom.xml", "build.gradle", "build.gradle.kts", "*.csproj", "mix.exs", "mix.lock",
+)
+
+
+def manifest_paths(repo_dir: Path) -> List[str]:
+    code, out, _ = run_command(["git", "ls-files", "-z"], cwd=str(repo_dir))
+    if code != 0:
+        return []
+    return sorted(p for p in out.split("\0") if p and any(fnmatch.fnmatch(p.rsplit("/", 1)[-1], pat) for pat in MANIFEST_PATTERNS))
+
+
+def dependency_key(repo: Optional[str], instructions: List[str], repo_dir: Path) -> str:
+    """Key of the warm image for a repo, its Dockerfile instructions and its dependency manifests.
+
+    Two checkouts with the same key install the same dependencies, so one can be built as a
+    thin layer of changed sources over the other's image.
+    """
+    digest = hashlib.sha256(f"{repo}\0".encode("utf-8") + "\n".join(instructions).encode("utf-8"))
+    for rel in manifest_paths(repo_dir):
+        try:
+            data = (repo_dir / rel).read_bytes()
+        except OSError:
+            continue
+        digest.update(b"\0" + rel.encode("utf-8") + b"\0" + hashlib.sha256(data).digest())
+    return digest.hexdigest()[:16]
+
+
+def warm_tag(key: str) -> str:
+    return f"{WARM_IMAGE_REPO}:{key}"
+
+
+def image_size(tag: str) -> int:
+    code, out, _ = run_command(["docker", "image", "inspect", "--format", "{{.Size}}", tag])
+    try:
+        return int(out.strip()) if code == 0 else 0
+    except ValueError:
+        return 0
+
+
+def _pool_path() -> Path:
+    return cache_dir("images") / "pool.json"
+
+
+def _load(path: Path) -> Dict:
+    try:
+        pool = json.loads(path.read_text(encoding="utf-8"))
+    except (OSError, ValueError):
+        pool = {}
+    pool.setdefault("images", {})
+    # Dependency key -> the base image tag serving as its warm image.
+    pool.setdefault("warm", {})
+    return pool
+
+
+def _store(path: Path, pool: Dict) -> None:
+    tmp = path.with_suffix(f".{os.getpid()}.tmp")
+    tmp.write_text(json.dumps(pool), encoding="utf-8")
+    os.replace(tmp, path)
+
+
+def _exists(tag: str) -> bool:
+    code, _, _ = run_command(["docker", "image", "inspect", tag])
+    return code == 0
+
+
+def warm_donor(key: str) -> Optional[Dict]:
+    """The pool entry ("tag", "commit", ...) of the warm image for key, if it is still present."""
+    pool = _load(_pool_path())
+    tag = pool["warm"].get(key)
+    entry = pool["images"].get(tag) if tag else None
+    return dict(entry, tag=tag) if entry and _exists(tag) else None
+
+
+def register(tag: str, key: str, repo: Optional[str], commit_hash: str, donor: Optional[str] = None) -> None:
+    """Record that tag, a base image for key, was built or used now.
+
+    The first image built in full for a key becomes its warm image and is also tagged
+    warm:<key>; images built over a donor are charged only for what they add to it.
+    """
+    path = _pool_path()
+    with file_lock(path.with_suffix(".lock")):
+        pool = _load(path)
+        images = pool["images"]
+        entry = images.get(tag)
+        if entry is None:
+            size = image_size(tag)
+            if donor:
+                size = max(0, size - image_size(donor))
+            entry = images[tag] = {"key": key, "repo": repo, "commit": commit_hash, "size_bytes": size}
+        entry["last_used"] = time.time()
+        if donor in images:
+            images[donor]["last_used"] = entry["last_used"]
+        current = pool["warm"].get(key)
+        if not donor and current != tag and (current is None or not _exists(current)):
+            code, _, _ = run_command(["docker", "tag", tag, warm_tag(key)])
+            if code == 0:
+                pool["warm"][key] = tag
+        _store(path, pool)
+
+
+def evict(budget_bytes: int = POOL_BUDGET_BYTES, keep: Optional[str] = None) -> List[str]:
+    """Remove least recently used pool images until they fit budget_bytes; returns the tags removed."""
+    path = _pool_path()
+    evicted = []
+    with file_lock(path.with_suffix(".lock")):
+        pool = _load(path)
+        images = pool["images"]
+        total = sum(e["size_bytes"] for e in images.values())
+        now = time.time()
+        for tag, entry in sorted(images.items(), key=lambda item: item[1]["last_used"]):
+            if total <= budget_bytes:
+                break
+            if tag == keep or now - entry["last_used"] < IN_USE_SECONDS:
+                continue
+            warm = pool["warm"].get(entry["key"]) == tag
+            code, _, _ = run_command(["docker", "rmi", tag] + ([warm_tag(entry["key"])] if warm else []))
+            if code != 0 and _exists(tag):
+                # Still the parent of other images; it goes once they do.
+                continue
+            del images[tag]
+            if warm:
+                del pool["warm"][entry["key"]]
+            total -= entry["size_bytes"]
+            evicted.append(tag)
+        _store(path, pool)
+    return evicted
@@ -0,0 +1,161 @@
+from pathlib import Path
+from typing import Dict, List, Optional
+
+from commands import run_command
+from patch_model import parse_patch
+
+# path -> new content, or None for a deleted file; paths are relative to the base tree.
+Overlay = Dict[str, Optional[bytes]]
+
+
+def normalize_line_endings(data: bytes) -> bytes:
+    return data.replace(b"\r\n", b"\n")
+
+
+def find_block(lines: List[bytes], old: List[bytes], expected: int, start: int) -> Optional[int]:
+    """Where old occurs in lines at or after start, trying positions nearest expected first."""
+    # Trailing CRs are ignored, so a CRLF file and an LF patch (or the reverse) still match.
+    want = [line.rstrip(b"\r") for line in old]
+    last = len(lines) - len(want)
+    if not want:
+        return min(max(expected, start), max(last, start))
+    for delta in range(max(last, 0) + 1):
+        below, above = expected - delta, expected + delta
+        if below < start and above > last:
+            break
+        for pos in (below, above) if delta else (expected,):
+            if start <= pos <= last and all(lines[pos + i].rstrip(b"\r") == w for i, w in enumerate(want)):
+                return pos
+    return None
+
+
+def apply_to_overlay(data: bytes, base_dir: Path, overlay: Overlay, write: bool = True) -> Dict:
+    """Apply a unified diff with the pure-Python applier, reading through overlay onto base_dir.
+
+    base_dir is never modified: new contents go into overlay, and only when every hunk applies
+    (write=False just checks). Returns {"ok", "hunks", "errors"} with one entry per hunk.
+    """
+    hunks: List[Dict] = []
+    states: Dict[int, Dict] = {}
+
+    def read(path: str) -> Optional[bytes]:
+        if path in overlay:
+            return overlay[path]
+        target = base_dir / path
+        return target.read_bytes() if target.is_file() else None
+
+    def on_hunk(entry: Dict, hunk: Dict) -> None:
+        state = states.get(id(entry))
+        if state is None:
+            source = read(entry["old_path"]) if entry["old_path"] is not None else b""
+            state = states[id(entry)] = {
+                "lines": source.split(b"\n") if source is not None else None,
+                "delta": 0,
+                "next": 0,
+                "errors": [],
+            }
+            state["crlf"] = bool(state["lines"]) and any(line.endswith(b"\r") for line in state["lines"][:200])
+        record = {"file": entry["new_path"] or entry["old_path"], "header": hunk["header"], "ok": False, "offset": None}
+        hunks.append(record)
+        lines = state["lines"]
+        if lines is None:
+            record["error"] = "file does not exist"
+        else:
+            body = [(tag, text.encode("utf-8", "surrogateescape")) for tag, text in hunk["lines"]]
+            old = [text for tag, text in body if tag != "+"]
+            # Added lines follow the file's own line endings.
+            new = [text + b"\r" if state["crlf"] else text for tag, text in body if tag != "-"]
+            # A hunk with no old lines inserts after line old_start rather than at it.
+            expected = (hunk["old_start"] - 1 if old else hunk["old_start"]) + state["delta"]
+            pos = find_block(lines, old, max(expected, 0), state["next"])
+            if pos is None:
+                record["error"] = "context does not match"
+            else:
+                lines[pos:pos + len(old)] = new
+                state["delta"] += len(new) - len(old)
+                state["next"] = pos + len(new)
+                record.update(ok=True, offset=pos - expected)
+        if not record["ok"]:
+            state["errors"].append(f"{record['file']}: {hunk['header']}: {record['error']}")
+
+    files = parse_patch(data.decode("utf-8", "surrogateescape"), on_hunk=on_hunk)["files"]
+    changes: Overlay = {}
+    errors: List[str] = []
+    for entry in files:
+        state = states.get(id(entry))
+        if state and state["errors"]:
+            errors.extend(state["errors"])
+        elif entry["status"] == "added" and read(entry["new_path"]) is not None:
+            errors.append(f"{entry['new_path']}: already exists")
+        elif entry["status"] != "added" and read(entry["old_path"]) is None:
+            errors.append(f"{entry['old_path']}: does not exist")
+        elif entry["status"] == "deleted":
+            changes[entry["old_path"]] = None
+        else:
+            # No hunks means a mode-only change, a pure rename or a binary diff (left as is).
+            changes[entry["new_path"]] = b"\n".join(state["lines"]) if state else read(entry["old_path"]) if entry["old_path"] else b""
+            if entry["status"] == "renamed":
+                changes[entry["old_path"]] = None
+
+    if not errors and write:
+        overlay.update(changes)
+    return {"ok": not errors, "hunks": hunks, "errors": errors}
+
+
+def write_overlay(overlay: Overlay, repo_dir: Path) -> None:
+    for path, content in overlay.items():
+        target = repo_dir / path
+        if content is None:
+            if target.is_file() or target.is_symlink():
+                target.unlink()
+            continue
+        target.parent.mkdir(parents=True, exist_ok=True)
+        target.write_bytes(content)
+
+
+def git_apply(data: bytes, repo_dir: Path) -> Dict:
+    code, _, err = run_command(["git", "apply", "--index", "-"], cwd=str(repo_dir), input=data)
+    # -1 without a timeout means git could not be started at all.
+    no_git = code != 0 and ("outside a repository" in err or "not a git repository" in err or (code == -1 and err != "Command timed out"))
+    return {"ok": code == 0, "no_git": no_git, "error": err.strip()}
+
+
+def apply_patch(patch_path: Path, repo_dir: Path) -> Dict:
+    """Apply patch_path to the work tree at repo_dir in one pass; the patch file is only read.
+
+    A single `git apply --index` applies it, atomically. If that fails and the patch has CRLF
+    line endings, the LF-normalized bytes are tried once. When it still fails, the Python
+    applier reports which hunks do not apply; without git, the Python applier applies it.
+    Returns {"ok", "method", "normalized_crlf", "hunks", "errors"}.
+    """
+    data = patch_path.read_bytes()
+    result = {"ok": False, "method": "git", "normalized_crlf": False, "hunks": [], "errors": []}
+    attempt = git_apply(data, repo_dir)
+    if not attempt["ok"] and not attempt["no_git"] and b"\r\n" in data:
+        normalized = normalize_line_endings(data)
+        retry = git_apply(normalized, repo_dir)
+        if retry["ok"]:
+            data, attempt = normalized, retry
+            result["normalized_crlf"] = True
+    if attempt["ok"]:
+        result["ok"] = True
+        result["hunks"] = [
+            {"file": entry["path"], "header": hunk["header"], "ok": True, "offset": None}
+            for entry in parse_patch(data.decode("utf-8", "surrogateescape"))["files"]
+            for hunk in entry["hunks"]
+        ]
+        return result
+
+    overlay: Overlay = {}
+    applied = apply_to_overlay(data, repo_dir, overlay, write=attempt["no_git"])
+    result.update(hunks=applied["hunks"], errors=applied["errors"] or [attempt["error"]])
+    if attempt["no_git"]:
+        result["method"] = "python"
+        if applied["ok"]:
+            write_overlay(overlay, repo_dir)
+            result["ok"] = True
+    return result
+
+
+def failed_hunks(result: Dict) -> List[Dict]:
+    return [h for h in result["hunks"] if not h["ok"]]
@@ -0,0 +1,142 @@
+import io
+import re
+from pathlib import Path
+from typing import Callable, Dict, Iterator, Optional, Union
+
+PatchSource = Union[str, Path]
+HunkVisitor = Callable[[Dict, Dict], None]
+HeaderVisitor = Callable[[str], None]
+
+HUNK_HEADER = re.compile(r"^@@ -(\d+)(?:,(\d+))? \+(\d+)(?:,(\d+))? @@")
+GIT_HEADER = re.compile(r"^diff --git a/(.+?) b/(.+)$")
+
+
+def iter_lines(source: PatchSource) -> Iterator[str]:
+    if isinstance(source, Path):
+        with source.open(encoding="utf-8", errors="replace", newline="\n") as fh:
+            for line in fh:
+                yield line.rstrip("\r\n")
+    else:
+        for line in io.StringIO(source, newline="\n"):
+            yield line.rstrip("\r\n")
+
+
+def header_path(value: str) -> Optional[str]:
+    value = value.split("\t", 1)[0].strip()
+    if value == "/dev/null":
+        return None
+    if value[:2] in ("a/", "b/"):
+        return value[2:]
+    return value
+
+
+def new_file_entry() -> Dict:
+    return {"old_path": None, "new_path": None, "status": "modified", "hunks": [], "added": 0, "removed": 0}
+
+
+def finish_file(entry: Dict) -> None:
+    if entry["old_path"] is None and entry["new_path"] is not None:
+        entry["status"] = "added"
+    elif entry["new_path"] is None and entry["old_path"] is not None:
+        entry["status"] = "deleted"
+    elif entry["old_path"] != entry["new_path"]:
+        entry["status"] = "renamed"
+    entry["path"] = entry["new_path"] or entry["old_path"]
+
+
+def parse_patch(source: PatchSource, on_hunk: Optional[HunkVisitor] = None, on_header: Optional[HeaderVisitor] = None) -> Dict:
+    """Read a unified diff once, line by line.
+
+    Each hunk's lines are handed to on_hunk and then dropped, so memory stays bounded by the
+    largest hunk; the returned model keeps only paths, hunk headers and line counts. Lines
+    outside hunks (file headers, format-patch preamble) go to on_header.
+    """
+    files = []
+    current: Optional[Dict] = None
+    minus_seen = False
+    hunk: Optional[Dict] = None
+    old_left = new_left = 0
+
+    def close_hunk() -> None:
+        nonlocal hunk
+        if on_hunk:
+            on_hunk(current, hunk)
+        added = sum(1 for tag, _ in hunk["lines"] if tag == "+")
+        removed = sum(1 for tag, _ in hunk["lines"] if tag == "-")
+        compact = {k: v for k, v in hunk.items() if k != "lines"}
+        compact.update(added=added, removed=removed)
+        current["hunks"].append(compact)
+        current["added"] += added
+        current["removed"] += removed
+        hunk = None
+
+    def open_file() -> Dict:
+        nonlocal current, minus_seen
+        if current is not None:
+            finish_file(current)
+        current = new_file_entry()
+        files.append(current)
+        minus_seen = False
+        return current
+
+    for line in iter_lines(source):
+        if hunk is not None:
+            tag = line[:1] or " "
+            if (old_left > 0 or new_left > 0) and tag in " +-":
+                hunk["lines"].append((tag, line[1:]))
+                if tag != "+":
+                    old_left -= 1
+                if tag != "-":
+                    new_left -= 1
+                continue
+            if line.startswith("\\"):
+                continue
+            close_hunk()
+
+        m = HUNK_HEADER.match(line)
+        if m:
+            if current is None:
+                open_file()
+            old_left = int(m.group(2)) if m.group(2) is not None else 1
+            new_left = int(m.group(4)) if m.group(4) is not None else 1
+            hunk = {
+                "header": line,
+                "old_start": int(m.group(1)),
+                "old_count": old_left,
+                "new_start": int(m.group(3)),
+                "new_count": new_left,
+                "lines": [],
+            }
+            continue
+
+        if on_header:
+            on_header(line)
+        if line.startswith("diff --git "):
+            entry = open_file()
+            g = GIT_HEADER.match(line)
+            if g:
+                entry["old_path"], entry["new_path"] = g.group(1), g.group(2)
+        elif line.startswith("--- "):
+            entry = current if current is not None and not minus_seen else open_file()
+            entry["old_path"] = header_path(line[4:])
+            minus_seen = True
+        elif line.startswith("+++ ") and current is not None:
+            current["new_path"] = header_path(line[4:])
+        elif line.startswith("rename from ") and current is not None:
+            current["old_path"] = line[len("rename from "):]
+        elif line.startswith("rename to ") and current is not None:
+            current["new_path"] = line[len("rename to "):]
+        elif line.startswith("new file mode") and current is not None:
+            current["old_path"] = None
+        elif line.startswith("deleted file mode") and current is not None:
+            current["new_path"] = None
+
+    if hunk is not None:
+        close_hunk()
+    if current is not None:
+        finish_file(current)
+    return {
+        "files": files,
+        "added": sum(f["added"] for f in files),
+        "removed": sum(f["removed"] for f in files),
+    }
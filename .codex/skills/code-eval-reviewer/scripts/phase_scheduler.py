@@ -0,0 +1,55 @@
+import time
+from concurrent.futures import FIRST_COMPLETED, ThreadPoolExecutor, wait
+from typing import Any, Callable, Dict, List, Tuple
+
+import tracing
+
+Step = Tuple[Callable[[], Any], List[str]]
+
+
+def run_step(name: str, fn: Callable[[], Any], seconds: Dict[str, float]) -> Any:
+    started = time.perf_counter()
+    try:
+        with tracing.span(name, "phase"):
+            return fn()
+    finally:
+        seconds[name] = round(time.perf_counter() - started, 3)
+
+
+def run_phases(steps: Dict[str, Step], max_workers: int = 2) -> Dict[str, Dict]:
+    for name, (_, deps) in steps.items():
+        unknown = [d for d in deps if d not in steps]
+        if unknown:
+            raise ValueError(f"Phase {name} depends on unknown phases: {', '.join(unknown)}")
+
+    outcomes: Dict[str, Dict] = {}
+    seconds: Dict[str, float] = {}
+    remaining = dict(steps)
+    running: Dict = {}
+    with ThreadPoolExecutor(max_workers=max(1, max_workers), thread_name_prefix="phase") as pool:
+        while remaining or running:
+            progressed = True
+            while progressed:
+                progressed = False
+                for name, (fn, deps) in list(remaining.items()):
+                    if any(d in outcomes and not outcomes[d]["ok"] for d in deps):
+                        outcomes[name] = {"ok": False, "skipped": True, "error": "dependency failed"}
+                    elif all(d in outcomes for d in deps):
+                        running[pool.submit(run_step, name, fn, seconds)] = name
+                    else:
+                        continue
+                    del remaining[name]
+                    progressed = True
+            if not running:
+                for name in remaining:
+                    outcomes[name] = {"ok": False, "skipped": True, "error": "dependency cycle"}
+                break
+            done, _ = wait(running, return_when=FIRST_COMPLETED)
+            for future in done:
+                name = running.pop(future)
+                try:
+                    outcomes[name] = {"ok": True, "value": future.result()}
+                except Exception as e:
+                    outcomes[name] = {"ok": False, "error": str(e), "timed_out": isinstance(e, TimeoutError)}
+                outcomes[name]["seconds"] = seconds.get(name)
+    return outcomes
@@ -0,0 +1,72 @@
+import hashlib
+import json
+import os
+import threading
+import time
+from pathlib import Path
+from typing import Any, Dict, List, Optional
+
+from cache_dirs import cache_dir
+
+_session: Dict[str, Dict[str, int]] = {}
+
+
+def cache_key(*parts: Any) -> str:
+    digest = hashlib.sha256()
+    for part in parts:
+        data = part if isinstance(part, bytes) else str(part).encode("utf-8")
+        digest.update(f"{len(data)}:".encode("ascii"))
+        digest.update(data)
+    return digest.hexdigest()
+
+
+def entry_path(stage: str, key: str) -> Path:
+    return cache_dir("results") / stage / key[:2] / f"{key}.json"
+
+
+def record(stage: str, field: str) -> None:
+    counters = _session.setdefault(stage, {"hits": 0, "misses": 0, "stores": 0})
+    counters[field] += 1
+
+
+def get(stage: str, key: str, ttl: Optional[float] = None) -> Optional[Any]:
+    try:
+        entry = json.loads(entry_path(stage, key).read_text(encoding="utf-8"))
+    except (OSError, ValueError):
+        record(stage, "misses")
+        return None
+    if ttl is not None and time.time() - entry.get("created", 0) > ttl:
+        record(stage, "misses")
+        return None
+    record(stage, "hits")
+    return entry["value"]
+
+
+def put(stage: str, key: str, value: Any) -> None:
+    path = entry_path(stage, key)
+    path.parent.mkdir(parents=True, exist_ok=True)
+    tmp = path.with_suffix(f".{os.getpid()}.{threading.get_ident()}.tmp")
+    tmp.write_text(json.dumps({"created": time.time(), "value": value}), encoding="utf-8")
+    os.replace(tmp, path)
+    record(stage, "stores")
+
+
+def stats() -> Dict[str, Dict[str, int]]:
+    report: Dict[str, Dict[str, int]] = {}
+    root = cache_dir("results")
+    for stage_dir in sorted(p for p in root.iterdir() if p.is_dir()):
+        files = list(stage_dir.glob("*/*.json"))
+        report[stage_dir.name] = {"entries": len(files), "bytes": sum(f.stat().st_size for f in files)}
+    for stage, counters in _session.items():
+        report.setdefault(stage, {"entries": 0, "bytes": 0}).update(counters)
+    return report
+
+
+def format_stats(report: Dict[str, Dict[str, int]]) -> List[str]:
+    lines = ["Cache stats:"]
+    for stage, s in sorted(report.items()):
+        lines.append(
+            f"- {stage}: hits={s.get('hits', 0)} misses={s.get('misses', 0)} stores={s.get('stores', 0)} "
+            f"entries={s['entries']} size={s['bytes'] / 1024:.1f} KiB"
+        )
+    return lines
@@ -0,0 +1,374 @@
+#!/usr/bin/env python3
+"""
+Code Eval Reviewer - Review Daemon
+
+Usage:
+    python3 review_daemon.py [--socket PATH | --port N] [--workers N] [--prewarm N]
+
+Runs reviews for review_problem.py clients in one resident process, so the interpreter,
+imports, license list, compiled patterns and in-memory GitHub cache stay warm between them.
+While jobs wait in the queue, their base images are built ahead of them.
+"""
+
+import argparse
+import hmac
+import itertools
+import json
+import os
+import secrets
+import signal
+import socketserver
+import threading
+import time
+import traceback
+import uuid
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from pathlib import Path
+from typing import Dict, List, Optional
+from urllib.parse import parse_qs, urlsplit
+
+import daemon_client
+import result_cache
+from review_problem import ANALYZER_VERSION, extract_repo_info_from_setup, find_file, load_allowed_licenses, load_submission, prewarm_base_image, review_submission, write_result
+
+# Finished jobs whose status and result stay queryable.
+JOBS_KEPT = 200
+# Longest a status request may block with ?wait=.
+MAX_WAIT = 60
+# Fields of a job record that are not part of its status.
+RESULT_FIELDS = ("text", "result")
+
+
+def new_queue(workers: int, prewarm: int = 0) -> Dict:
+    return {
+        "cond": threading.Condition(),
+        "jobs": {},
+        "queued": [],
+        "running": {},
+        # repo -> sequence number of the last job of that repo to start.
+        "last_started": {},
+        "seq": itertools.count(1),
+        "workers": workers,
+        # Queued Docker jobs whose base image has not been pre-warmed yet.
+        "prewarm": [],
+        "prewarm_workers": prewarm,
+    }
+
+
+def job_repo(spec: Dict) -> str:
+    if spec.get("repo_url"):
+        return spec["repo_url"]
+    setup_file = find_file(Path(spec["problem_dir"]), ["setup.sh"])
+    repo_url = extract_repo_info_from_setup(setup_file)[0] if setup_file else None
+    return repo_url or spec["problem_dir"]
+
+
+def submit(queue: Dict, spec: Dict) -> Dict:
+    job = {
+        "id": uuid.uuid4().hex[:12],
+        "state": "queued",
+        "problem_dir": spec["problem_dir"],
+        "repo": job_repo(spec),
+        "priority": spec["priority"],
+        "submitted": time.time(),
+        "started": None,
+        "finished": None,
+        "output": None,
+        "json_output": None,
+        "decision": None,
+        "quality_score": None,
+        "error": None,
+        "prewarm": None,
+        "spec": spec,
+    }
+    with queue["cond"]:
+        job["seq"] = next(queue["seq"])
+        queue["jobs"][job["id"]] = job
+        queue["queued"].append(job)
+        if queue["prewarm_workers"] and not spec.get("skip_docker"):
+            job["prewarm"] = {"state": "pending"}
+            queue["prewarm"].append(job)
+        queue["cond"].notify_all()
+    return job
+
+
+def pick(queue: Dict, jobs: Optional[List[Dict]] = None) -> Dict:
+    """The queued job (of jobs, by default all) to start next: highest priority, then the repo
+    with the fewest running jobs, then the repo that least recently had a job start, then
+    submission order."""
+    running_per_repo: Dict[str, int] = {}
+    for job in queue["running"].values():
+        running_per_repo[job["repo"]] = running_per_repo.get(job["repo"], 0) + 1
+    return min(
+        queue["queued"] if jobs is None else jobs,
+        key=lambda job: (
+            -job["priority"],
+            running_per_repo.get(job["repo"], 0),
+            queue["last_started"].get(job["repo"], 0),
+            job["seq"],
+        ),
+    )
+
+
+def take(queue: Dict) -> Dict:
+    with queue["cond"]:
+        while not queue["queued"]:
+            queue["cond"].wait()
+        job = pick(queue)
+        queue["queued"].remove(job)
+        if job in queue["prewarm"]:
+            # Started before its turn to be pre-warmed; the review builds the image itself.
+            queue["prewarm"].remove(job)
+            job["prewarm"] = {"state": "skipped"}
+        queue["running"][job["id"]] = job
+        queue["last_started"][job["repo"]] = next(queue["seq"])
+        job.update(state="running", started=time.time())
+        return job
+
+
+def finish(queue: Dict, job: Dict, **fields) -> None:
+    with queue["cond"]:
+        job.update(fields, finished=time.time())
+        queue["running"].pop(job["id"], None)
+        done = [j for j in queue["jobs"].values() if j["state"] in ("done", "failed")]
+        for old in sorted(done, key=lambda j: j["finished"])[:-JOBS_KEPT]:
+            del queue["jobs"][old["id"]]
+        queue["cond"].notify_all()
+
+
+def take_prewarm(queue: Dict) -> Dict:
+    """The queued job to pre-warm next, in the order the workers will start them."""
+    with queue["cond"]:
+        while not queue["prewarm"]:
+            queue["cond"].wait()
+        job = pick(queue, queue["prewarm"])
+        queue["prewarm"].remove(job)
+        job["prewarm"] = {"state": "running"}
+        return job
+
+
+def prewarmer(queue: Dict) -> None:
+    while True:
+        job = take_prewarm(queue)
+        spec = job["spec"]
+        try:
+            outcome = prewarm_base_image(Path(spec["problem_dir"]), spec.get("repo_url"), spec.get("commit"))
+        except Exception as e:
+            traceback.print_exc()
+            outcome = {"image": None, "source": None, "error": f"{type(e).__name__}: {e}"}
+        with queue["cond"]:
+            job["prewarm"] = dict(outcome, state="failed" if outcome["error"] else "done")
+            queue["cond"].notify_all()
+
+
+def run_job(spec: Dict) -> Dict:
+    problem_dir = Path(spec["problem_dir"])
+    submission = load_submission(problem_dir, spec.get("repo_url"), spec.get("commit"))
+    index_path = Path(spec["index_path"]) if spec.get("index_path") else None
+    review = review_submission(submission, spec.get("skip_docker", False), spec.get("docker_options") or {}, spec.get("use_cache", True), index_path)
+    output_path = problem_dir / spec.get("output", "feedback.md")
+    output_path.write_text(review["text"], encoding="utf-8")
+    json_path = write_result(output_path, review) if spec.get("json", True) else None
+    return {
+        "output": str(output_path),
+        "json_output": str(json_path) if json_path else None,
+        "decision": review["decision"],
+        "quality_score": review["quality_score"],
+        "text": review["text"],
+        "result": review["result"],
+    }
+
+
+def worker(queue: Dict) -> None:
+    while True:
+        job = take(queue)
+        try:
+            finish(queue, job, state="done", **run_job(job["spec"]))
+        except FileNotFoundError as e:
+            finish(queue, job, state="failed", error=str(e))
+        except Exception as e:
+            traceback.print_exc()
+            finish(queue, job, state="failed", error=f"{type(e).__name__}: {e}")
+
+
+def job_status(queue: Dict, job: Dict) -> Dict:
+    status = {k: v for k, v in job.items() if k not in RESULT_FIELDS and k not in ("spec", "seq")}
+    if job["state"] == "queued":
+        order = sorted(queue["queued"], key=lambda j: (-j["priority"], j["seq"]))
+        status["position"] = order.index(job) + 1
+    return status
+
+
+class Handler(BaseHTTPRequestHandler):
+    server_version = "code-eval-reviewer"
+
+    def log_message(self, format: str, *args) -> None:
+        # Clients poll; per-request logging would drown out review errors.
+        pass
+
+    def reply(self, status: int, body: Dict) -> None:
+        data = json.dumps(body).encode("utf-8")
+        self.send_response(status)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(data)))
+        self.end_headers()
+        self.wfile.write(data)
+
+    def authorized(self) -> bool:
+        """Whether the request carries the server's token; servers without one are Unix sockets."""
+        token = self.server.token
+        if token is None:
+            return True
+        if hmac.compare_digest(self.headers.get("Authorization", ""), f"Bearer {token}"):
+            return True
+        self.reply(401, {"error": "missing or wrong token"})
+        return False
+
+    def do_GET(self) -> None:
+        if not self.authorized():
+            return
+        queue = self.server.queue
+        url = urlsplit(self.path)
+        parts = [p for p in url.path.split("/") if p]
+        if parts == ["health"]:
+            with queue["cond"]:
+                body = {
+                    "ok": True,
+                    "pid": os.getpid(),
+                    "analyzer": ANALYZER_VERSION,
+                    "workers": queue["workers"],
+                    "queued": len(queue["queued"]),
+                    "running": len(queue["running"]),
+                    "prewarm_workers": queue["prewarm_workers"],
+                    "prewarm_pending": len(queue["prewarm"]),
+                }
+            self.reply(200, body)
+        elif parts == ["stats"]:
+            self.reply(200, result_cache.stats())
+        elif parts == ["jobs"]:
+            with queue["cond"]:
+                body = {"jobs": [job_status(queue, j) for j in queue["jobs"].values()]}
+            self.reply(200, body)
+        elif len(parts) == 2 and parts[0] == "jobs" or len(parts) == 3 and parts[0] == "jobs" and parts[2] == "result":
+            try:
+                wait = min(MAX_WAIT, float(parse_qs(url.query).get("wait", ["0"])[0]))
+            except ValueError:
+                self.reply(400, {"error": "wait must be a number of seconds"})
+                return
+            deadline = time.monotonic() + wait
+            with queue["cond"]:
+                job = queue["jobs"].get(parts[1])
+                while job and job["state"] in ("queued", "running") and time.monotonic() < deadline:
+                    queue["cond"].wait(deadline - time.monotonic())
+                if job is None:
+                    status, body = 404, {"error": f"unknown job {parts[1]}"}
+                elif len(parts) == 2:
+                    status, body = 200, job_status(queue, job)
+                elif job["state"] != "done":
+                    status, body = 409, {"error": f"job is {job['state']}", "state": job["state"]}
+                else:
+                    status, body = 200, {k: job[k] for k in ("output", "json_output", "decision", "quality_score", "text", "result")}
+            self.reply(status, body)
+        else:
+            self.reply(404, {"error": f"unknown path {url.path}"})
+
+    def do_POST(self) -> None:
+        if not self.authorized():
+            return
+        if urlsplit(self.path).path.rstrip("/") != "/jobs":
+            self.reply(404, {"error": f"unknown path {self.path}"})
+            return
+        try:
+            spec = json.loads(self.rfile.read(int(self.headers.get("Content-Length", 0))))
+            spec["priority"] = int(spec.get("priority", 0))
+            if not Path(spec["problem_dir"]).is_dir():
+                raise ValueError(f"Problem directory not found: {spec['problem_dir']}")
+        except (ValueError, KeyError, TypeError) as e:
+            self.reply(400, {"error": str(e)})
+            return
+        queue = self.server.queue
+        job = submit(queue, spec)
+        with queue["cond"]:
+            body = job_status(queue, job)
+        self.reply(202, body)
+
+
+class UnixHTTPServer(socketserver.ThreadingMixIn, socketserver.UnixStreamServer):
+    daemon_threads = True
+
+    def get_request(self):
+        # BaseHTTPRequestHandler expects a (host, port) client address.
+        request, _ = super().get_request()
+        return request, ("local", 0)
+
+
+def bind_socket(path: Path) -> UnixHTTPServer:
+    if path.exists():
+        if daemon_client.health(str(path)):
+            raise SystemExit(f"Error: a review daemon is already listening on {path}")
+        # Left behind by a daemon that did not shut down cleanly.
+        path.unlink()
+    old_umask = os.umask(0o077)
+    try:
+        return UnixHTTPServer(str(path), Handler)
+    finally:
+        os.umask(old_umask)
+
+
+def write_token(path: Path) -> str:
+    token = secrets.token_urlsafe(32)
+    path.unlink(missing_ok=True)
+    fd = os.open(str(path), os.O_WRONLY | os.O_CREAT | os.O_EXCL, 0o600)
+    with os.fdopen(fd, "w", encoding="utf-8") as fh:
+        fh.write(token + "\n")
+    return token
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Resident review service for review_problem.py")
+    parser.add_argument("--socket", help="Unix socket to listen on (default: daemon/review.sock under the cache dir)")
+    parser.add_argument("--port", type=int, help="Listen on 127.0.0.1:PORT over HTTP instead of a Unix socket; clients must send the token written to daemon/token-PORT")
+    parser.add_argument("--workers", type=int, default=2, help="Reviews run at once")
+    parser.add_argument("--prewarm", type=int, default=1, help="Base images built ahead of queued reviews at once (0 disables)")
+    args = parser.parse_args()
+
+    socket_path = None
+    token_path = None
+    if args.port:
+        server = ThreadingHTTPServer(("127.0.0.1", args.port), Handler)
+        address = f"http://127.0.0.1:{server.server_address[1]}"
+        # Any local user can reach a TCP port, so requests must carry a token that only
+        # this user can read.
+        token_path = daemon_client.token_path(server.server_address[1])
+        server.token = write_token(token_path)
+    else:
+        socket_path = Path(args.socket) if args.socket else daemon_client.default_socket()
+        server = bind_socket(socket_path)
+        server.token = None
+        address = str(socket_path)
+    server.queue = new_queue(max(1, args.workers), max(0, args.prewarm))
+    # Warm what every review reads before the first job arrives.
+    load_allowed_licenses()
+    for n in range(server.queue["workers"]):
+        threading.Thread(target=worker, args=(server.queue,), name=f"review-{n + 1}", daemon=True).start()
+    for n in range(server.queue["prewarm_workers"]):
+        threading.Thread(target=prewarmer, args=(server.queue,), name=f"prewarm-{n + 1}", daemon=True).start()
+
+    signal.signal(signal.SIGTERM, lambda *_: threading.Thread(target=server.shutdown).start())
+    print(f"Review daemon listening on {address} ({server.queue['workers']} workers, {server.queue['prewarm_workers']} pre-warming)", flush=True)
+    if token_path is not None:
+        print(f"Clients authenticate with the token in {token_path}", flush=True)
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        pass
+    finally:
+        server.server_close()
+        if socket_path is not None:
+            socket_path.unlink(missing_ok=True)
+        if token_path is not None:
+            token_path.unlink(missing_ok=True)
+
+
+if __name__ == "__main__":
+    main()
@@ -4,29 +4,61 @@ Code Eval Reviewer - Automated Problem Review Script
 
 Usage:
     python3 review_problem.py <problem-dir> [--repo-url URL] [--commit HASH] [--skip-docker]
+        [--phase-concurrency N] [--container-cpus N] [--container-memory SIZE]
+        [--no-cache] [--cache-stats] [--similarity-index PATH] [--no-similarity-index]
+        [--no-trace] [--chrome-trace]
 """
 
 import argparse
+import hashlib
 import json
 import os
+import random
 import re
 import shutil
-import subprocess
-import tempfile
+import time
+import uuid
+from collections import Counter
+from concurrent.futures import ThreadPoolExecutor
+from contextlib import closing
 from datetime import datetime, timezone
+from functools import lru_cache
+from itertools import chain
 from pathlib import Path
-from typing import Dict, List, Optional, Tuple
-from urllib.request import Request, urlopen
-
-
-def run_command(cmd: List[str], cwd: Optional[str] = None, capture: bool = True, timeout: int = 300) -> Tuple[int, str, str]:
-    try:
-        result = subprocess.run(cmd, cwd=cwd, capture_output=capture, text=True, timeout=timeout)
-        return result.returncode, result.stdout, result.stderr
-    except subprocess.TimeoutExpired:
-        return -1, "", "Command timed out"
-    except Exception as e:
-        return -1, "", str(e)
+from typing import Callable, Dict, List, Optional, Tuple
+
+import clone_cache
+import daemon_client
+import github_client
+import host_scheduler
+import image_cache
+import patch_engine
+import patch_model
+import phase_scheduler
+import result_cache
+import review_schema
+import review_state
+import runner_summary
+import similarity_index
+import test_results
+import timing_history
+import tracing
+import worktrees
+from cache_dirs import cache_dir, file_lock
+from commands import stream_command
+from patch_model import PatchSource
+from text_engine import document, profile_similarity, token_profile, tokenize
+
+# Cached analyzer results are only valid for the code that produced them, which spans every
+# module next to this one (text_engine, test_results, patch_model, similarity_*, ...).
+def scripts_version() -> str:
+    digest = hashlib.sha256()
+    for path in sorted(Path(__file__).resolve().parent.glob("*.py")):
+        digest.update(path.name.encode("utf-8") + b"\0" + hashlib.sha256(path.read_bytes()).digest())
+    return digest.hexdigest()[:16]
+
+
+ANALYZER_VERSION = scripts_version()
 
 
 def read_text(path: Path) -> str:
@@ -57,138 +89,57 @@ def find_files(directory: Path, names: List[str]) -> List[Path]:
     return list(dict.fromkeys(found))
 
 
-def count_words(text: str) -> int:
-    text = re.sub(r"```[\s\S]*?```", "", text)
-    text = re.sub(r"`[^`]+`", "", text)
-    text = re.sub(r"[#*_\[\]()>-]", " ", text)
-    words = text.split()
-    return len(words)
-
-
-def tokenize(text: str) -> List[str]:
-    text = text.lower()
-    tokens = re.findall(r"[a-z0-9_]+", text)
-    stop = {
-        "the", "and", "or", "to", "of", "a", "an", "is", "are", "be", "in", "on",
-        "for", "with", "by", "as", "at", "from", "that", "this", "it", "its", "if",
-        "then", "else", "when", "while", "should", "must", "shall", "may", "can",
-        "not", "no", "yes", "do", "does", "did", "done", "into", "out", "up", "down",
-    }
-    return [t for t in tokens if t not in stop and len(t) > 2]
-
-
-def sentences(text: str) -> List[str]:
-    return [s.strip() for s in re.split(r"[.!?]\s+", text) if s.strip()]
-
-
-def requirement_sentences(text: str) -> List[str]:
-    req = []
-    for s in sentences(text):
-        if re.search(r"\b(must|should|shall|needs to|required to|must not|should not)\b", s, re.IGNORECASE):
-            req.append(s)
-    return req
-
-
-def split_compound_requirements(sentences: List[str]) -> List[str]:
-    parts = []
-    for s in sentences:
-        chunks = re.split(r"\b(and|or|,|;)\b", s)
-        for c in chunks:
-            c = c.strip()
-            if len(c) > 8 and re.search(r"\b(must|should|shall|needs to|required to|must not|should not)\b", c, re.IGNORECASE):
-                parts.append(c)
-    return parts or sentences
-
-
 def find_implied_contracts(text: str) -> List[str]:
     implied = []
-    patterns = [
-        r"\binvariant\b",
-        r"\bmust\s+reach\b",
-        r"\bmay\s+reach\b",
-        r"\bdefinitions\b",
-        r"\bcontract\b",
-        r"\bimplies\b",
-    ]
-    if any(re.search(p, text, re.IGNORECASE) for p in patterns):
-        if not re.search(r"\bdefines?\s+the\s+definitions?\s+field\b", text, re.IGNORECASE):
-            implied.append("Implied contract: definitions field behavior is not explicitly defined.")
+    flags = document(text)["flags"]
+    if flags["contract_language"] and not flags["definitions_field"]:
+        implied.append("Implied contract: definitions field behavior is not explicitly defined.")
     return implied
 
 
 def find_schema_prescription(text: str) -> List[str]:
     issues = []
-    schema_patterns = [
-        r"\bdataclass\b",
-        r"\bfrozen\b",
-        r"\bschema\b",
-        r"\bfield(s)?\b",
-        r"\btyped?\b",
-        r"\bstruct\b",
-        r"\bclass\s+name\b",
-    ]
-    if any(re.search(p, text, re.IGNORECASE) for p in schema_patterns):
+    if document(text)["flags"]["schema"]:
         issues.append("Spec appears to prescribe internal schema/structure details.")
     return issues
 
 
-def extract_test_cases(test_patch: str) -> List[str]:
-    cases = []
-    for m in re.findall(r"def (test_[\\w_]+)\\s*\\(", test_patch):
-        cases.append(m.replace("_", " "))
-    for m in re.findall(r"\\btest\\(\\s*['\\\"]([^'\\\"]+)['\\\"]", test_patch):
-        cases.append(m)
-    for m in re.findall(r"\\bit\\(\\s*['\\\"]([^'\\\"]+)['\\\"]", test_patch):
-        cases.append(m)
-    for m in re.findall(r"\\bfunc\\s+(Test\\w+)\\s*\\(", test_patch):
-        cases.append(m)
-    return cases
+def extract_test_cases(test_patch: PatchSource) -> List[str]:
+    return scan_patch(test_patch)["test_cases"]
 
 
-def spec_test_alignment(contracts: List[str], test_cases: List[str], test_patch: str) -> List[str]:
+def spec_test_alignment(contracts: List[str], test_cases: List[str], asserts_counts: bool) -> List[str]:
     issues = []
     if not contracts or not test_cases:
         return issues
-    contract_tokens = [set(tokenize(c)) for c in contracts]
+    # Token -> contracts containing it, so each test case only counts the contracts it shares
+    # a token with instead of intersecting against every contract.
+    postings: Dict[str, List[int]] = {}
+    for idx, contract in enumerate(contracts):
+        for token in set(tokenize(contract)):
+            postings.setdefault(token, []).append(idx)
     for case in test_cases:
         tokens = set(tokenize(case))
         if not tokens:
             continue
-        overlap = max((len(tokens & ct) / max(1, len(tokens))) for ct in contract_tokens)
+        shared = Counter(chain.from_iterable(postings.get(token, ()) for token in tokens))
+        overlap = max(shared.values(), default=0) / len(tokens)
         if overlap < 0.2:
             issues.append(f"Test case may not map to an explicit contract: {case}")
             break
-    if re.search(r"assert\\s+len\\(", test_patch) or re.search(r"assertEqual\\(len\\(", test_patch):
+    if asserts_counts:
         issues.append("Tests assert specific counts that may depend on unspecified semantics.")
     return issues
 
 
 def ambiguity_checks(text: str) -> List[str]:
     issues = []
-    ambiguous_terms = [
-        "path-sensitive", "path sensitive", "may", "must", "order", "duplicate", "empty",
-        "undefined", "unspecified", "implied", "invariant",
-    ]
-    if any(term in text.lower() for term in ambiguous_terms):
-        if not re.search(r"\bexplicitly\b|\bdefined\b|\bclarify\b", text, re.IGNORECASE):
-            issues.append("Spec contains potentially ambiguous semantics without explicit clarification.")
+    flags = document(text)["flags"]
+    if flags["ambiguous_semantics"] and not flags["clarified"]:
+        issues.append("Spec contains potentially ambiguous semantics without explicit clarification.")
     return issues
 
 
-def identifier_tokens(text: str) -> List[str]:
-    tokens = []
-    tokens += re.findall(r"`([^`]+)`", text)
-    tokens += re.findall(r"\b[a-zA-Z_][a-zA-Z0-9_]*\b", text)
-    tokens += re.findall(r"\b[a-z]+[A-Z][a-zA-Z0-9]*\b", text)
-    return tokenize(" ".join(tokens))
-
-
-def jaccard(a: List[str], b: List[str]) -> float:
-    sa, sb = set(a), set(b)
-    if not sa and not sb:
-        return 0.0
-    return len(sa & sb) / max(1, len(sa | sb))
-
 def extract_repo_info_from_setup(setup_path: Path) -> Tuple[Optional[str], Optional[str]]:
     text = read_text(setup_path)
     url_match = re.search(r"https?://github\.com/[\w.-]+/[\w.-]+", text)
@@ -223,90 +174,96 @@ def parse_similar_problems_section(text: str) -> List[str]:
 
 
 def similarity_metrics(p1: str, p2: str) -> Dict[str, float]:
-    all_tokens = tokenize(p1)
-    all_tokens_2 = tokenize(p2)
-    req_tokens = tokenize(" ".join(requirement_sentences(p1)))
-    req_tokens_2 = tokenize(" ".join(requirement_sentences(p2)))
-    impl_tokens = identifier_tokens(p1)
-    impl_tokens_2 = identifier_tokens(p2)
-    return {
-        "behavioural": jaccard(req_tokens, req_tokens_2) * 100,
-        "implementation": jaccard(impl_tokens, impl_tokens_2) * 100,
-        "requirement": jaccard(all_tokens, all_tokens_2) * 100,
-    }
+    return profile_similarity(token_profile(p1), token_profile(p2))
+
+
+def similarity_comparison(against: str, metrics: Dict[str, float], previously_reviewed: bool = False) -> Dict:
+    return {"against": against, "previously_reviewed": previously_reviewed, **metrics}
 
 
-def detect_similarity(main_text: str, others: List[str]) -> Tuple[bool, List[str]]:
-    reports = []
+def format_similarity(comparison: Dict) -> str:
+    against = comparison["against"] + (" (previously reviewed)" if comparison["previously_reviewed"] else "")
+    return (
+        f"P1 vs {against}: behavioural={comparison['behavioural']:.1f}%, "
+        f"implementation={comparison['implementation']:.1f}%, "
+        f"requirement={comparison['requirement']:.1f}%"
+    )
+
+
+@tracing.traced("analyzer")
+def detect_similarity(main_text: str, others: List[str]) -> Tuple[bool, List[Dict]]:
+    comparisons = []
     for idx, text in enumerate(others, start=2):
         metrics = similarity_metrics(main_text, text)
-        report = (
-            f"P1 vs P{idx}: behavioural={metrics['behavioural']:.1f}%, "
-            f"implementation={metrics['implementation']:.1f}%, "
-            f"requirement={metrics['requirement']:.1f}%"
-        )
-        reports.append(report)
+        comparisons.append(similarity_comparison(f"P{idx}", metrics))
         if any(m >= 60.0 for m in metrics.values()):
-            return True, reports
-    return False, reports
-
-
-def github_api_get(url: str) -> Optional[Dict]:
-    try:
-        req = Request(url, headers={"Accept": "application/vnd.github+json", "User-Agent": "code-eval-reviewer"})
-        with urlopen(req, timeout=20) as resp:
-            return json.loads(resp.read().decode("utf-8"))
-    except Exception:
-        return None
+            return True, comparisons
+    return False, comparisons
 
 
+@lru_cache(maxsize=1)
 def load_allowed_licenses() -> List[str]:
     try:
         path = Path(__file__).resolve().parent.parent / "references" / "allowed-licenses.md"
         if not path.exists():
             return []
         text = read_text(path)
-        ids = set(re.findall(r"\\(([A-Za-z0-9.\\-]+)\\)", text))
+        ids = set(re.findall(r"\(([A-Za-z0-9.\-]+)\)", text))
         for line in text.splitlines():
             line = line.strip()
             if line.startswith("- "):
                 token = line[2:].split()[0].strip("()")
-                if re.match(r"^[A-Za-z0-9.\\-]+$", token):
+                if re.match(r"^[A-Za-z0-9.\-]+$", token):
                     ids.add(token)
         return sorted(ids)
     except Exception:
         return []
 
 
-def validate_repo(repo_url: Optional[str], description_text: str) -> Dict:
+@tracing.traced("stage")
+def validate_repo(repo_url: Optional[str], description_text: str, use_cache: bool = True) -> Dict:
     result = {
         "ok": True,
         "issues": [],
         "notes": [],
         "owner_repo": None,
         "reject_reasons": [],
+        # The reject reasons that are hard requirements (stars, language, license, activity,
+        # PR reference): decisive enough to skip the Docker runs.
+        "hard_failures": [],
+        "unavailable": [],
     }
-    if not repo_url or "github.com" not in repo_url:
+
+    def reject(message: str, hard: bool = False) -> None:
         result["ok"] = False
-        result["issues"].append("Missing or invalid GitHub URL")
-        result["reject_reasons"].append("Missing or invalid GitHub URL")
+        result["issues"].append(message)
+        result["reject_reasons"].append(message)
+        if hard:
+            result["hard_failures"].append(message)
+
+    if not repo_url or "github.com" not in repo_url:
+        reject("Missing or invalid GitHub URL")
         return result
 
     m = re.search(r"github\.com/([^/]+)/([^/]+)", repo_url)
     if not m:
-        result["ok"] = False
-        result["issues"].append("Unable to parse GitHub owner/repo")
-        result["reject_reasons"].append("Unable to parse GitHub owner/repo")
+        reject("Unable to parse GitHub owner/repo")
         return result
 
     owner, repo = m.group(1), m.group(2)
     result["owner_repo"] = f"{owner}/{repo}"
 
-    repo_info = github_api_get(f"https://api.github.com/repos/{owner}/{repo}")
-    if not repo_info:
+    try:
+        repo_info = github_client.get_json(f"repos/{owner}/{repo}", use_cache)
+    except github_client.GitHubError as e:
         result["ok"] = False
-        result["issues"].append("GitHub API lookup failed")
-        result["reject_reasons"].append("GitHub API lookup failed")
+        if e.status in (404, 410, 451):
+            reject(f"GitHub repository not found ({e})")
+            return result
+        # Throttling, network, auth and 5xx failures say nothing about the repository: its
+        # requirements went unchecked, which a rerun settles.
+        result["notes"].append(f"GitHub API lookup unavailable ({e})")
+        result["unavailable"].append(f"GitHub API lookup unavailable ({e}); repository requirements not checked")
         return result
 
     stars = repo_info.get("stargazers_count", 0)
@@ -321,86 +278,62 @@ def validate_repo(repo_url: Optional[str], description_text: str) -> Dict:
     result["notes"].append(f"Last push: {pushed_at}")
 
     if stars < 500:
-        result["ok"] = False
-        result["issues"].append("Repository has fewer than 500 stars")
-        result["reject_reasons"].append("Repository has fewer than 500 stars")
+        reject("Repository has fewer than 500 stars", hard=True)
 
     allowed_langs = {"TypeScript", "JavaScript", "Python", "Go", "Rust"}
     if language not in allowed_langs:
-        result["ok"] = False
-        result["issues"].append("Repository language not in allowed list")
-        result["reject_reasons"].append("Repository language not in allowed list")
+        reject("Repository language not in allowed list", hard=True)
 
     allowed = set(load_allowed_licenses())
     if license_id in {"NOASSERTION", "", "Other"}:
-        result["ok"] = False
-        result["issues"].append("Missing or non-permissive license")
-        result["reject_reasons"].append("Missing or non-permissive license")
+        reject("Missing or non-permissive license", hard=True)
     elif allowed and license_id not in allowed:
-        result["ok"] = False
-        result["issues"].append(f"License not in allowed list ({license_id})")
-        result["reject_reasons"].append(f"License not in allowed list ({license_id})")
+        reject(f"License not in allowed list ({license_id})", hard=True)
 
     if pushed_at:
         try:
             last_push = datetime.fromisoformat(pushed_at.replace("Z", "+00:00"))
             age_days = (datetime.now(timezone.utc) - last_push).days
             if age_days > 365:
-                result["ok"] = False
-                result["issues"].append("Repository inactive (no commits in 12 months)")
-                result["reject_reasons"].append("Repository inactive (no commits in 12 months)")
+                reject("Repository inactive (no commits in 12 months)", hard=True)
         except Exception:
             result["issues"].append("Could not parse last push date")
 
     if re.search(r"github\.com/[^/]+/[^/]+/pull/\d+", description_text):
-        result["ok"] = False
-        result["issues"].append("Description references an existing PR")
-        result["reject_reasons"].append("Description references an existing PR")
+        reject("Description references an existing PR", hard=True)
 
     keywords = tokenize(description_text)[:6]
     if keywords:
         q = "+".join(keywords[:4])
-        search_url = f"https://api.github.com/search/issues?q=repo:{owner}/{repo}+type:pr+{q}"
-        search = github_api_get(search_url)
+        try:
+            search = github_client.get_json(f"search/issues?q=repo:{owner}/{repo}+type:pr+{q}", use_cache)
+        except github_client.GitHubError:
+            search = None
         if search and search.get("total_count", 0) > 0:
             top = search.get("items", [])[:3]
             titles = [item.get("title", "") for item in top]
             if any(sum(1 for k in keywords if k in t.lower()) >= 3 for t in titles):
-                result["ok"] = False
-                result["issues"].append("Potential matching PR found by keyword search")
-                result["reject_reasons"].append("Potential matching PR found by keyword search")
+                reject("Potential matching PR found by keyword search")
 
     return result
 
 
+@tracing.traced("analyzer")
 def analyze_problem(text: str) -> Dict:
-    word_count = count_words(text)
+    doc = document(text)
+    flags = doc["flags"]
+    word_count = doc["word_count"]
     issues = []
 
-    ambiguous_terms = [
-        "maybe", "probably", "approximately", "around", "as needed", "as appropriate",
-        "if possible", "etc", "and so on", "ideally", "best effort", "reasonable",
-    ]
-    prescriptive_patterns = [
-        r"must be called \w+",
-        r"located? (?:at|in) [\w/\.]+",
-        r"return type",
-        r"step \d",
-        r"algorithm",
-        r"implement using",
-    ]
-    scope_blowup = ["rewrite", "entire", "whole system", "from scratch"]
-    repo_philosophy_violations = ["new framework", "different framework", "ignore existing", "custom runtime"]
-
-    req_complete = not re.search(r"\b(see|refer to|as described in)\b", text, re.IGNORECASE) and not re.search(r"\b(TBD|TODO|WIP)\b", text)
+    req_complete = not flags["external_reference"] and not flags["placeholder"]
     if not req_complete:
         issues.append("Requirements are not fully self-contained")
 
-    no_ambiguity = not any(term in text.lower() for term in ambiguous_terms)
+    no_ambiguity = not flags["ambiguous_language"]
     if not no_ambiguity:
         issues.append("Ambiguous language present")
 
-    prescriptive = any(re.search(p, text, re.IGNORECASE) for p in prescriptive_patterns)
+    prescriptive = flags["prescriptive"]
     concise = word_count <= 250
     concise_not_prescriptive = concise and not prescriptive
     if not concise:
@@ -408,20 +341,19 @@ def analyze_problem(text: str) -> Dict:
     if prescriptive:
         issues.append("Problem description is prescriptive")
 
-    matches_scope = not any(term in text.lower() for term in scope_blowup)
+    matches_scope = not flags["scope_blowup"]
     if not matches_scope:
         issues.append("Problem scope feels too large")
 
-    aligns_philosophy = not any(term in text.lower() for term in repo_philosophy_violations)
+    aligns_philosophy = not flags["philosophy_violation"]
     if not aligns_philosophy:
         issues.append("Problem conflicts with repo design philosophy")
 
-    no_irrelevant = word_count <= 250 and not re.search(r"\b(background|story|narrative)\b", text, re.IGNORECASE)
+    no_irrelevant = word_count <= 250 and not flags["narrative"]
     if not no_irrelevant:
         issues.append("Contains irrelevant context")
 
-    has_structure = bool(re.search(r"^#+\s+|\n\s*[-*]\s+", text, re.MULTILINE))
-    clear_writing = has_structure or word_count <= 200
+    clear_writing = flags["structured"] or word_count <= 200
     if not clear_writing:
         issues.append("Writing/formatting is hard to scan")
 
@@ -447,25 +379,25 @@ def analyze_problem(text: str) -> Dict:
         "word_count": word_count,
         "issues": issues,
         "checks": checks,
-        "contracts": split_compound_requirements(requirement_sentences(text)),
+        "contracts": list(doc["contracts"]),
     }
 
 
-def test_case_count(test_patch: str) -> int:
-    patterns = [
-        r"def test_\w+\s*\(",
-        r"\btest\(\s*['\"]",
-        r"\bit\(\s*['\"]",
-        r"\bfunc Test\w+\s*\(",
-        r"#\[test\]",
-    ]
-    count = 0
-    for p in patterns:
-        count += len(re.findall(p, test_patch))
-    return count
+def test_case_count(test_patch: PatchSource) -> int:
+    return scan_patch(test_patch)["test_case_count"]
 
 
-def analyze_tests(test_patch: str, desc_text: str, repo_dir: Optional[Path], docker_results: Dict) -> Dict:
+def find_test_dirs(repo_dir: Path) -> List[str]:
+    test_dirs = set()
+    for root, dirs, files in os.walk(repo_dir):
+        for d in dirs:
+            if d.lower() in {"tests", "test", "__tests__", "spec"}:
+                test_dirs.add((Path(root) / d).relative_to(repo_dir).as_posix())
+    return sorted(test_dirs)
+
+
+@tracing.traced("analyzer")
+def analyze_tests(test_patch: PatchSource, desc_text: str, repo_dir: Optional[Path], docker_results: Dict, scan: Optional[Dict] = None) -> Dict:
     issues = []
     checks = []
 
@@ -483,68 +415,73 @@ def analyze_tests(test_patch: str, desc_text: str, repo_dir: Optional[Path], doc
         issues.append("test.patch missing")
         return {"checks": checks, "issues": issues}
 
+    scan = scan or scan_patch(test_patch)
+    matrix = docker_results.get("test_matrix") or {}
+    new_cells = matrix.get("new")
     exposes_missing = docker_results.get("new_only_fail", False)
-    if not exposes_missing:
+    if "run_new_without_solution" in (docker_results.get("timed_out") or {}):
+        # Reported as a timeout by assemble_review; a hang is not a failing test.
+        pass
+    elif not exposes_missing:
         issues.append("New tests do not fail on base commit")
+    elif new_cells and new_cells["before"] and new_cells["after"] and not (new_cells["fail_to_pass"] or new_cells["always_fail"]):
+        # The run exited non-zero, but every new test it reported passed. Without per-test
+        # results on both sides (e.g. the tests cannot build yet) the exit code stands.
+        exposes_missing = False
+        issues.append("New test run fails on base commit, but no individual new test fails")
+    if new_cells and new_cells["always_pass"]:
+        issues.append(
+            f"{len(new_cells['always_pass'])} of {new_cells['before']} new tests pass without the solution: "
+            f"{test_results.sample(new_cells['always_pass'])}"
+        )
 
-    nondeterminism_patterns = [
-        r"\btime\.sleep\b", r"\bdatetime\.now\b", r"\btime\.time\b",
-        r"\brandom\.", r"\buuid4\b", r"\bMath\.random\b", r"\bDate\.now\b",
-        r"\bsetTimeout\b", r"\bsetInterval\b",
-    ]
-    deterministic = not any(re.search(p, test_patch) for p in nondeterminism_patterns)
+    deterministic = not scan["nondeterministic"]
     if not deterministic:
         issues.append("Potential nondeterminism in tests")
-
-    assert_lines = re.findall(r"\bassert\b[^\n]*", test_patch)
-    weak_asserts = [a for a in assert_lines if re.search(r"is not None|!=\s*None|len\(|truthy|not None", a)]
-    assertions_ok = not (assert_lines and len(weak_asserts) == len(assert_lines))
+    for log_key, phase in ((docker_results.get("flakiness") or {}).get("phases") or {}).items():
+        unstable = [f"{name} ({phase['tests'][name]['pass_rate']:.0%} pass)" if name in phase["tests"] else name for name in phase["unstable"]]
+        if unstable:
+            deterministic = False
+            issues.append(f"Tests unstable across {phase['runs']} reruns of {log_key} (nondeterminism): {test_results.sample(unstable)}")
+        elif not phase["exit_stable"]:
+            deterministic = False
+            issues.append(f"./test.sh new exit status varied across {phase['runs']} reruns of {log_key} (nondeterminism)")
+
+    assertions_ok = not (scan["asserts"] and scan["weak_asserts"] == scan["asserts"])
     if not assertions_ok:
         issues.append("Assertions look weak or non-specific")
 
-    internal_usage = bool(re.search(r"\._|/internal/|_private", test_patch))
+    internal_usage = scan["internal_usage"]
     behavior_focused = not internal_usage
     if internal_usage:
         issues.append("Tests appear to touch internal/private details")
 
     follows_structure = True
-    if repo_dir:
-        test_dirs = set()
-        for root, dirs, files in os.walk(repo_dir):
-            for d in dirs:
-                if d.lower() in {"tests", "test", "__tests__", "spec"}:
-                    test_dirs.add(Path(root) / d)
-        added_files = re.findall(r"^\+\+\+\s+b/(.+)$", test_patch, re.MULTILINE)
-        if added_files and test_dirs:
-            follows_structure = False
-            for f in added_files:
-                fpath = repo_dir / f
-                if any(str(fpath).startswith(str(td)) for td in test_dirs):
-                    follows_structure = True
-                    break
+    test_dirs = docker_results.get("test_dirs")
+    if test_dirs is None and repo_dir:
+        test_dirs = find_test_dirs(repo_dir)
+    if test_dirs:
+        added_files = [f["new_path"] for f in scan["files"] if f["new_path"]]
+        if added_files:
+            follows_structure = any(f.startswith(td) for f in added_files for td in test_dirs)
     if not follows_structure:
         issues.append("Tests do not follow repo structure")
 
-    case_count = test_case_count(test_patch)
-    covers_edges = case_count >= 2
+    covers_edges = scan["test_case_count"] >= 2
     if not covers_edges:
         issues.append("Insufficient test case coverage")
 
-    lines = [l.strip() for l in test_patch.splitlines() if l.startswith("+") and not l.startswith("+++ ")]
-    norm = [re.sub(r"\s+", " ", l[1:].strip()) for l in lines if l[1:].strip()]
-    dup_count = len(norm) - len(set(norm))
-    no_redundancy = dup_count <= max(1, len(norm) // 4)
+    no_redundancy = scan["duplicates"] <= max(1, scan["added"] // 4)
     if not no_redundancy:
         issues.append("Redundant or repetitive tests detected")
 
-    contracts = split_compound_requirements(requirement_sentences(desc_text))
-    test_cases = extract_test_cases(test_patch)
-    alignment_issues = spec_test_alignment(contracts, test_cases, test_patch)
+    contracts = list(document(desc_text)["contracts"])
+    alignment_issues = spec_test_alignment(contracts, scan["test_cases"], scan["asserts_counts"])
     if alignment_issues:
         issues.extend(alignment_issues)
 
-    desc_tokens = set(tokenize(desc_text))
-    test_tokens = set(tokenize(test_patch))
+    desc_tokens = token_profile(desc_text)["tokens"]
+    test_tokens = scan["tokens"]
     overlap = len(desc_tokens & test_tokens) / max(1, len(test_tokens))
     no_unspecified = overlap >= 0.2
     if not no_unspecified:
@@ -576,44 +513,107 @@ def is_comment_line(line: str) -> bool:
     )
 
 
-def diff_stats(diff_text: str) -> Dict:
-    added = 0
-    code = 0
-    comment = 0
-    suspicious = 0
-    seen = {}
-    for line in diff_text.splitlines():
-        if line.startswith("+++ ") or line.startswith("--- ") or line.startswith("@@"):
-            continue
-        if line.startswith("+") and not line.startswith("+++ "):
-            content = line[1:]
-            if not content.strip():
+NONDETERMINISM = re.compile(
+    r"\btime\.sleep\b|\bdatetime\.now\b|\btime\.time\b|\brandom\.|\buuid4\b"
+    r"|\bMath\.random\b|\bDate\.now\b|\bsetTimeout\b|\bsetInterval\b"
+)
+ASSERT_LINE = re.compile(r"\bassert\b.*")
+WEAK_ASSERT = re.compile(r"is not None|!=\s*None|len\(|truthy|not None")
+COUNT_ASSERT = re.compile(r"assert\s+len\(|assertEqual\(len\(")
+INTERNAL_ACCESS = re.compile(r"\._|/internal/|_private")
+TEST_CASE_NAMES = [
+    (re.compile(r"def (test_[\w_]+)\s*\("), lambda m: m.replace("_", " ")),
+    (re.compile(r"\btest\(\s*['\"]([^'\"]+)['\"]"), None),
+    (re.compile(r"\bit\(\s*['\"]([^'\"]+)['\"]"), None),
+    (re.compile(r"\bfunc\s+(Test\w+)\s*\("), None),
+]
+TEST_CASE_MARKERS = re.compile(
+    r"def test_\w+\s*\(|\btest\(\s*['\"]|\bit\(\s*['\"]|\bfunc Test\w+\s*\(|#\[test\]"
+)
+SUSPICIOUS_MARKERS = re.compile(r"\b(TODO|FIXME|HACK|TEMP|generated by|chatgpt|llm)\b", re.IGNORECASE)
+SUSPICIOUS_STUB = re.compile(r"\bpass\b|^\s*return\s+None\b")
+API_REMOVAL = re.compile(r"^\s*(export\s+|public\s+|pub\s+|def\s+|class\s+)")
+AI_MARKERS = re.compile(r"\b(chatgpt|openai|llm|generated by)\b", re.IGNORECASE)
+WHITESPACE = re.compile(r"\s+")
+
+
+@tracing.traced("analyzer")
+def scan_patch(patch: PatchSource) -> Dict:
+    # Every patch check folds over the same single pass; hunks are dropped once visited and
+    # duplicate detection keeps line hashes rather than line text.
+    scan = {
+        "added": 0, "code": 0, "comment": 0, "suspicious": 0, "duplicates": 0,
+        "test_case_count": 0, "asserts": 0, "weak_asserts": 0,
+        "nondeterministic": False, "internal_usage": False, "asserts_counts": False,
+        "api_break": False, "ai_markers": False, "tokens": set(),
+    }
+    seen = set()
+    case_names: List[List[str]] = [[] for _ in TEST_CASE_NAMES]
+
+    def visit_text(line: str) -> None:
+        for idx, (pattern, transform) in enumerate(TEST_CASE_NAMES):
+            for m in pattern.findall(line):
+                case_names[idx].append(transform(m) if transform else m)
+        scan["test_case_count"] += len(TEST_CASE_MARKERS.findall(line))
+        asserted = ASSERT_LINE.search(line)
+        if asserted:
+            scan["asserts"] += 1
+            if WEAK_ASSERT.search(asserted.group(0)):
+                scan["weak_asserts"] += 1
+        scan["nondeterministic"] = scan["nondeterministic"] or bool(NONDETERMINISM.search(line))
+        scan["internal_usage"] = scan["internal_usage"] or bool(INTERNAL_ACCESS.search(line))
+        scan["asserts_counts"] = scan["asserts_counts"] or bool(COUNT_ASSERT.search(line))
+        scan["ai_markers"] = scan["ai_markers"] or bool(AI_MARKERS.search(line))
+        scan["tokens"].update(tokenize(line))
+
+    def visit_hunk(_file: Dict, hunk: Dict) -> None:
+        for tag, content in hunk["lines"]:
+            visit_text(tag + content)
+            if tag == "-":
+                scan["api_break"] = scan["api_break"] or bool(API_REMOVAL.match(content))
+            if tag != "+" or not content.strip():
                 continue
-            added += 1
+            scan["added"] += 1
             if is_comment_line(content):
-                comment += 1
+                scan["comment"] += 1
             else:
-                code += 1
-            norm = re.sub(r"\s+", " ", content.strip())
-            seen[norm] = seen.get(norm, 0) + 1
-            if re.search(r"\b(TODO|FIXME|HACK|TEMP|generated by|chatgpt|llm)\b", content, re.IGNORECASE):
-                suspicious += 1
-            if re.search(r"\bpass\b|^\s*return\s+None\b", content):
-                suspicious += 1
-    dup = sum(c - 1 for c in seen.values() if c > 1)
-    dup_ratio = dup / max(1, added)
-    comment_ratio = comment / max(1, added)
+                scan["code"] += 1
+            norm = hash(WHITESPACE.sub(" ", content.strip()))
+            if norm in seen:
+                scan["duplicates"] += 1
+            seen.add(norm)
+            if SUSPICIOUS_MARKERS.search(content):
+                scan["suspicious"] += 1
+            if SUSPICIOUS_STUB.search(content):
+                scan["suspicious"] += 1
+
+    model = patch_model.parse_patch(patch, on_hunk=visit_hunk, on_header=visit_text)
+    scan["files"] = model["files"]
+    scan["test_cases"] = [name for names in case_names for name in names]
+    return scan
+
+
+def patch_stats(scan: Dict) -> Dict:
+    added = scan["added"]
     return {
         "added": added,
-        "code": code,
-        "comment": comment,
-        "dup_ratio": dup_ratio,
-        "comment_ratio": comment_ratio,
-        "suspicious": suspicious,
+        "code": scan["code"],
+        "comment": scan["comment"],
+        "dup_ratio": scan["duplicates"] / max(1, added),
+        "comment_ratio": scan["comment"] / max(1, added),
+        "suspicious": scan["suspicious"],
     }
 
 
-def analyze_solution(solution_patch: str, docker_results: Dict) -> Dict:
+def diff_stats(diff_text: PatchSource) -> Dict:
+    return patch_stats(scan_patch(diff_text))
+
+
+MIN_SOLUTION_LOC = 380
+
+
+@tracing.traced("analyzer")
+def analyze_solution(solution_patch: PatchSource, docker_results: Dict, scan: Optional[Dict] = None) -> Dict:
     issues = []
     checks = []
 
@@ -629,7 +629,8 @@ def analyze_solution(solution_patch: str, docker_results: Dict) -> Dict:
         issues.append("solution.patch missing")
         return {"checks": checks, "issues": issues, "stats": {}}
 
-    stats = diff_stats(solution_patch)
+    scan = scan or scan_patch(solution_patch)
+    stats = patch_stats(scan)
     added = stats["added"]
     code_lines = stats["code"]
     comment_ratio = stats["comment_ratio"]
@@ -639,7 +640,17 @@ def analyze_solution(solution_patch: str, docker_results: Dict) -> Dict:
     meets_requirements = docker_results.get("solution_new_pass", False)
     no_regressions = docker_results.get("solution_base_pass", False)
 
-    if added < 380:
+    matrix = docker_results.get("test_matrix") or {}
+    still_failing = (matrix.get("new") or {}).get("always_fail", [])
+    if still_failing:
+        meets_requirements = False
+        issues.append(f"Solution leaves new tests failing: {test_results.sample(still_failing)}")
+    regressed = [name for cells in matrix.values() for name in cells["pass_to_fail"]]
+    if regressed:
+        no_regressions = False
+        issues.append(f"Solution breaks tests that passed before it: {test_results.sample(regressed)}")
+
+    if added < MIN_SOLUTION_LOC:
         issues.append(f"Added LOC below required minimum ({added})")
         meets_requirements = False
 
@@ -648,7 +659,7 @@ def analyze_solution(solution_patch: str, docker_results: Dict) -> Dict:
     if padded:
         issues.append("Solution appears padded or includes dead/unnecessary code")
 
-    touched_files = re.findall(r"^\+\+\+\s+b/(.+)$", solution_patch, re.MULTILINE)
+    touched_files = [f["new_path"] for f in scan["files"] if f["new_path"]]
     irrelevant = any(
         f.endswith((".md", ".txt", ".rst"))
         or os.path.basename(f) in {"Dockerfile", "dockerfile", "package-lock.json", "yarn.lock", "pnpm-lock.yaml", "poetry.lock", "go.sum"}
@@ -658,12 +669,12 @@ def analyze_solution(solution_patch: str, docker_results: Dict) -> Dict:
     if irrelevant:
         issues.append("Solution patch touches files that should not be changed")
 
-    api_break = bool(re.search(r"^\-\s*(export\s+|public\s+|pub\s+|def\s+|class\s+)", solution_patch, re.MULTILINE))
+    api_break = scan["api_break"]
     api_stable = not api_break
     if api_break:
         issues.append("Potential public API changes detected")
 
-    ai_slop = bool(re.search(r"\b(chatgpt|openai|llm|generated by)\b", solution_patch, re.IGNORECASE)) or comment_ratio > 0.30
+    ai_slop = scan["ai_markers"] or comment_ratio > 0.30
     no_ai_slop = not ai_slop
     if ai_slop:
         issues.append("AI-generated slop or excessive commentary detected")
@@ -679,35 +690,33 @@ def analyze_solution(solution_patch: str, docker_results: Dict) -> Dict:
     return {"checks": checks, "issues": issues, "stats": stats}
 
 
-def normalize_patch_line_endings(patch_path: Path) -> None:
-    content = read_text(patch_path)
-    if "\r\n" in content:
-        patch_path.write_text(content.replace("\r\n", "\n"), encoding="utf-8")
-
+def apply_patch_checked(patch_path: Path, repo_dir: Path) -> Dict:
+    """Apply a submission patch to the work tree, leaving the patch file untouched.
 
-def is_crlf_only_patch_failure(patch_path: Path, stderr: str) -> bool:
-    content = read_text(patch_path)
-    if "\r\n" not in content:
-        return False
-    # Treat CRLF retry as environment normalization only when the patch itself uses CRLF
-    # and git failed during apply check. Do not surface this as a submission issue.
-    return True
+    CRLF line endings are normalized in memory when that is what keeps the patch from
+    applying; that is environment normalization, not a submission issue.
+    """
+    applied = patch_engine.apply_patch(patch_path, repo_dir)
+    return {
+        "ok": applied["ok"],
+        "method": applied["method"],
+        "normalized_crlf": applied["normalized_crlf"],
+        "hunks": len(applied["hunks"]),
+        "failed_hunks": patch_engine.failed_hunks(applied),
+        "errors": applied["errors"],
+    }
 
 
-def apply_patch_checked(patch_path: Path, repo_dir: Path) -> Tuple[bool, str]:
-    if not patch_path.exists():
-        return False, "Patch not found"
-    code, _, err = run_command(["git", "apply", "--check", str(patch_path)], cwd=str(repo_dir))
-    if code != 0 and is_crlf_only_patch_failure(patch_path, err):
-        normalize_patch_line_endings(patch_path)
-        code, _, err = run_command(["git", "apply", "--check", str(patch_path)], cwd=str(repo_dir))
-    if code == 0:
-        run_command(["git", "apply", str(patch_path)], cwd=str(repo_dir))
-        return True, "Patch applies cleanly"
-    return False, f"Patch fails to apply: {err}"
+# Test phase log key -> the result flag its exit code sets.
+PHASE_RESULT_KEYS = {
+    "base_only": "base_only_pass",
+    "new_without_solution": "new_only_fail",
+    "base_with_solution": "solution_base_pass",
+    "new_with_solution": "solution_new_pass",
+}
 
 
-def run_docker_verification(problem_dir: Path, repo_url: str, commit_hash: str, skip_docker: bool = False) -> Dict:
+def run_docker_verification(problem_dir: Path, repo_url: str, commit_hash: str, skip_docker: bool = False, docker_options: Optional[Dict] = None, reuse: Optional[Dict[str, Dict]] = None) -> Dict:
     results = {
         "build_success": False,
         "base_only_pass": False,
@@ -715,7 +724,13 @@ def run_docker_verification(problem_dir: Path, repo_url: str, commit_hash: str,
         "solution_base_pass": False,
         "solution_new_pass": False,
         "logs": {},
-        "repo_dir": None,
+        "test_summaries": {},
+        "test_outcomes": {},
+        "test_matrix": {},
+        "exit_codes": {},
+        "patches": {},
+        # Step name -> message, for steps stopped at their time limit rather than failing.
+        "timed_out": {},
     }
     if skip_docker:
         results["skipped"] = True
@@ -729,62 +744,318 @@ def run_docker_verification(problem_dir: Path, repo_url: str, commit_hash: str,
         results["error"] = "Dockerfile not found"
         return results
 
-    work_dir = Path(tempfile.mkdtemp(prefix="review_work_"))
-    repo_dir = work_dir / "repo"
-    results["repo_dir"] = str(repo_dir)
-
-    code, _, stderr = run_command(["git", "clone", repo_url, "repo"], cwd=str(work_dir))
-    if code != 0:
-        results["error"] = f"Git clone failed: {stderr}"
+    docker_options = docker_options or {}
+    if docker_options.get("keep_worktrees"):
+        key = result_cache.cache_key(
+            "worktrees-v1", repo_url, commit_hash,
+            *[p.read_bytes() if p else None for p in (dockerfile, test_patch, solution_patch)],
+        )
+        root = worktrees.kept_root(key[:24])
+        with file_lock(root.with_name(root.name + ".lock")):
+            base_dir = root / "repo"
+            if worktrees.ready_record(base_dir) is None:
+                # A kept tree that was never completed is rebuilt from a fresh clone.
+                shutil.rmtree(root, ignore_errors=True)
+                root.mkdir(parents=True)
+                with clone_cache.checkout(repo_url, commit_hash) as (repo_dir, error):
+                    if error:
+                        results["error"] = error
+                        return results
+                    shutil.move(str(repo_dir), str(base_dir))
+                worktrees.mark_ready(base_dir, {})
+            results["worktrees"] = {"root": str(root), "kept": True}
+            verify_checkout(base_dir, root, dockerfile, test_patch, solution_patch, repo_url, commit_hash, results, docker_options, reuse or {})
         return results
 
-    run_command(["git", "checkout", commit_hash], cwd=str(repo_dir))
-
-    shutil.copy(dockerfile, repo_dir / "Dockerfile")
+    with clone_cache.checkout(repo_url, commit_hash) as (repo_dir, error):
+        if error:
+            results["error"] = error
+            return results
+        results["worktrees"] = {"root": str(repo_dir.parent), "kept": False}
+        verify_checkout(repo_dir, repo_dir.parent, dockerfile, test_patch, solution_patch, repo_url, commit_hash, results, docker_options, reuse or {})
+    return results
 
-    image_name = f"shipd/{repo_dir.name}"
-    code, _, stderr = run_command(["docker", "build", "-t", image_name, "-f", "Dockerfile", "."], cwd=str(repo_dir))
-    if code != 0:
-        results["error"] = f"Docker build failed: {stderr}"
-        return results
-    results["build_success"] = True
 
-    code, stdout, stderr = run_command(
-        ["docker", "run", "--rm", "--network=none", image_name, "bash", "-lc", "sed -i 's/\\r$//' ./test.sh && ./test.sh base"],
-        cwd=str(repo_dir),
-    )
-    results["base_only_pass"] = (code == 0)
-    results["logs"]["base_only"] = stdout + stderr
+def prewarm_base_image(problem_dir: Path, repo_url: Optional[str] = None, commit_hash: Optional[str] = None) -> Dict:
+    """Build the base image a review of problem_dir will start from, ahead of the review.
 
-    if test_patch:
-        apply_patch_checked(test_patch, repo_dir)
-        run_command(["docker", "build", "-t", image_name, "-f", "Dockerfile", "."], cwd=str(repo_dir))
-        code, stdout, stderr = run_command(
-            ["docker", "run", "--rm", "--network=none", image_name, "bash", "-lc", "sed -i 's/\\r$//' ./test.sh && ./test.sh new"],
+    Returns {"image", "source", "error"}; the review then finds the image already built.
+    """
+    setup_file = find_file(problem_dir, ["setup.sh"])
+    if setup_file:
+        setup_url, setup_commit = extract_repo_info_from_setup(setup_file)
+        repo_url = repo_url or setup_url
+        commit_hash = commit_hash or setup_commit
+    dockerfile = find_file(problem_dir, ["Dockerfile", "dockerfile"])
+    if not (repo_url and commit_hash and dockerfile):
+        return {"image": None, "source": None, "error": "repository, commit or Dockerfile missing"}
+    with tracing.span("prewarm", "docker", repo=repo_url, commit=commit_hash) as info:
+        with clone_cache.checkout(repo_url, commit_hash) as (repo_dir, error):
+            if error:
+                return {"image": None, "source": None, "error": error}
+            worktrees.write_private(repo_dir / "Dockerfile", dockerfile.read_bytes())
+            try:
+                image, source, stderr = image_cache.ensure_base_image(repo_dir, commit_hash, repo_url)
+            except TimeoutError as e:
+                image, source, stderr = None, None, str(e)
+        info["source"] = source
+    return {"image": image, "source": source, "error": None if image else f"Docker build failed: {stderr}"}
+
+
+# Full test output is kept on disk for this many recent reviews.
+LOG_RUNS_KEPT = 50
+# Default wall-clock budget, in seconds, for all flakiness reruns of one review.
+FLAKY_BUDGET = 300
+
+
+def new_log_dir(name: str) -> Path:
+    """Create a directory for one review's test logs, dropping all but the newest LOG_RUNS_KEPT."""
+    root = cache_dir("logs")
+    runs = sorted((p for p in root.iterdir() if p.is_dir()), key=lambda p: p.stat().st_mtime, reverse=True)
+    for old in runs[LOG_RUNS_KEPT - 1:]:
+        shutil.rmtree(old, ignore_errors=True)
+    path = root / name
+    path.mkdir(parents=True, exist_ok=True)
+    return path
+
+
+def run_test_script(image: str, mode: str, repo_dir: Path, docker_options: Dict, log_path: Path, on_text: Callable[[str], None], repo: Optional[str], log_key: str, env: Optional[Dict[str, str]] = None, timeout: Optional[int] = None) -> Dict:
+    """Run ./test.sh mode in a container, stopped at the time limit learned for this phase of repo
+    (or at timeout, if lower)."""
+    phase = f"test:{log_key}"
+    learned = timing_history.limit(repo, phase)["seconds"]
+    seconds = min(timeout, learned) if timeout else learned
+    # Every container gets CPU and memory limits, and waits for room in the host-wide budget;
+    # the timeout only starts once it is admitted.
+    limits = host_scheduler.container_limits(docker_options.get("cpus"), docker_options.get("memory"))
+    container = f"review-{uuid.uuid4().hex[:12]}"
+    flags = [f"--name={container}", f"--cpus={limits['cpus']:g}", f"--memory={limits['memory']}"]
+    for name, value in (env or {}).items():
+        flags.append(f"--env={name}={value}")
+    with host_scheduler.admit("run", limits["cpus"], limits["memory_mb"]) as admission:
+        started = time.monotonic()
+        run = stream_command(
+            ["docker", "run", "--rm", "--network=none"] + flags + [image, "bash", "-lc", f"sed -i 's/\\r$//' ./test.sh && ./test.sh {mode}"],
+            log_path,
             cwd=str(repo_dir),
+            timeout=seconds,
+            on_text=on_text,
         )
-        results["new_only_fail"] = (code != 0)
-        results["logs"]["new_without_solution"] = stdout + stderr
+        elapsed = time.monotonic() - started
+        if run["timed_out"]:
+            # Killing the docker client leaves the container running.
+            image_cache.docker(["rm", "-f", container])
+    # A cut-off below the learned limit (a rerun's remaining budget) says nothing about the repo.
+    if not run["timed_out"] or seconds == learned:
+        timing_history.record(repo, phase, elapsed, run["timed_out"])
+    run.update(queued=admission["waited"], timeout=seconds)
+    return run
+
+
+def rerun_new_tests(targets: Dict[str, str], repo_dir: Path, docker_options: Dict, log_dir: Path, repo: Optional[str]) -> Dict:
+    """Rerun ./test.sh new against already-built images to measure per-test stability.
+
+    targets maps a phase log key to its image. Runs for the two sides are interleaved so a
+    budget cut-off leaves them comparable; runs that would start after the deadline are dropped.
+    """
+    requested = docker_options.get("flaky_runs", 0)
+    deadline = time.monotonic() + docker_options.get("flaky_budget", FLAKY_BUDGET)
+    jobs = [(log_key, image, n) for n in range(1, requested + 1) for log_key, image in targets.items()]
+
+    def rerun(job: Tuple[str, str, int]) -> Optional[Tuple[str, Dict]]:
+        log_key, image, n = job
+        remaining = deadline - time.monotonic()
+        if remaining <= 0:
+            return None
+        # A fresh hash seed per run reorders Python set/dict iteration, overriding any
+        # PYTHONHASHSEED pinned by the image.
+        seed = random.randrange(1, 2 ** 32)
+        tests = test_results.new_run()
+        run = run_test_script(
+            image, "new", repo_dir, docker_options, log_dir / f"{log_key}.rerun{n}.log",
+            lambda text: test_results.feed_text(tests, text),
+            repo,
+            log_key,
+            env={"PYTHONHASHSEED": str(seed)},
+            timeout=max(1, int(remaining)),
+        )
+        if run["timed_out"]:
+            return None
+        return log_key, {"seed": seed, "exit_code": run["exit_code"], "tests": tests["tests"]}
+
+    runs: Dict[str, List[Dict]] = {log_key: [] for log_key in targets}
+    with tracing.span("flaky_reruns", "phase", requested=requested) as info:
+        with ThreadPoolExecutor(max_workers=max(1, docker_options.get("flaky_concurrency", 2)), thread_name_prefix="rerun") as pool:
+            for done in pool.map(rerun, jobs):
+                if done:
+                    runs[done[0]].append(done[1])
+        info["completed"] = sum(len(r) for r in runs.values())
+    return {
+        "requested": requested,
+        "budget_exhausted": info["completed"] < len(jobs),
+        "phases": {log_key: test_results.stability(phase_runs) for log_key, phase_runs in runs.items()},
+    }
 
-    if solution_patch:
-        apply_patch_checked(solution_patch, repo_dir)
-        run_command(["docker", "build", "-t", image_name, "-f", "Dockerfile", "."], cwd=str(repo_dir))
 
-        code, stdout, stderr = run_command(
-            ["docker", "run", "--rm", "--network=none", image_name, "bash", "-lc", "sed -i 's/\\r$//' ./test.sh && ./test.sh base"],
-            cwd=str(repo_dir),
-        )
-        results["solution_base_pass"] = (code == 0)
-        results["logs"]["base_with_solution"] = stdout + stderr
+def phase_record(results: Dict, log_key: str) -> Dict:
+    return {
+        "passed": results[PHASE_RESULT_KEYS[log_key]],
+        "exit_code": results.get("exit_codes", {}).get(log_key),
+        "summary": results.get("test_summaries", {}).get(log_key),
+        "outcomes": results.get("test_outcomes", {}).get(log_key, {}),
+        "log": results.get("logs", {}).get(log_key),
+    }
 
-        code, stdout, stderr = run_command(
-            ["docker", "run", "--rm", "--network=none", image_name, "bash", "-lc", "sed -i 's/\\r$//' ./test.sh && ./test.sh new"],
-            cwd=str(repo_dir),
-        )
-        results["solution_new_pass"] = (code == 0)
-        results["logs"]["new_with_solution"] = stdout + stderr
 
-    return results
+def restore_phase(results: Dict, log_key: str, record: Dict) -> None:
+    results[PHASE_RESULT_KEYS[log_key]] = record["passed"]
+    results["exit_codes"][log_key] = record["exit_code"]
+    results["test_summaries"][log_key] = record["summary"]
+    results["test_outcomes"][log_key] = record["outcomes"]
+    if record["log"]:
+        results["logs"][log_key] = record["log"]
+    results.setdefault("reused_phases", []).append(log_key)
+
+
+def verify_checkout(repo_dir: Path, trees_root: Path, dockerfile: Path, test_patch: Optional[Path], solution_patch: Optional[Path], repo_url: str, commit_hash: str, results: Dict, docker_options: Dict, reuse: Dict[str, Dict]) -> None:
+    """Build and test the base, base+test and base+test+solution states of the clone at repo_dir.
+
+    The patched states are copy-on-write snapshots under trees_root, each prepared from its
+    parent state, so repo_dir is never modified after the Dockerfile is placed and each state's
+    build only waits for its own tree. A tree already marked ready there is used as is.
+    """
+    worktrees.write_private(repo_dir / "Dockerfile", dockerfile.read_bytes())
+    if not test_patch:
+        results["test_dirs"] = find_test_dirs(repo_dir)
+
+    # Patched states are thin layers over the cached base image, tagged per review so
+    # concurrent reviews of the same repo never run each other's images.
+    variant_id = uuid.uuid4().hex[:12]
+    variant_prefix = f"shipd/{repo_dir.name}-{variant_id}"
+    log_dir = new_log_dir(f"{repo_dir.name}-{variant_id}")
+    images: Dict[str, str] = {}
+    trees: Dict[str, Path] = {"base": repo_dir}
+    # Paths that differ from the base tree in each state; the thin layers copy exactly these.
+    changed_paths: Dict[str, List[str]] = {"base": []}
+    snapshots: Dict[str, str] = {}
+
+    def build_base() -> None:
+        base_image, source, stderr = image_cache.ensure_base_image(repo_dir, commit_hash, repo_url)
+        if not base_image:
+            raise RuntimeError(f"Docker build failed: {stderr}")
+        images["base"] = base_image
+        results["build_success"] = True
+        results["base_image_cached"] = source == "cached"
+        results["base_image_source"] = source
+
+    def prepare_tree(state: str, parent: str, patch_path: Path):
+        def prepare() -> None:
+            paths = image_cache.patch_paths(patch_path)
+            tree = trees_root / state
+            applied = worktrees.ready_record(tree)
+            if applied is None:
+                shutil.rmtree(tree, ignore_errors=True)
+                snapshots[state] = worktrees.snapshot(trees[parent], tree, private=paths)
+                applied = apply_patch_checked(patch_path, tree)
+                if applied["ok"]:
+                    worktrees.mark_ready(tree, applied)
+            else:
+                snapshots[state] = "kept"
+            results["patches"][patch_path.name] = applied
+            if not applied["ok"]:
+                raise RuntimeError(f"Patch fails to apply: {patch_path.name}: {'; '.join(applied['errors'][:3])}")
+            changed_paths[state] = list(dict.fromkeys(changed_paths[parent] + paths))
+            trees[state] = tree
+            if state == "test":
+                # Directories the test patch adds count towards the repo's test layout.
+                results["test_dirs"] = find_test_dirs(tree)
+        return prepare
+
+    def build_patched(state: str):
+        def build() -> None:
+            images[state] = f"{variant_prefix}:{state}"
+            code, stderr, _ = image_cache.build_variant(trees[state], images["base"], changed_paths[state], images[state], repo_url)
+            if code != 0:
+                raise RuntimeError(f"Docker build failed: {stderr}")
+        return build
+
+    def run_phase(phase: str, mode: str, result_key: str, log_key: str, expect_pass: bool = True):
+        def run() -> None:
+            if log_key in reuse:
+                # The images are still built (later builds layer on them), but this run's
+                # inputs match the previous review, so its stored result stands.
+                restore_phase(results, log_key, reuse[log_key])
+                return
+            # Counts and per-test outcomes are collected as the output streams in.
+            summary = runner_summary.new_summary()
+            tests = test_results.new_run()
+
+            def on_text(text: str) -> None:
+                runner_summary.feed_text(summary, text)
+                test_results.feed_text(tests, text)
+
+            run = run_test_script(images[phase], mode, repo_dir, docker_options, log_dir / f"{log_key}.log", on_text, repo_url, log_key)
+            code = run["exit_code"]
+            # A run stopped at its time limit neither passed nor failed.
+            results[result_key] = False if run["timed_out"] else (code == 0) if expect_pass else (code != 0)
+            results["logs"][log_key] = {
+                "path": run["log_path"],
+                "bytes": run["total_bytes"],
+                "excerpt": run["output"],
+                "truncated": run["truncated"],
+            }
+            results["test_summaries"][log_key] = summary if summary["runners"] else None
+            results["test_outcomes"][log_key] = tests["tests"]
+            results["exit_codes"][log_key] = code
+            results["queued_seconds"] = results.get("queued_seconds", 0) + run["queued"]
+            if run["timed_out"]:
+                raise TimeoutError(f"./test.sh {mode} timed out after {run['timeout']}s ({log_key})")
+        return run
+
+    steps = {
+        "build_base": (build_base, []),
+        "run_base_only": (run_phase("base", "base", "base_only_pass", "base_only"), ["build_base"]),
+    }
+    if test_patch:
+        steps["tree_test"] = (prepare_tree("test", "base", test_patch), [])
+        steps["build_test"] = (build_patched("test"), ["build_base", "tree_test"])
+        steps["run_new_without_solution"] = (run_phase("test", "new", "new_only_fail", "new_without_solution", expect_pass=False), ["build_test"])
+    if solution_patch:
+        steps["tree_solution"] = (prepare_tree("solution", "test" if test_patch else "base", solution_patch), ["tree_test"] if test_patch else [])
+        steps["build_solution"] = (build_patched("solution"), ["build_base", "tree_solution"])
+        steps["run_base_with_solution"] = (run_phase("solution", "base", "solution_base_pass", "base_with_solution"), ["build_solution"])
+        steps["run_new_with_solution"] = (run_phase("solution", "new", "solution_new_pass", "new_with_solution"), ["build_solution"])
+
+    try:
+        outcomes = phase_scheduler.run_phases(steps, docker_options.get("concurrency", 2))
+        if docker_options.get("flaky_runs"):
+            targets = {
+                log_key: images[phase]
+                for log_key, phase in (("new_without_solution", "test"), ("new_with_solution", "solution"))
+                if outcomes.get(f"run_{log_key}", {}).get("ok")
+            }
+            if targets:
+                results["flakiness"] = rerun_new_tests(targets, repo_dir, docker_options, log_dir, repo_url)
+    finally:
+        image_cache.remove_images([images[k] for k in ("test", "solution") if k in images])
+
+    results["phases"] = {
+        name: "ok" if o["ok"] else "skipped" if o.get("skipped") else "timed out" if o.get("timed_out") else "failed"
+        for name, o in outcomes.items()
+    }
+    results["step_seconds"] = {name: o["seconds"] for name, o in outcomes.items() if o.get("seconds") is not None}
+    results["timed_out"] = {name: o["error"] for name, o in outcomes.items() if o.get("timed_out")}
+    # A run cut off at its time limit has no verdict for the tests it did not reach.
+    results["test_matrix"] = test_results.differential(
+        {log_key: tests for log_key, tests in results["test_outcomes"].items() if f"run_{log_key}" not in results["timed_out"]},
+        results["exit_codes"],
+    )
+    if snapshots:
+        results["worktrees"]["snapshots"] = snapshots
+    for name in ("build_base", "tree_test", "build_test", "tree_solution", "build_solution"):
+        if name in outcomes and not outcomes[name]["ok"] and not outcomes[name].get("skipped"):
+            results["error"] = outcomes[name]["error"]
+            break
 
 
 def rating_from_checks(checks: List[Tuple[str, bool]], major_fail_names: List[str]) -> int:
@@ -837,6 +1108,124 @@ def build_feedback(issues: List[str], decision: str) -> str:
     return "Changes needed before acceptance. " + "; ".join(issues[:6])
 
 
+# Review form sections: result key, title, number of checks.
+CHECKLIST_SECTIONS = (("problem", "Problem", 7), ("tests", "Tests", 8), ("solution", "Solution & Code", 6))
+# Check labels in form order, for reviews halted before the analyzers produced them.
+CHECKLIST_LABELS = {
+    "problem": [
+        "Requirements are complete and self-contained",
+        "No ambiguities, fully deterministic",
+        "Problem is concise and not prescriptive",
+        "Matches real-world repo scope",
+        "Aligns with repo's design philosophy",
+        "No irrelevant context",
+        "Clear writing and formatting",
+    ],
+    "tests": [
+        "Tests expose unimplemented or incorrect behavior",
+        "Tests are deterministic",
+        "Assertions verify correct output",
+        "Validates behavior, not fragile internals",
+        "Follows repo test structure",
+        "Covers required behavior and edge cases",
+        "No redundant tests",
+        "No checks for unspecified behavior",
+    ],
+    "solution": [
+        "Meets all requirements",
+        "No regressions, follows repo patterns",
+        "No unexplained defensive code",
+        "No irrelevant changes",
+        "Existing API contracts stay stable",
+        "No AI-generated slop, comments, or artifacts",
+    ],
+}
+DECISIONS = (
+    ("Approve", "Meets quality standards"),
+    ("Request Changes", "Needs changes before acceptance"),
+    ("Reject", "Does not meet requirements"),
+)
+
+
+def checklist_section(title: str, total: int, checks: List[Tuple[str, bool]], rating: Optional[int]) -> Dict:
+    return {
+        "title": title,
+        "passed": sum(1 for _, ok in checks if ok),
+        "total": total,
+        "rating": rating,
+        "checks": [{"label": label, "passed": bool(ok)} for label, ok in checks],
+    }
+
+
+def new_result(submission: Dict, decision: str, quality_score: int, feedback: str) -> Dict:
+    """A review result (see review_schema.py) with the stage sections still empty."""
+    return {
+        "schema_version": review_schema.SCHEMA_VERSION,
+        "analyzer": ANALYZER_VERSION,
+        "problem_dir": str(submission["problem_dir"]),
+        "repo_url": submission["repo_url"],
+        "commit": submission["commit_hash"],
+        "decision": decision,
+        "quality_score": quality_score,
+        "feedback": feedback,
+        "issues": [],
+        "fixable_issues": [],
+        "reject_reasons": [],
+        "fixes": [],
+        "checklist": {},
+        "problem": None,
+        "tests": None,
+        "solution": None,
+        "repository": None,
+        "similarity": {"detected": False, "comparisons": []},
+        "docker": None,
+        "timings": {},
+    }
+
+
+def log_reference(log: Optional[Dict]) -> Optional[Dict]:
+    # The in-memory excerpt can run to hundreds of KB; the result points at the full log instead.
+    return {k: log[k] for k in ("path", "bytes", "truncated")} if log else None
+
+
+def docker_section(docker_results: Dict) -> Dict:
+    """The Docker verification results in the result schema's shape."""
+    skipped = bool(docker_results.get("skipped"))
+    timed_out = docker_results.get("timed_out") or {}
+    reused = docker_results.get("reused_phases") or []
+    step_seconds = docker_results.get("step_seconds") or {}
+    phases = {}
+    if not skipped:
+        for log_key, result_key in PHASE_RESULT_KEYS.items():
+            phases[log_key] = {
+                "passed": bool(docker_results.get(result_key, False)),
+                "exit_code": (docker_results.get("exit_codes") or {}).get(log_key),
+                "timed_out": timed_out.get(f"run_{log_key}"),
+                "reused": log_key in reused,
+                "seconds": step_seconds.get(f"run_{log_key}"),
+                "summary": (docker_results.get("test_summaries") or {}).get(log_key),
+                "log": log_reference((docker_results.get("logs") or {}).get(log_key)),
+            }
+    return {
+        "skipped": skipped,
+        "early_exit": list(docker_results.get("early_exit") or []),
+        "cached": bool(docker_results.get("cached")),
+        "error": docker_results.get("error"),
+        "build_success": bool(docker_results.get("build_success")),
+        "base_image_source": docker_results.get("base_image_source"),
+        "phases": phases,
+        "steps": dict(docker_results.get("phases") or {}),
+        "step_seconds": dict(step_seconds),
+        "timed_out": dict(timed_out),
+        "test_matrix": docker_results.get("test_matrix") or {},
+        "flakiness": docker_results.get("flakiness"),
+        "patches": docker_results.get("patches") or {},
+        "queued_seconds": docker_results.get("queued_seconds", 0),
+        "reused_phases": [log_key for log_key in PHASE_RESULT_KEYS if log_key in reused],
+        "worktrees": docker_results.get("worktrees"),
+    }
+
+
 def summarize_problem(problem_analysis: Dict) -> str:
     issues = problem_analysis.get("issues", [])
     if not issues:
@@ -865,6 +1254,8 @@ def summarize_solution(solution_analysis: Dict) -> str:
 
 
 def summarize_verification(docker_results: Dict) -> str:
+    if docker_results.get("early_exit"):
+        return "Verification: Docker verification skipped; the decision was already settled by the checks below."
     if docker_results.get("skipped"):
         return "Verification: Docker verification skipped."
     return (
@@ -876,12 +1267,20 @@ def summarize_verification(docker_results: Dict) -> str:
 def fix_suggestions(issues: List[str]) -> List[str]:
     suggestions = []
     for issue in issues:
-        if "determinism" in issue.lower():
+        if "timed out" in issue.lower():
+            suggestions.append("Find what hangs or runs unusually slowly in the build or tests; runs are stopped at a limit learned from earlier runs of the repo.")
+        elif "determinism" in issue.lower():
             suggestions.append("Remove timing/randomness and make tests fully deterministic.")
         elif "fail on base" in issue.lower():
             suggestions.append("Adjust new tests so they fail on the base commit and pass only with the solution.")
         elif "pass with solution" in issue.lower():
             suggestions.append("Ensure solution.patch fully implements the required behavior so both base/new pass.")
+        elif "pass without the solution" in issue.lower():
+            suggestions.append("Remove or rewrite new tests that already pass on the base commit.")
+        elif "solution leaves" in issue.lower() or "solution breaks" in issue.lower():
+            suggestions.append("Fix the solution so every new test passes and no previously passing test fails.")
+        elif "lookup unavailable" in issue.lower():
+            suggestions.append("Rerun the review once the GitHub API is reachable so the repository requirements can be checked.")
         elif "docker build failed" in issue.lower() or "dockerfile" in issue.lower():
             suggestions.append("Fix Dockerfile to build offline and run tests with --network none.")
         elif "missing required patch files" in issue.lower():
@@ -901,211 +1300,309 @@ def fix_suggestions(issues: List[str]) -> List[str]:
     return list(dict.fromkeys(suggestions))
 
 
-def build_reasoning(problem_analysis: Dict, test_analysis: Dict, solution_analysis: Dict, docker_results: Dict, word_count: int, stats: Optional[Dict], decision: str, fixable_issues: List[str]) -> str:
+def build_reasoning(result: Dict) -> str:
+    if result["similarity"]["detected"]:
+        return "\n".join(["Similarity detected. Review halted."] + [format_similarity(c) for c in result["similarity"]["comparisons"]])
+    docker_results = result["docker"]
+    stats = result["solution"]["diff_stats"]
     lines = []
-    lines.append(summarize_problem(problem_analysis))
+    lines.append(summarize_problem(result["problem"]))
     lines.append("")
-    lines.append(summarize_tests(test_analysis))
+    lines.append(summarize_tests(result["tests"]))
     lines.append("")
-    lines.append(summarize_solution(solution_analysis))
+    lines.append(summarize_solution(result["solution"]))
     lines.append("")
     lines.append(summarize_verification(docker_results))
     lines.append("")
     lines.append("Diagnostics:")
-    lines.append(f"- Word count: {word_count}")
+    lines.append(f"- Word count: {result['problem']['word_count']}")
     if stats:
         lines.append(
             f"- Solution LOC added: {stats.get('added', 0)} (non-empty: {stats.get('code', 0)})"
         )
-    if docker_results.get("skipped"):
+    if docker_results["skipped"]:
         lines.append("- Docker verification skipped")
     else:
-        lines.append(f"- Docker base pass: {docker_results.get('base_only_pass', False)}")
-        lines.append(f"- Docker new fail (pre-solution): {docker_results.get('new_only_fail', False)}")
-        lines.append(f"- Docker base pass (with solution): {docker_results.get('solution_base_pass', False)}")
-        lines.append(f"- Docker new pass (with solution): {docker_results.get('solution_new_pass', False)}")
-    if decision == "Request Changes":
+        if docker_results["cached"]:
+            lines.append("- Docker results reused from cache (inputs unchanged)")
+        for name, applied in docker_results["patches"].items():
+            if applied["normalized_crlf"]:
+                lines.append(f"- {name}: CRLF line endings normalized in memory before applying")
+            for hunk in applied["failed_hunks"][:3]:
+                lines.append(f"- {name}: hunk {hunk['header']} in {hunk['file']} does not apply ({hunk['error']})")
+        kept = docker_results["worktrees"] or {}
+        if kept.get("kept"):
+            lines.append(f"- Work trees kept at {kept['root']} (repo, test, solution)")
+        if docker_results["base_image_source"] == "warm":
+            lines.append("- Base image built as a layer over a warm image with the same dependencies")
+        if docker_results["queued_seconds"] >= 1:
+            lines.append(f"- Docker test runs waited {docker_results['queued_seconds']:.0f}s in total for host capacity")
+        if docker_results["reused_phases"]:
+            lines.append(f"- Docker test runs reused from the previous review (inputs unchanged): {', '.join(docker_results['reused_phases'])}")
+        phases = docker_results["phases"]
+        lines.append(f"- Docker base pass: {phases['base_only']['passed']}")
+        lines.append(f"- Docker new fail (pre-solution): {phases['new_without_solution']['passed']}")
+        lines.append(f"- Docker base pass (with solution): {phases['base_with_solution']['passed']}")
+        lines.append(f"- Docker new pass (with solution): {phases['new_with_solution']['passed']}")
+        for log_key, phase in phases.items():
+            text = runner_summary.format_summary(phase["summary"])
+            if text:
+                lines.append(f"- Test runner ({log_key}): {text}")
+        for group, cells in docker_results["test_matrix"].items():
+            lines.append(f"- Test matrix ({group} tests): {test_results.format_matrix(cells)}")
+        flakiness = docker_results["flakiness"]
+        if flakiness:
+            for log_key, phase in flakiness["phases"].items():
+                lines.append(f"- Flakiness reruns ({log_key}): {phase['runs']} of {flakiness['requested']} completed, {len(phase['unstable'])} unstable")
+            if flakiness["budget_exhausted"]:
+                lines.append("- Flakiness reruns stopped at the time budget")
+    if docker_results["early_exit"]:
+        lines.append("")
+        lines.append("Skipped stages:")
+        for reason in docker_results["early_exit"]:
+            lines.append(f"- Docker verification (clone, image builds, test runs): {reason}")
+    if result["decision"] == "Request Changes":
         lines.append("")
         lines.append("Fixes:")
-        suggestions = fix_suggestions(fixable_issues)
-        if suggestions:
-            for s in suggestions:
+        if result["fixes"]:
+            for s in result["fixes"]:
                 lines.append(f"- {s}")
         else:
             lines.append("- Address the listed issues and re-run verification.")
     return "\n".join(lines)
 
 
-def main():
-    parser = argparse.ArgumentParser(description="Automated Code Eval Problem Reviewer")
-    parser.add_argument("problem_dir", help="Directory containing problem files")
-    parser.add_argument("--repo-url", help="GitHub repository URL")
-    parser.add_argument("--commit", help="Base commit hash")
-    parser.add_argument("--skip-docker", action="store_true", help="Skip Docker verification")
-    parser.add_argument("--output", default="feedback.md", help="Output file name")
-    args = parser.parse_args()
+def render_review(result: Dict) -> str:
+    """The review as the text of the review form, rendered from its result object."""
+    lines = ["Submit Review", "", "Decision:", ""]
+    for decision, caption in DECISIONS:
+        lines.extend([f"{decision}{' (selected)' if result['decision'] == decision else ''}", caption, ""])
+    lines.extend(["Feedback", "Sent to the author", result["feedback"], "", "Checklist", "", "Optional"])
+    for key, _, _ in CHECKLIST_SECTIONS:
+        section = result["checklist"][key]
+        block, _ = format_checklist([(check["label"], check["passed"]) for check in section["checks"]])
+        lines.extend([section["title"], f"{section['passed']}/{section['total']}", block, ""])
+    lines.extend(["Quality Score", "Optional", format_quality_score(result["quality_score"]), "", "Reasoning", "Optional", build_reasoning(result)])
+    return "\n".join(lines)
 
-    problem_dir = Path(args.problem_dir).resolve()
-    if not problem_dir.exists():
-        print(f"Error: Problem directory not found: {problem_dir}")
-        raise SystemExit(1)
 
+def review_from_result(result: Dict) -> Dict:
+    return {"decision": result["decision"], "quality_score": result["quality_score"], "text": render_review(result), "result": result}
+
+
+@tracing.traced("stage")
+def load_submission(problem_dir: Path, repo_url: Optional[str] = None, commit_hash: Optional[str] = None) -> Dict:
     setup_file = find_file(problem_dir, ["setup.sh"])
     desc_files = find_files(problem_dir, ["Problem-Description.txt", "description.md", "problem.md"])
     test_patch_file = find_file(problem_dir, ["test.patch"])
     solution_patch_file = find_file(problem_dir, ["solution.patch"])
 
-    repo_url = args.repo_url
-    commit_hash = args.commit
-
     if setup_file:
         setup_url, setup_commit = extract_repo_info_from_setup(setup_file)
         repo_url = repo_url or setup_url
         commit_hash = commit_hash or setup_commit
 
     if not desc_files:
-        print("Error: No problem description found")
-        raise SystemExit(1)
+        raise FileNotFoundError("No problem description found")
+
+    inputs = {
+        "setup.sh": review_state.hash_files(setup_file),
+        "repo": f"{repo_url}@{commit_hash}",
+        "Dockerfile": review_state.hash_files(find_file(problem_dir, ["Dockerfile", "dockerfile"])),
+        "test.sh": review_state.hash_files(find_file(problem_dir, ["test.sh"])),
+        "test.patch": review_state.hash_files(test_patch_file),
+        "solution.patch": review_state.hash_files(solution_patch_file),
+        "Problem-Description.txt": review_state.hash_files(*desc_files),
+    }
+    previous = review_state.load(problem_dir)
+    if previous and previous.get("analyzer") != ANALYZER_VERSION:
+        previous = None
 
     main_desc = read_text(desc_files[0])
     extra_descs = [read_text(p) for p in desc_files[1:]]
-    similar_list = parse_similar_problems_section(main_desc)
-    extra_descs.extend(similar_list)
-
-    similarity_detected, sim_reports = (False, [])
-    if extra_descs:
-        similarity_detected, sim_reports = detect_similarity(main_desc, extra_descs)
-
-    if similarity_detected:
-        reasoning = ["Similarity detected. Review halted."] + sim_reports
-        output = [
-            "Submit Review",
-            "",
-            "Decision:",
-            "",
-            "Approve",
-            "Meets quality standards",
-            "",
-            "Request Changes",
-            "Needs changes before acceptance",
-            "",
-            "Reject (selected)",
-            "Does not meet requirements",
-            "",
-            "Feedback",
-            "Sent to the author",
-            "Similarity detected between problem statements. Rejecting without further review.",
-            "",
-            "Checklist",
-            "",
-            "Optional",
-            "Problem",
-            "0/7",
-            "Requirements are complete and self-contained",
-            "YES",
-            "NO (selected)",
-            "No ambiguities, fully deterministic",
-            "YES",
-            "NO (selected)",
-            "Problem is concise and not prescriptive",
-            "YES",
-            "NO (selected)",
-            "Matches real-world repo scope",
-            "YES",
-            "NO (selected)",
-            "Aligns with repo's design philosophy",
-            "YES",
-            "NO (selected)",
-            "No irrelevant context",
-            "YES",
-            "NO (selected)",
-            "Clear writing and formatting",
-            "YES",
-            "NO (selected)",
-            "",
-            "Tests",
-            "0/8",
-            "Tests expose unimplemented or incorrect behavior",
-            "YES",
-            "NO (selected)",
-            "Tests are deterministic",
-            "YES",
-            "NO (selected)",
-            "Assertions verify correct output",
-            "YES",
-            "NO (selected)",
-            "Validates behavior, not fragile internals",
-            "YES",
-            "NO (selected)",
-            "Follows repo test structure",
-            "YES",
-            "NO (selected)",
-            "Covers required behavior and edge cases",
-            "YES",
-            "NO (selected)",
-            "No redundant tests",
-            "YES",
-            "NO (selected)",
-            "No checks for unspecified behavior",
-            "YES",
-            "NO (selected)",
-            "",
-            "Solution & Code",
-            "0/6",
-            "Meets all requirements",
-            "YES",
-            "NO (selected)",
-            "No regressions, follows repo patterns",
-            "YES",
-            "NO (selected)",
-            "No unexplained defensive code",
-            "YES",
-            "NO (selected)",
-            "No irrelevant changes",
-            "YES",
-            "NO (selected)",
-            "Existing API contracts stay stable",
-            "YES",
-            "NO (selected)",
-            "No AI-generated slop, comments, or artifacts",
-            "YES",
-            "NO (selected)",
-            "",
-            "Quality Score",
-            "Optional",
-            "1 (selected)",
-            "2",
-            "3",
-            "4",
-            "5",
-            "6",
-            "7",
-            "",
-            "Reasoning",
-            "Optional",
-            "\n".join(reasoning),
-        ]
-        output_path = problem_dir / args.output
-        output_path.write_text("\n".join(output), encoding="utf-8")
-        print(f"Feedback written to: {output_path}")
-        return
+    extra_descs.extend(parse_similar_problems_section(main_desc))
 
-    repo_validation = validate_repo(repo_url, main_desc)
+    return {
+        "problem_dir": problem_dir,
+        "repo_url": repo_url,
+        "commit_hash": commit_hash,
+        "main_desc": main_desc,
+        "extra_descs": extra_descs,
+        "has_test_patch": test_patch_file is not None,
+        "has_solution_patch": solution_patch_file is not None,
+        # Patches are streamed from disk by the analyzers; an empty file counts as missing.
+        "test_patch": test_patch_file if test_patch_file and test_patch_file.stat().st_size else "",
+        "solution_patch": solution_patch_file if solution_patch_file and solution_patch_file.stat().st_size else "",
+        # Per-file hashes of the bundle and the stored state of the last review of this directory.
+        "inputs": inputs,
+        "previous_review": previous,
+    }
 
-    docker_results = {}
-    if repo_url and commit_hash:
-        docker_results = run_docker_verification(problem_dir, repo_url, commit_hash, args.skip_docker)
+
+@tracing.traced("stage")
+def similarity_gate(submission: Dict, index_path: Optional[Path] = None, use_cache: bool = True) -> Tuple[bool, List[Dict], Dict[str, Dict]]:
+    """(detected, comparisons, index candidates re-checked) for the submission's description.
+
+    A re-review with unchanged descriptions reuses the local comparisons, but still queries
+    the index, since problems indexed since then were never compared; only candidates it
+    already re-checked reuse their stored metrics.
+    """
+    stored = review_state.reusable(submission.get("previous_review"), submission["inputs"], "similarity", str(index_path) if index_path else None) if use_cache else None
+    if stored is not None:
+        detected, comparisons, known = stored
+        # A stored detection came from a local description unless the index supplied a match.
+        detected = detected and not any(c["previously_reviewed"] for c in comparisons)
+        comparisons = [c for c in comparisons if not c["previously_reviewed"]]
     else:
-        docker_results = {"skipped": True}
+        detected, comparisons, known = False, [], {}
+        if submission["extra_descs"]:
+            detected, comparisons = detect_similarity(submission["main_desc"], submission["extra_descs"])
+    if detected or index_path is None:
+        return detected, comparisons, {}
+
+    # Screen against every problem reviewed before, then record this one for future reviews.
+    label = str(submission["problem_dir"])
+    with closing(similarity_index.open_index(index_path)) as conn:
+        matches, checked = similarity_index.screen(conn, label, submission["main_desc"], known=known)
+    comparisons.extend(similarity_comparison(match["label"], match["metrics"], previously_reviewed=True) for match in matches)
+    return bool(matches), comparisons, checked
+
+
+def similarity_reject(submission: Dict, comparisons: List[Dict], timings: Optional[Dict] = None) -> Dict:
+    """The review of a submission halted by the similarity gate: Reject, every check failed."""
+    result = new_result(submission, "Reject", 1, "Similarity detected between problem statements. Rejecting without further review.")
+    result["checklist"] = {
+        key: checklist_section(title, total, [(label, False) for label in CHECKLIST_LABELS[key]], None)
+        for key, title, total in CHECKLIST_SECTIONS
+    }
+    result["similarity"] = {"detected": True, "comparisons": comparisons}
+    result["timings"] = dict(timings or {})
+    return review_from_result(result)
+
+
+def docker_cache_key(submission: Dict, docker_options: Dict) -> str:
+    problem_dir = submission["problem_dir"]
+    inputs = [
+        find_file(problem_dir, ["Dockerfile", "dockerfile"]),
+        find_file(problem_dir, ["test.patch"]),
+        find_file(problem_dir, ["solution.patch"]),
+        find_file(problem_dir, ["test.sh"]),
+    ]
+    return result_cache.cache_key(
+        "docker-v1",
+        # Test matrices and runner counts are parsed by the scripts, not docker.
+        ANALYZER_VERSION,
+        submission["repo_url"],
+        submission["commit_hash"],
+        *[p.read_bytes() if p else None for p in inputs],
+        docker_options.get("cpus"),
+        docker_options.get("memory"),
+        docker_options.get("flaky_runs") or None,
+    )
+
+
+def docker_phase_options(docker_options: Dict) -> List:
+    # Options that can change a single test run's outcome.
+    return [docker_options.get("cpus"), docker_options.get("memory")]
 
-    problem_analysis = analyze_problem(main_desc)
-    test_patch_text = read_text(test_patch_file) if test_patch_file else ""
-    solution_patch_text = read_text(solution_patch_file) if solution_patch_file else ""
 
-    repo_dir = Path(docker_results["repo_dir"]) if docker_results.get("repo_dir") else None
-    test_analysis = analyze_tests(test_patch_text, main_desc, repo_dir, docker_results)
-    solution_analysis = analyze_solution(solution_patch_text, docker_results)
+@tracing.traced("stage")
+def cached_docker_verification(submission: Dict, skip_docker: bool, docker_options: Dict, use_cache: bool) -> Dict:
+    if skip_docker:
+        return run_docker_verification(submission["problem_dir"], submission["repo_url"], submission["commit_hash"], skip_docker)
+    key = docker_cache_key(submission, docker_options)
+    cached = result_cache.get("docker", key) if use_cache else None
+    if cached is not None:
+        cached.update(cached=True, logs={})
+        return cached
+    reuse = {}
+    if use_cache:
+        for log_key in PHASE_RESULT_KEYS:
+            record = review_state.reusable(submission.get("previous_review"), submission["inputs"], f"docker:{log_key}", docker_phase_options(docker_options))
+            if record is not None:
+                reuse[log_key] = record
+    results = run_docker_verification(submission["problem_dir"], submission["repo_url"], submission["commit_hash"], skip_docker, docker_options, reuse)
+    # Clone/build errors are often transient (network, disk); only settled outcomes are reused.
+    if not results.get("error") and not results.get("timed_out"):
+        result_cache.put("docker", key, {k: v for k, v in results.items() if k not in ("logs", "reused_phases", "worktrees", "queued_seconds", "base_image_source")})
+    return results
+
 
+def save_review_state(submission: Dict, similarity: Tuple[bool, List[Dict], Dict[str, Dict]], index_path: Optional[Path], docker_results: Optional[Dict], docker_options: Dict) -> None:
+    """Store this review's inputs and stage results so a resubmission reruns only what changed."""
+    stages = review_state.carry_over(submission.get("previous_review"), submission["inputs"])
+    stages["similarity"] = {"options": str(index_path) if index_path else None, "value": list(similarity)}
+    phases = (docker_results or {}).get("phases") or {}
+    for log_key in PHASE_RESULT_KEYS:
+        if phases.get(f"run_{log_key}") == "ok":
+            stages[f"docker:{log_key}"] = {"options": docker_phase_options(docker_options), "value": phase_record(docker_results, log_key)}
+    review_state.save(submission["problem_dir"], {"analyzer": ANALYZER_VERSION, "inputs": submission["inputs"], "stages": stages})
+
+
+def problem_cache_key(text: str) -> str:
+    return result_cache.cache_key("analyze_problem", ANALYZER_VERSION, text)
+
+
+@tracing.traced("stage")
+def cached_analyze_problem(text: str, use_cache: bool = True) -> Dict:
+    key = problem_cache_key(text)
+    cached = result_cache.get("analyze_problem", key) if use_cache else None
+    if cached is not None:
+        return cached
+    analysis = analyze_problem(text)
+    result_cache.put("analyze_problem", key, analysis)
+    return analysis
+
+
+def early_exit_reasons(submission: Dict, repo_validation: Dict, solution_stats: Optional[Dict]) -> List[str]:
+    """Cheap checks that settle the decision whatever the Docker runs show.
+
+    A hard-requirement failure is a Reject and missing patches or a short solution rule out
+    Approve; in each case the Docker results could only change the checklist, not the decision.
+    """
+    reasons = []
+    if not submission["has_test_patch"] or not submission["has_solution_patch"]:
+        reasons.append("required patch files are missing")
+    if solution_stats is not None and solution_stats["added"] < MIN_SOLUTION_LOC:
+        reasons.append(f"solution adds {solution_stats['added']} lines, below the {MIN_SOLUTION_LOC} LOC minimum")
+    reasons.extend(f"hard requirement failed ({r})" for r in repo_validation.get("hard_failures", []))
+    return reasons
+
+
+def run_io_stages(submission: Dict, skip_docker: bool = False, docker_options: Optional[Dict] = None, use_cache: bool = True, solution_stats: Optional[Dict] = None) -> Tuple[Dict, Dict]:
+    # Validation runs first: when it or the other decisive checks already settle the
+    # decision, the clone, builds and test runs are skipped.
+    repo_validation = validate_repo(submission["repo_url"], submission["main_desc"], use_cache)
+    if not (submission["repo_url"] and submission["commit_hash"]):
+        return repo_validation, {"skipped": True}
+    if not skip_docker:
+        if solution_stats is None and submission["solution_patch"]:
+            solution_stats = diff_stats(submission["solution_patch"])
+        reasons = early_exit_reasons(submission, repo_validation, solution_stats)
+        if reasons:
+            return repo_validation, {"skipped": True, "early_exit": reasons}
+    return repo_validation, cached_docker_verification(submission, skip_docker, docker_options or {}, use_cache)
+
+
+def prepare_static_stages(submission: Dict, use_cache: bool = True, scans: Optional[Dict[str, Optional[Dict]]] = None) -> Tuple[Dict, Dict[str, Optional[Dict]]]:
+    # Everything that does not read docker_results: the problem analysis and the patch scans.
+    problem_analysis = cached_analyze_problem(submission["main_desc"], use_cache)
+    token_profile(submission["main_desc"])
+    scans = dict(scans or {})
+    for key in ("test_patch", "solution_patch"):
+        if key not in scans:
+            scans[key] = scan_patch(submission[key]) if submission[key] else None
+    return problem_analysis, scans
+
+
+def run_static_stages(submission: Dict, docker_results: Dict, use_cache: bool = True, prepared: Optional[Tuple[Dict, Dict]] = None) -> Tuple[Dict, Dict, Dict]:
+    problem_analysis, scans = prepared or prepare_static_stages(submission, use_cache)
+    test_analysis = analyze_tests(submission["test_patch"], submission["main_desc"], None, docker_results, scans["test_patch"])
+    solution_analysis = analyze_solution(submission["solution_patch"], docker_results, scans["solution_patch"])
+    return problem_analysis, test_analysis, solution_analysis
+
+
+def assemble_review(submission: Dict, repo_validation: Dict, docker_results: Dict, problem_analysis: Dict, test_analysis: Dict, solution_analysis: Dict, similarity: Tuple[bool, List[Dict], Dict[str, Dict]] = (False, [], {}), timings: Optional[Dict] = None) -> Dict:
     problem_checks = problem_analysis["checks"]
     test_checks = test_analysis["checks"]
     solution_checks = solution_analysis["checks"]
@@ -1116,16 +1613,21 @@ def main():
     quality_score = min(problem_rating, test_rating, solution_rating)
 
     reject_reasons = list(repo_validation.get("reject_reasons", []))
-    fixable_issues = []
+    fixable_issues = list(repo_validation.get("unavailable", []))
 
-    if not test_patch_file or not solution_patch_file:
+    if not submission["has_test_patch"] or not submission["has_solution_patch"]:
         fixable_issues.append("Missing required patch files")
     if docker_results.get("error"):
         fixable_issues.append(docker_results["error"])
+    timed_out = docker_results.get("timed_out") or {}
+    # Build timeouts already surface as the error; test runs stopped at their limit are listed
+    # in place of the pass/fail verdict they could not give.
+    fixable_issues.extend(message for name, message in timed_out.items() if name.startswith("run_"))
     if not docker_results.get("skipped"):
-        if test_patch_file and not docker_results.get("new_only_fail", False):
+        if submission["has_test_patch"] and not docker_results.get("new_only_fail", False) and "run_new_without_solution" not in timed_out:
             fixable_issues.append("New tests do not fail on base commit")
-        if solution_patch_file and (not docker_results.get("solution_new_pass", False) or not docker_results.get("solution_base_pass", False)):
+        solution_timed_out = "run_base_with_solution" in timed_out or "run_new_with_solution" in timed_out
+        if submission["has_solution_patch"] and not solution_timed_out and (not docker_results.get("solution_new_pass", False) or not docker_results.get("solution_base_pass", False)):
             fixable_issues.append("Tests do not pass with solution applied")
 
     if reject_reasons:
@@ -1144,69 +1646,220 @@ def main():
     if not issues:
         issues.append("No major issues found")
 
-    feedback_text = build_feedback(issues, decision)
-
-    stats = solution_analysis.get("stats")
-    reasoning = build_reasoning(
-        problem_analysis,
-        test_analysis,
-        solution_analysis,
-        docker_results,
-        problem_analysis["word_count"],
-        stats,
-        decision,
-        fixable_issues,
+    checks = {
+        "problem": (problem_checks, problem_rating),
+        "tests": (test_checks, test_rating),
+        "solution": (solution_checks, solution_rating),
+    }
+    result = new_result(submission, decision, quality_score, build_feedback(issues, decision))
+    result.update(
+        issues=issues,
+        fixable_issues=fixable_issues,
+        reject_reasons=reject_reasons,
+        fixes=fix_suggestions(fixable_issues) if decision == "Request Changes" else [],
+        checklist={key: checklist_section(title, total, *checks[key]) for key, title, total in CHECKLIST_SECTIONS},
+        problem={"word_count": problem_analysis["word_count"], "issues": list(problem_analysis["issues"])},
+        tests={"issues": list(test_analysis["issues"])},
+        solution={"issues": list(solution_analysis["issues"]), "diff_stats": solution_analysis.get("stats") or None},
+        repository={
+            "owner_repo": repo_validation.get("owner_repo"),
+            **{key: list(repo_validation.get(key, [])) for key in ("issues", "notes", "reject_reasons")},
+        },
+        similarity={"detected": similarity[0], "comparisons": list(similarity[1])},
+        docker=docker_section(docker_results),
+        timings=dict(timings or {}),
     )
+    return review_from_result(result)
 
-    problem_block, problem_yes = format_checklist(problem_checks)
-    test_block, test_yes = format_checklist(test_checks)
-    solution_block, solution_yes = format_checklist(solution_checks)
-
-    output_lines = [
-        "Submit Review",
-        "",
-        "Decision:",
-        "",
-        f"Approve{' (selected)' if decision == 'Approve' else ''}",
-        "Meets quality standards",
-        "",
-        f"Request Changes{' (selected)' if decision == 'Request Changes' else ''}",
-        "Needs changes before acceptance",
-        "",
-        f"Reject{' (selected)' if decision == 'Reject' else ''}",
-        "Does not meet requirements",
-        "",
-        "Feedback",
-        "Sent to the author",
-        feedback_text,
-        "",
-        "Checklist",
-        "",
-        "Optional",
-        "Problem",
-        f"{problem_yes}/7",
-        problem_block,
-        "",
-        "Tests",
-        f"{test_yes}/8",
-        test_block,
-        "",
-        "Solution & Code",
-        f"{solution_yes}/6",
-        solution_block,
-        "",
-        "Quality Score",
-        "Optional",
-        format_quality_score(quality_score),
-        "",
-        "Reasoning",
-        "Optional",
-        reasoning,
-    ]
 
+def timed(timings: Dict[str, float], name: str, fn: Callable, *args):
+    """fn(*args), adding its wall time to timings[name]."""
+    started = time.perf_counter()
+    try:
+        return fn(*args)
+    finally:
+        timings[name] = round(timings.get(name, 0) + time.perf_counter() - started, 3)
+
+
+def review_submission(submission: Dict, skip_docker: bool = False, docker_options: Optional[Dict] = None, use_cache: bool = True, index_path: Optional[Path] = None) -> Dict:
+    started = time.perf_counter()
+    timings: Dict[str, float] = {}
+    similarity = timed(timings, "similarity", similarity_gate, submission, index_path, use_cache)
+    if similarity[0]:
+        save_review_state(submission, similarity, index_path, None, docker_options or {})
+        timings["total"] = round(time.perf_counter() - started, 3)
+        return similarity_reject(submission, similarity[1], timings)
+
+    # The solution scan comes first because its LOC count feeds the early-exit checks. Repo
+    # validation and Docker then run on a worker thread while the rest of the static analysis
+    # runs here; only the checklist items that read docker_results wait for them.
+    solution_scan = timed(timings, "analysis", scan_patch, submission["solution_patch"]) if submission["solution_patch"] else None
+    solution_stats = patch_stats(solution_scan) if solution_scan else None
+    with ThreadPoolExecutor(max_workers=1, thread_name_prefix="io") as pool:
+        io_stages = pool.submit(timed, timings, "validation_and_docker", run_io_stages, submission, skip_docker, docker_options, use_cache, solution_stats)
+        prepared = timed(timings, "analysis", prepare_static_stages, submission, use_cache, {"solution_patch": solution_scan})
+        repo_validation, docker_results = io_stages.result()
+    problem_analysis, test_analysis, solution_analysis = timed(timings, "analysis", run_static_stages, submission, docker_results, use_cache, prepared)
+    save_review_state(submission, similarity, index_path, docker_results, docker_options or {})
+    timings["total"] = round(time.perf_counter() - started, 3)
+    return assemble_review(submission, repo_validation, docker_results, problem_analysis, test_analysis, solution_analysis, similarity, timings)
+
+
+def add_docker_arguments(parser: argparse.ArgumentParser) -> None:
+    parser.add_argument("--phase-concurrency", type=int, default=2, help="Docker build/test phases run in parallel per review")
+    parser.add_argument("--container-cpus", help="CPU quota per test container (docker run --cpus)")
+    parser.add_argument("--container-memory", help="Memory limit per test container (docker run --memory)")
+    parser.add_argument("--flaky-runs", type=int, default=0, help="Rerun ./test.sh new this many times with and without the solution to find flaky tests")
+    parser.add_argument("--flaky-budget", type=int, default=FLAKY_BUDGET, help="Wall-clock seconds allowed for all flakiness reruns of a review")
+    parser.add_argument("--flaky-concurrency", type=int, default=2, help="Flakiness reruns running at once per review")
+    parser.add_argument("--keep-worktrees", action="store_true", help="Keep the base, test and solution work trees under the cache dir for inspection and later reviews")
+
+
+def add_cache_arguments(parser: argparse.ArgumentParser) -> None:
+    parser.add_argument("--no-cache", action="store_true", help="Ignore cached stage results (fresh results are still stored)")
+    parser.add_argument("--cache-stats", action="store_true", help="Print result cache hit/miss and size statistics")
+
+
+def add_similarity_arguments(parser: argparse.ArgumentParser) -> None:
+    parser.add_argument("--similarity-index", help="Similarity index of previously reviewed problems (default: under the cache dir)")
+    parser.add_argument("--no-similarity-index", action="store_true", help="Only compare against descriptions in the problem directory")
+
+
+def similarity_index_from_args(args: argparse.Namespace) -> Optional[Path]:
+    if args.no_similarity_index:
+        return None
+    return Path(args.similarity_index) if args.similarity_index else similarity_index.default_index_path()
+
+
+def docker_options_from_args(args: argparse.Namespace) -> Dict:
+    return {
+        "concurrency": max(1, args.phase_concurrency),
+        "cpus": args.container_cpus,
+        "memory": args.container_memory,
+        "flaky_runs": max(0, args.flaky_runs),
+        "flaky_budget": max(1, args.flaky_budget),
+        "flaky_concurrency": max(1, args.flaky_concurrency),
+        "keep_worktrees": args.keep_worktrees,
+    }
+
+
+def write_result(output_path: Path, review: Dict) -> Path:
+    """Write the review's result object as JSON next to its feedback file."""
+    path = output_path.with_suffix(".json")
+    path.write_text(review_schema.dumps(review["result"], indent=2) + "\n", encoding="utf-8")
+    return path
+
+
+def write_traces(output_path: Path, submission: Dict, review: Dict, chrome: bool = False) -> None:
+    events = tracing.stop()
+    metadata = {
+        "problem_dir": str(submission["problem_dir"]),
+        "repo_url": submission["repo_url"],
+        "commit": submission["commit_hash"],
+        "decision": review["decision"],
+        "quality_score": review["quality_score"],
+    }
+    trace_path = output_path.with_suffix(".trace.json")
+    tracing.write_trace(trace_path, events, metadata)
+    print(f"Trace written to: {trace_path}")
+    if chrome:
+        chrome_path = output_path.with_suffix(".chrome-trace.json")
+        tracing.write_chrome_trace(chrome_path, events)
+        print(f"Chrome trace written to: {chrome_path}")
+
+
+def review_via_daemon(address: str, args: argparse.Namespace, problem_dir: Path) -> None:
+    index_path = similarity_index_from_args(args)
+    try:
+        job = daemon_client.submit(address, {
+            "problem_dir": str(problem_dir),
+            "repo_url": args.repo_url,
+            "commit": args.commit,
+            "skip_docker": args.skip_docker,
+            "output": args.output,
+            "json": not args.no_json,
+            "priority": args.priority,
+            "docker_options": docker_options_from_args(args),
+            "use_cache": not args.no_cache,
+            "index_path": str(index_path) if index_path else None,
+        })
+        if job["state"] == "queued" and job.get("position", 1) > 1:
+            print(f"Queued on the review daemon at position {job['position']}")
+        job = daemon_client.wait(address, job["id"])
+    except (OSError, daemon_client.DaemonError) as e:
+        print(f"Error: Review daemon at {address}: {e}")
+        raise SystemExit(1)
+    if job["state"] == "failed":
+        print(f"Error: {job['error']}")
+        raise SystemExit(1)
+    print(f"Feedback written to: {job['output']}")
+    if job.get("json_output"):
+        print(f"Result written to: {job['json_output']}")
+    if args.cache_stats:
+        # Counters are the daemon's, accumulated over every review it has run.
+        _, report = daemon_client.request(address, "GET", "/stats")
+        print("\n".join(result_cache.format_stats(report)))
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Automated Code Eval Problem Reviewer")
+    parser.add_argument("problem_dir", help="Directory containing problem files")
+    parser.add_argument("--repo-url", help="GitHub repository URL")
+    parser.add_argument("--commit", help="Base commit hash")
+    parser.add_argument("--skip-docker", action="store_true", help="Skip Docker verification")
+    parser.add_argument("--output", default="feedback.md", help="Output file name")
+    parser.add_argument("--no-json", action="store_true", help="Do not write the structured result (the output name with a .json suffix)")
+    add_docker_arguments(parser)
+    add_cache_arguments(parser)
+    add_similarity_arguments(parser)
+    parser.add_argument("--no-trace", action="store_true", help="Do not write the timing trace next to the feedback file")
+    parser.add_argument("--chrome-trace", action="store_true", help="Also write the trace in Chrome trace-event format")
+    parser.add_argument("--daemon", metavar="ADDRESS", help="Review daemon socket path or http://127.0.0.1:PORT (default: the default socket, when a daemon is listening)")
+    parser.add_argument("--no-daemon", action="store_true", help="Review in this process even when a review daemon is running")
+    parser.add_argument("--priority", type=int, default=0, help="Queue priority of this review on the daemon (higher runs first)")
+    args = parser.parse_args()
+
+    problem_dir = Path(args.problem_dir).resolve()
+    if not problem_dir.exists():
+        print(f"Error: Problem directory not found: {problem_dir}")
+        raise SystemExit(1)
+
+    # Daemon reviews are not traced, so an explicit --chrome-trace keeps the review here.
+    if not args.no_daemon and not args.chrome_trace:
+        found = daemon_client.find_daemon(args.daemon)
+        if found is None and args.daemon:
+            print(f"Error: No review daemon at {args.daemon}")
+            raise SystemExit(1)
+        # ANALYZER_VERSION covers every script, so a daemon started before any of them changed
+        # is caught here, not just one started before review_problem.py did.
+        if found and found[1].get("analyzer") != ANALYZER_VERSION:
+            print("Note: the review daemon runs different reviewer code (restart it); reviewing in this process")
+        elif found:
+            review_via_daemon(found[0], args, problem_dir)
+            if not args.no_trace:
+                # The tracer is process-wide and the daemon runs reviews concurrently.
+                print("Note: reviews run on the daemon are not traced; no trace was written (use --no-daemon for one)")
+            return
+
+    if not args.no_trace:
+        tracing.start()
+    try:
+        submission = load_submission(problem_dir, args.repo_url, args.commit)
+    except FileNotFoundError as e:
+        print(f"Error: {e}")
+        raise SystemExit(1)
+
+    with tracing.span("review", "review"):
+        review = review_submission(submission, args.skip_docker, docker_options_from_args(args), not args.no_cache, similarity_index_from_args(args))
     output_path = problem_dir / args.output
-    output_path.write_text("\n".join(output_lines), encoding="utf-8")
+    output_path.write_text(review["text"], encoding="utf-8")
     print(f"Feedback written to: {output_path}")
+    if not args.no_json:
+        print(f"Result written to: {write_result(output_path, review)}")
+    if not args.no_trace:
+        write_traces(output_path, submission, review, args.chrome_trace)
+    if args.cache_stats:
+        print("\n".join(result_cache.format_stats(result_cache.stats())))
 
 
 if __name__ == "__main__":
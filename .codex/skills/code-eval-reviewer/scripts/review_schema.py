@@ -0,0 +1,244 @@
+#!/usr/bin/env python3
+"""
+Code Eval Reviewer - Review Result Schema
+
+Usage:
+    python3 review_schema.py            # print the JSON Schema of a review result
+
+Every review produces one result object; feedback.md is rendered from it and it is written
+as JSON next to it (one object per line, NDJSON, for batches). SCHEMA_VERSION is bumped
+whenever a field is renamed, removed or changes meaning; adding a field does not bump it.
+"""
+
+import json
+from typing import Dict, List
+
+SCHEMA_VERSION = 1
+SCHEMA_ID = f"urn:code-eval-reviewer:review-result:{SCHEMA_VERSION}"
+
+_STRINGS = {"type": "array", "items": {"type": "string"}}
+_NULLABLE_STRING = {"type": ["string", "null"]}
+_CHECKLIST_SECTION = {
+    "type": "object",
+    "required": ["title", "passed", "total", "rating", "checks"],
+    "properties": {
+        "title": {"type": "string"},
+        "passed": {"type": "integer", "minimum": 0},
+        "total": {"type": "integer", "minimum": 0},
+        # 1-7 from the section's checks; null when the review halted before the analysis.
+        "rating": {"type": ["integer", "null"], "minimum": 1, "maximum": 7},
+        "checks": {
+            "type": "array",
+            "items": {
+                "type": "object",
+                "required": ["label", "passed"],
+                "properties": {"label": {"type": "string"}, "passed": {"type": "boolean"}},
+            },
+        },
+    },
+}
+_RUNNER_SUMMARY = {
+    "type": ["object", "null"],
+    "required": ["runners", "passed", "failed", "skipped", "errors"],
+    "properties": {
+        "runners": _STRINGS,
+        "passed": {"type": "integer"},
+        "failed": {"type": "integer"},
+        "skipped": {"type": "integer"},
+        "errors": {"type": "integer"},
+    },
+}
+_PHASE = {
+    "type": "object",
+    "required": ["passed", "exit_code", "timed_out", "reused", "seconds", "summary", "log"],
+    "properties": {
+        # For new_without_solution, "passed" means the new tests failed, as they should.
+        "passed": {"type": "boolean"},
+        "exit_code": {"type": ["integer", "null"]},
+        "timed_out": _NULLABLE_STRING,
+        "reused": {"type": "boolean"},
+        "seconds": {"type": ["number", "null"]},
+        "summary": _RUNNER_SUMMARY,
+        # Where the run's full output was streamed; null for cached results.
+        "log": {
+            "type": ["object", "null"],
+            "required": ["path", "bytes", "truncated"],
+            "properties": {"path": {"type": "string"}, "bytes": {"type": "integer"}, "truncated": {"type": "boolean"}},
+        },
+    },
+}
+
+SCHEMA: Dict = {
+    "$schema": "https://json-schema.org/draft/2020-12/schema",
+    "$id": SCHEMA_ID,
+    "title": "Code eval review result",
+    "type": "object",
+    "required": [
+        "schema_version", "analyzer", "problem_dir", "repo_url", "commit", "decision", "quality_score",
+        "feedback", "issues", "fixable_issues", "reject_reasons", "fixes", "checklist", "problem", "tests",
+        "solution", "repository", "similarity", "docker", "timings",
+    ],
+    "properties": {
+        "schema_version": {"const": SCHEMA_VERSION},
+        "analyzer": {"type": "string"},
+        "problem_dir": {"type": "string"},
+        "repo_url": _NULLABLE_STRING,
+        "commit": _NULLABLE_STRING,
+        "decision": {"enum": ["Approve", "Request Changes", "Reject"]},
+        "quality_score": {"type": "integer", "minimum": 1, "maximum": 7},
+        "feedback": {"type": "string"},
+        "issues": _STRINGS,
+        "fixable_issues": _STRINGS,
+        "reject_reasons": _STRINGS,
+        "fixes": _STRINGS,
+        "checklist": {
+            "type": "object",
+            "required": ["problem", "tests", "solution"],
+            "properties": {"problem": _CHECKLIST_SECTION, "tests": _CHECKLIST_SECTION, "solution": _CHECKLIST_SECTION},
+        },
+        "problem": {
+            "type": ["object", "null"],
+            "required": ["word_count", "issues"],
+            "properties": {"word_count": {"type": "integer"}, "issues": _STRINGS},
+        },
+        "tests": {"type": ["object", "null"], "required": ["issues"], "properties": {"issues": _STRINGS}},
+        "solution": {
+            "type": ["object", "null"],
+            "required": ["issues", "diff_stats"],
+            "properties": {
+                "issues": _STRINGS,
+                "diff_stats": {
+                    "type": ["object", "null"],
+                    "properties": {
+                        "added": {"type": "integer"},
+                        "code": {"type": "integer"},
+                        "comment": {"type": "integer"},
+                        "dup_ratio": {"type": "number"},
+                        "comment_ratio": {"type": "number"},
+                        "suspicious": {"type": "integer"},
+                    },
+                },
+            },
+        },
+        "repository": {
+            "type": ["object", "null"],
+            "required": ["owner_repo", "issues", "notes", "reject_reasons"],
+            "properties": {"owner_repo": _NULLABLE_STRING, "issues": _STRINGS, "notes": _STRINGS, "reject_reasons": _STRINGS},
+        },
+        "similarity": {
+            "type": "object",
+            "required": ["detected", "comparisons"],
+            "properties": {
+                "detected": {"type": "boolean"},
+                "comparisons": {
+                    "type": "array",
+                    "items": {
+                        "type": "object",
+                        "required": ["against", "previously_reviewed", "behavioural", "implementation", "requirement"],
+                        "properties": {
+                            "against": {"type": "string"},
+                            "previously_reviewed": {"type": "boolean"},
+                            "behavioural": {"type": "number"},
+                            "implementation": {"type": "number"},
+                            "requirement": {"type": "number"},
+                        },
+                    },
+                },
+            },
+        },
+        "docker": {
+            "type": ["object", "null"],
+            "required": ["skipped", "early_exit", "cached", "error", "build_success", "base_image_source", "phases", "steps", "step_seconds", "timed_out", "test_matrix", "flakiness", "patches", "queued_seconds", "reused_phases", "worktrees"],
+            "properties": {
+                "skipped": {"type": "boolean"},
+                "early_exit": _STRINGS,
+                "cached": {"type": "boolean"},
+                "error": _NULLABLE_STRING,
+                "build_success": {"type": "boolean"},
+                "base_image_source": {"enum": ["cached", "warm", "built", None]},
+                "phases": {
+                    "type": "object",
+                    "properties": {key: _PHASE for key in ("base_only", "new_without_solution", "base_with_solution", "new_with_solution")},
+                },
+                # Step name -> "ok", "failed", "skipped" or "timed out".
+                "steps": {"type": "object"},
+                # Step name -> wall seconds, from the run that produced these results.
+                "step_seconds": {"type": "object"},
+                "timed_out": {"type": "object"},
+                # "new"/"base" -> {category: [test names], "before": n, "after": n}.
+                "test_matrix": {"type": "object"},
+                "flakiness": {"type": ["object", "null"]},
+                "patches": {"type": "object"},
+                "queued_seconds": {"type": "number"},
+                "reused_phases": _STRINGS,
+                "worktrees": {"type": ["object", "null"]},
+            },
+        },
+        # Stage name -> wall seconds spent in it by this review.
+        "timings": {"type": "object"},
+    },
+}
+
+_TYPES = {
+    "object": dict,
+    "array": list,
+    "string": str,
+    "boolean": bool,
+    "null": type(None),
+}
+
+
+def _is_type(value, name: str) -> bool:
+    if name == "integer":
+        return isinstance(value, int) and not isinstance(value, bool)
+    if name == "number":
+        return isinstance(value, (int, float)) and not isinstance(value, bool)
+    return isinstance(value, _TYPES[name])
+
+
+def validate(value, schema: Dict = SCHEMA, path: str = "$") -> List[str]:
+    """Errors of value against schema; covers the keywords SCHEMA uses, not all of JSON Schema."""
+    errors: List[str] = []
+    if "const" in schema and value != schema["const"]:
+        return [f"{path}: expected {schema['const']!r}"]
+    if "enum" in schema and value not in schema["enum"]:
+        return [f"{path}: {value!r} is not one of {schema['enum']}"]
+    types = schema.get("type")
+    if types is not None:
+        types = [types] if isinstance(types, str) else types
+        if not any(_is_type(value, t) for t in types):
+            return [f"{path}: expected {' or '.join(types)}"]
+    if isinstance(value, (int, float)) and not isinstance(value, bool):
+        if "minimum" in schema and value < schema["minimum"]:
+            errors.append(f"{path}: below {schema['minimum']}")
+        if "maximum" in schema and value > schema["maximum"]:
+            errors.append(f"{path}: above {schema['maximum']}")
+    if isinstance(value, dict):
+        errors.extend(f"{path}: missing {key}" for key in schema.get("required", []) if key not in value)
+        for key, sub in schema.get("properties", {}).items():
+            if key in value:
+                errors.extend(validate(value[key], sub, f"{path}.{key}"))
+    if isinstance(value, list) and "items" in schema:
+        for i, item in enumerate(value):
+            errors.extend(validate(item, schema["items"], f"{path}[{i}]"))
+    return errors
+
+
+def dumps(result: Dict, indent=None) -> str:
+    """A result as JSON; indent=None gives the single line used in NDJSON.
+
+    Raises ValueError when the result does not match SCHEMA, so nothing is written that
+    consumers of this schema version would misread.
+    """
+    errors = validate(result)
+    if errors:
+        raise ValueError(f"Review result does not match schema version {SCHEMA_VERSION}: " + "; ".join(errors[:5]))
+    return json.dumps(result, indent=indent)
+
+
+def main():
+    print(json.dumps(SCHEMA, indent=2))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,86 @@
+import hashlib
+import json
+import os
+import threading
+from pathlib import Path
+from typing import Dict, List, Optional, Set
+
+from cache_dirs import cache_dir
+
+# "repo" is the URL and commit actually used, which --repo-url/--commit can override.
+BUNDLE_INPUTS = ("setup.sh", "repo", "Dockerfile", "test.sh", "test.patch", "solution.patch", "Problem-Description.txt")
+_DOCKER_BASE = ("setup.sh", "repo", "Dockerfile", "test.sh")
+# Stage -> inputs whose change invalidates its stored result. Repository validation is not
+# listed: it depends on live GitHub state and always reruns (its HTTP cache keeps it cheap).
+STAGE_INPUTS = {
+    "similarity": ("Problem-Description.txt",),
+    "docker:base_only": _DOCKER_BASE,
+    "docker:new_without_solution": _DOCKER_BASE + ("test.patch",),
+    "docker:base_with_solution": _DOCKER_BASE + ("test.patch", "solution.patch"),
+    "docker:new_with_solution": _DOCKER_BASE + ("test.patch", "solution.patch"),
+}
+
+
+def hash_files(*paths: Optional[Path]) -> Optional[str]:
+    """Content hash of the given files, or None when none of them exist."""
+    paths = [p for p in paths if p]
+    if not paths:
+        return None
+    digest = hashlib.sha256()
+    for path in paths:
+        with open(path, "rb") as fh:
+            for chunk in iter(lambda: fh.read(1024 * 1024), b""):
+                digest.update(chunk)
+        digest.update(b"\0")
+    return digest.hexdigest()
+
+
+def state_path(problem_dir: Path) -> Path:
+    key = hashlib.sha256(str(Path(problem_dir).resolve()).encode("utf-8")).hexdigest()[:24]
+    return cache_dir("reviews") / f"{key}.json"
+
+
+def load(problem_dir: Path) -> Optional[Dict]:
+    try:
+        return json.loads(state_path(problem_dir).read_text(encoding="utf-8"))
+    except (OSError, ValueError):
+        return None
+
+
+def save(problem_dir: Path, state: Dict) -> None:
+    path = state_path(problem_dir)
+    tmp = path.with_suffix(f".{os.getpid()}.{threading.get_ident()}.tmp")
+    tmp.write_text(json.dumps(state), encoding="utf-8")
+    os.replace(tmp, path)
+
+
+def changed_inputs(previous: Optional[Dict], inputs: Dict[str, Optional[str]]) -> Optional[List[str]]:
+    """Bundle inputs that differ from the previous review, or None when there was none."""
+    if previous is None:
+        return None
+    return [name for name in BUNDLE_INPUTS if previous["inputs"].get(name) != inputs.get(name)]
+
+
+def stale_stages(previous: Optional[Dict], inputs: Dict[str, Optional[str]]) -> Set[str]:
+    changed = changed_inputs(previous, inputs)
+    if changed is None:
+        return set(STAGE_INPUTS)
+    return {stage for stage, names in STAGE_INPUTS.items() if set(names) & set(changed)}
+
+
+def reusable(previous: Optional[Dict], inputs: Dict[str, Optional[str]], stage: str, options) -> Optional[Dict]:
+    """The previous review's result for stage, if its inputs and options are unchanged."""
+    if previous is None or stage in stale_stages(previous, inputs):
+        return None
+    entry = previous["stages"].get(stage)
+    if entry is None or entry["options"] != options:
+        return None
+    return entry["value"]
+
+
+def carry_over(previous: Optional[Dict], inputs: Dict[str, Optional[str]]) -> Dict[str, Dict]:
+    """Stored stage entries that are still valid for inputs, to merge with fresh ones."""
+    if previous is None:
+        return {}
+    stale = stale_stages(previous, inputs)
+    return {stage: entry for stage, entry in previous["stages"].items() if stage not in stale}
@@ -0,0 +1,88 @@
+import re
+from typing import Dict, Optional
+
+ANSI_ESCAPE = re.compile(r"\x1b\[[0-9;]*[A-Za-z]")
+# "==== 1 failed, 10 passed, 2 skipped in 0.52s ====", matched after the rules are stripped
+# (pytest -q prints it without them).
+PYTEST_SUMMARY = re.compile(r"^((?:\d+ \w+(?:, )?)+)\s+in [\d.]+s\b")
+PYTEST_COUNT = re.compile(r"(\d+) (passed|failed|errors?|skipped|xfailed|xpassed)")
+# "Tests:       1 failed, 2 skipped, 10 passed, 13 total"
+JEST_SUMMARY = re.compile(r"^Tests:\s+(.*\d+ total)")
+JEST_COUNT = re.compile(r"(\d+) (passed|failed|skipped|todo)")
+# Top-level "--- PASS: TestName (0.00s)"; indented lines are subtests.
+GO_RESULT = re.compile(r"^--- (PASS|FAIL|SKIP): ")
+# "test result: FAILED. 5 passed; 1 failed; 2 ignored; 0 measured; 0 filtered out"
+CARGO_SUMMARY = re.compile(r"^test result: \w+\. (\d+) passed; (\d+) failed; (\d+) ignored")
+
+COUNT_FIELDS = {
+    "passed": "passed", "xpassed": "passed",
+    "failed": "failed",
+    "skipped": "skipped", "xfailed": "skipped", "todo": "skipped",
+    "error": "errors", "errors": "errors",
+}
+GO_FIELDS = {"PASS": "passed", "FAIL": "failed", "SKIP": "skipped"}
+# Lines any of the runners above could be on; one pass of this over a block of output
+# picks them out so the per-runner patterns only see a handful of lines.
+CANDIDATE_LINE = re.compile(r"^(?:--- (?:PASS|FAIL|SKIP): |test result: |Tests:|[= ]*\d+ .* in [\d.]+s).*$", re.MULTILINE)
+
+
+def new_summary() -> Dict:
+    return {"runners": [], "passed": 0, "failed": 0, "skipped": 0, "errors": 0}
+
+
+def _count(summary: Dict, runner: str, counts: Dict[str, int]) -> None:
+    if runner not in summary["runners"]:
+        summary["runners"].append(runner)
+    for field, n in counts.items():
+        summary[field] += n
+
+
+def feed(summary: Dict, line: str) -> None:
+    """Fold one line of test output into summary; lines no runner recognizes are ignored."""
+    if "\x1b" in line:
+        line = ANSI_ESCAPE.sub("", line)
+    line = line.rstrip()
+    if line.startswith("--- "):
+        m = GO_RESULT.match(line)
+        if m:
+            _count(summary, "go test", {GO_FIELDS[m.group(1)]: 1})
+    elif line.startswith("test result: "):
+        m = CARGO_SUMMARY.match(line)
+        if m:
+            passed, failed, ignored = map(int, m.groups())
+            _count(summary, "cargo test", {"passed": passed, "failed": failed, "skipped": ignored})
+    elif line.startswith("Tests:"):
+        m = JEST_SUMMARY.match(line)
+        if m:
+            counts: Dict[str, int] = {}
+            for n, word in JEST_COUNT.findall(m.group(1)):
+                field = COUNT_FIELDS[word]
+                counts[field] = counts.get(field, 0) + int(n)
+            _count(summary, "jest", counts)
+    elif " in " in line:
+        stripped = line.lstrip("= ")
+        m = PYTEST_SUMMARY.match(stripped) if stripped[:1].isdigit() else None
+        if m:
+            counts = {}
+            for n, word in PYTEST_COUNT.findall(m.group(1)):
+                field = COUNT_FIELDS[word]
+                counts[field] = counts.get(field, 0) + int(n)
+            if counts:
+                _count(summary, "pytest", counts)
+
+
+def feed_text(summary: Dict, text: str) -> None:
+    # Takes a block of complete lines, as delivered by commands.stream_command.
+    if "\x1b" in text:
+        text = ANSI_ESCAPE.sub("", text)
+    for m in CANDIDATE_LINE.finditer(text):
+        feed(summary, m.group(0))
+
+
+def format_summary(summary: Optional[Dict]) -> Optional[str]:
+    if not summary or not summary["runners"]:
+        return None
+    return (
+        f"{'+'.join(summary['runners'])}: {summary['passed']} passed, {summary['failed']} failed, "
+        f"{summary['skipped']} skipped, {summary['errors']} errors"
+    )
@@ -0,0 +1,156 @@
+import hashlib
+import json
+import sqlite3
+import time
+from array import array
+from functools import lru_cache
+from pathlib import Path
+from typing import Dict, FrozenSet, List, Optional, Tuple
+
+from cache_dirs import cache_dir
+from text_engine import SIMILARITY_VIEWS, profile_similarity, token_profile
+
+SIMILARITY_THRESHOLD = 60.0
+NUM_PERM = 128
+# 32 bands of 4 rows: a pair at 60% Jaccard shares a bucket in some band ~99% of the time,
+# one at 20% only ~5% of the time, so few unrelated problems reach the exact re-check.
+BANDS = 32
+ROWS = NUM_PERM // BANDS
+MERSENNE_PRIME = (1 << 61) - 1
+SCHEME = f"minhash-{NUM_PERM}x{BANDS}-v1"
+
+
+def _hash64(data: bytes) -> int:
+    return int.from_bytes(hashlib.blake2b(data, digest_size=8).digest(), "big")
+
+
+# Signatures are persisted, so the permutations are derived from fixed seeds rather than
+# from a random generator.
+PERMUTATIONS = [
+    (_hash64(f"a{i}".encode()) % MERSENNE_PRIME | 1, _hash64(f"b{i}".encode()) % MERSENNE_PRIME)
+    for i in range(NUM_PERM)
+]
+
+
+def default_index_path() -> Path:
+    return cache_dir("similarity") / "index.sqlite"
+
+
+@lru_cache(maxsize=16384)
+def token_column(token: str) -> array:
+    # Vocabulary repeats across descriptions, so each token's permuted hashes are computed
+    # once and a signature becomes a column-wise min over cached arrays.
+    h = _hash64(token.encode("utf-8"))
+    return array("Q", [(a * h + b) % MERSENNE_PRIME for a, b in PERMUTATIONS])
+
+
+def minhash(tokens: FrozenSet[str]) -> Optional[List[int]]:
+    if not tokens:
+        return None
+    return list(map(min, zip(*map(token_column, tokens))))
+
+
+@lru_cache(maxsize=64)
+def buckets(text: str) -> Tuple[int, ...]:
+    profile = token_profile(text)
+    keys = []
+    for view_idx, key in enumerate(SIMILARITY_VIEWS.values()):
+        signature = minhash(profile[key])
+        if signature is None:
+            continue
+        for band in range(BANDS):
+            rows = signature[band * ROWS:(band + 1) * ROWS]
+            data = f"{view_idx}:{band}:" + ",".join(map(str, rows))
+            # SQLite integers are signed 64-bit.
+            keys.append(_hash64(data.encode("ascii")) - (1 << 63))
+    return tuple(dict.fromkeys(keys))
+
+
+def open_index(path: Path) -> sqlite3.Connection:
+    path.parent.mkdir(parents=True, exist_ok=True)
+    conn = sqlite3.connect(str(path), timeout=60)
+    conn.execute("PRAGMA journal_mode=WAL")
+    with conn:
+        conn.execute("CREATE TABLE IF NOT EXISTS meta (key TEXT PRIMARY KEY, value TEXT)")
+        row = conn.execute("SELECT value FROM meta WHERE key = 'scheme'").fetchone()
+        if row is not None and row[0] != SCHEME:
+            # Buckets from another signature scheme are meaningless; start over.
+            conn.execute("DROP TABLE IF EXISTS bands")
+            conn.execute("DROP TABLE IF EXISTS problems")
+        conn.execute("INSERT OR REPLACE INTO meta (key, value) VALUES ('scheme', ?)", (SCHEME,))
+        conn.execute(
+            "CREATE TABLE IF NOT EXISTS problems ("
+            "id INTEGER PRIMARY KEY, label TEXT UNIQUE NOT NULL, added REAL NOT NULL, tokens TEXT NOT NULL)"
+        )
+        conn.execute("CREATE TABLE IF NOT EXISTS bands (bucket INTEGER NOT NULL, problem INTEGER NOT NULL)")
+        conn.execute("CREATE INDEX IF NOT EXISTS bands_bucket ON bands (bucket)")
+        conn.execute("CREATE INDEX IF NOT EXISTS bands_problem ON bands (problem)")
+    return conn
+
+
+def query(conn: sqlite3.Connection, text: str, exclude_label: Optional[str] = None, threshold: float = SIMILARITY_THRESHOLD, known: Optional[Dict[str, Dict]] = None) -> Tuple[List[Dict], Dict[str, Dict]]:
+    """Indexed problems similar to text, and every candidate that was re-checked.
+
+    Both map a label to {"added", "metrics"}. Candidates found in known with the same "added"
+    time (their description has not been re-indexed since) reuse its metrics instead of a new
+    exact re-check.
+    """
+    keys = buckets(text)
+    if not keys:
+        return [], {}
+    known = known or {}
+    placeholders = ",".join("?" * len(keys))
+    candidates = conn.execute(
+        f"SELECT p.label, p.added, p.tokens FROM problems p WHERE p.id IN "
+        f"(SELECT DISTINCT problem FROM bands WHERE bucket IN ({placeholders}))",
+        keys,
+    ).fetchall()
+
+    matches = []
+    checked = {}
+    for label, added, tokens_json in candidates:
+        if label == exclude_label:
+            continue
+        previous = known.get(label)
+        if previous is not None and previous["added"] == added:
+            metrics = previous["metrics"]
+        else:
+            stored = {key: frozenset(v) for key, v in json.loads(tokens_json).items()}
+            metrics = profile_similarity(token_profile(text), stored)
+        checked[label] = {"added": added, "metrics": metrics}
+        if any(m >= threshold for m in metrics.values()):
+            matches.append({"label": label, "metrics": metrics})
+    matches.sort(key=lambda m: max(m["metrics"].values()), reverse=True)
+    return matches, checked
+
+
+def _store(conn: sqlite3.Connection, label: str, text: str) -> None:
+    profile = token_profile(text)
+    tokens_json = json.dumps({key: sorted(profile[key]) for key in SIMILARITY_VIEWS.values()})
+    keys = buckets(text)
+    row = conn.execute("SELECT id FROM problems WHERE label = ?", (label,)).fetchone()
+    if row is not None:
+        conn.execute("DELETE FROM bands WHERE problem = ?", (row[0],))
+        conn.execute("UPDATE problems SET added = ?, tokens = ? WHERE id = ?", (time.time(), tokens_json, row[0]))
+        problem_id = row[0]
+    else:
+        cur = conn.execute("INSERT INTO problems (label, added, tokens) VALUES (?, ?, ?)", (label, time.time(), tokens_json))
+        problem_id = cur.lastrowid
+    conn.executemany("INSERT INTO bands (bucket, problem) VALUES (?, ?)", [(k, problem_id) for k in keys])
+
+
+def screen(conn: sqlite3.Connection, label: str, text: str, threshold: float = SIMILARITY_THRESHOLD, known: Optional[Dict[str, Dict]] = None) -> Tuple[List[Dict], Dict[str, Dict]]:
+    """query() for text, then add it as label, in one write transaction.
+
+    Concurrent screens (a batch runs one per problem at once) are serialized, so of two
+    near-duplicates reviewed together the second always sees the first.
+    """
+    conn.execute("BEGIN IMMEDIATE")
+    try:
+        found = query(conn, text, exclude_label=label, threshold=threshold, known=known)
+        _store(conn, label, text)
+    except BaseException:
+        conn.rollback()
+        raise
+    conn.commit()
+    return found
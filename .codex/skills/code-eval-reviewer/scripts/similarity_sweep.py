@@ -0,0 +1,148 @@
+#!/usr/bin/env python3
+"""
+Code Eval Reviewer - Bulk Similarity Sweep
+
+Compares every pair of problem descriptions and writes the pairs at or above the
+threshold as NDJSON, one pair per line.
+
+Usage:
+    python3 similarity_sweep.py <problems-root | manifest.txt> [--threshold PCT] [--output FILE]
+"""
+
+import argparse
+import json
+import math
+import sys
+import time
+from collections import Counter
+from itertools import chain
+from pathlib import Path
+from typing import Dict, FrozenSet, Iterator, List, Tuple
+
+from batch_review import discover_problem_dirs
+from review_problem import find_files, read_text
+from text_engine import SIMILARITY_VIEWS, profile_similarity, token_profile
+
+
+def min_overlap(size: int, threshold: float) -> int:
+    return math.ceil(threshold * size - 1e-9)
+
+
+def token_ranks(profiles: List[Dict[str, FrozenSet[str]]], key: str) -> Dict[str, int]:
+    freq: Dict[str, int] = {}
+    for profile in profiles:
+        for token in profile[key]:
+            freq[token] = freq.get(token, 0) + 1
+    # Rarest tokens first keeps prefixes selective and postings short.
+    ordered = sorted(freq, key=lambda token: (freq[token], token))
+    return {token: rank for rank, token in enumerate(ordered)}
+
+
+def bitmask(row: List[int]) -> int:
+    # Each row of the term matrix doubles as a bitmask, so an exact overlap is one big-int
+    # AND plus a popcount instead of a Python set intersection.
+    bits = bytearray((row[-1] >> 3) + 1 if row else 0)
+    for rank in row:
+        bits[rank >> 3] |= 1 << (rank & 7)
+    return int.from_bytes(bits, "little")
+
+
+def similar_pairs(profiles: List[Dict[str, FrozenSet[str]]], threshold_pct: float, stats: Dict[str, int]) -> Iterator[Tuple[int, int, Dict[str, float]]]:
+    """Exact all-pairs Jaccard join over the three token views, streamed in document order.
+
+    Documents are indexed by a prefix of their rarest tokens: a pair with Jaccard >= t shares
+    at least ceil(t * |x|) tokens, so under a fixed global order their first
+    |x| - ceil(t * |x|) + 1 tokens must intersect. Candidates are pruned by size and by the
+    overlap still reachable outside the shared prefix, then verified exactly. Only prefix
+    postings and one bitmask per view and document are held, never the pair matrix.
+    """
+    threshold = threshold_pct / 100
+    limit = threshold / (1 + threshold)
+    views = []
+    for key in SIMILARITY_VIEWS.values():
+        ranks = token_ranks(profiles, key)
+        rows = [sorted(ranks[t] for t in profile[key]) for profile in profiles]
+        sizes = [len(row) for row in rows]
+        suffixes = [min_overlap(size, threshold) for size in sizes]
+        views.append((rows, sizes, suffixes, [bitmask(row) for row in rows], {}))
+
+    for i in range(len(profiles)):
+        matched = set()
+        for rows, sizes, suffixes, masks, postings in views:
+            size = sizes[i]
+            if not size:
+                continue
+            prefix = rows[i][:size - suffixes[i] + 1]
+            shared = Counter(chain.from_iterable(postings.get(rank, ()) for rank in prefix))
+            for rank in prefix:
+                postings.setdefault(rank, []).append(i)
+
+            min_size, max_size = threshold * size - 1e-9, size / threshold + 1e-9
+            suffix = suffixes[i]
+            # Jaccard >= t needs |x & y| >= t / (1 + t) * (|x| + |y|). Shared tokens outside
+            # both prefixes lie past the shorter-reaching prefix, so at most
+            # max(suffix) - 1 of them can add to the prefix overlap.
+            survivors = [
+                j for j, prefix_shared in shared.items()
+                if min_size <= sizes[j] <= max_size
+                and prefix_shared + max(suffix, suffixes[j]) - 1 >= limit * (size + sizes[j]) - 1e-9
+            ]
+            mask = masks[i]
+            for j in survivors:
+                if j in matched:
+                    continue
+                stats["candidates"] += 1
+                overlap = (mask & masks[j]).bit_count()
+                if overlap * 100 >= threshold_pct * (size + sizes[j] - overlap) - 1e-9:
+                    matched.add(j)
+        for j in sorted(matched):
+            yield j, i, profile_similarity(profiles[j], profiles[i])
+
+
+def main():
+    parser = argparse.ArgumentParser(description="All-pairs similarity sweep over problem descriptions")
+    parser.add_argument("source", help="Directory of problem directories, or a manifest file listing one problem directory per line")
+    parser.add_argument("--threshold", type=float, default=60.0, help="Report pairs with any similarity view at or above this percentage")
+    parser.add_argument("--output", help="NDJSON report path (default: stdout)")
+    args = parser.parse_args()
+
+    if not 0 < args.threshold <= 100:
+        print("Error: --threshold must be in (0, 100]")
+        raise SystemExit(1)
+    source = Path(args.source).resolve()
+    if not source.exists():
+        print(f"Error: Source not found: {source}")
+        raise SystemExit(1)
+
+    started = time.monotonic()
+    labels = []
+    profiles = []
+    for problem_dir in discover_problem_dirs(source):
+        desc_files = find_files(problem_dir, ["Problem-Description.txt", "description.md", "problem.md"]) if problem_dir.is_dir() else []
+        if not desc_files:
+            print(f"Skipping {problem_dir}: no problem description found", file=sys.stderr)
+            continue
+        labels.append(str(problem_dir))
+        profiles.append(token_profile(read_text(desc_files[0])))
+
+    stats = {"candidates": 0, "pairs": 0}
+    out = open(args.output, "w", encoding="utf-8") if args.output else sys.stdout
+    try:
+        for j, i, metrics in similar_pairs(profiles, args.threshold, stats):
+            record = {"a": labels[j], "b": labels[i]}
+            record.update({view: round(value, 1) for view, value in metrics.items()})
+            out.write(json.dumps(record) + "\n")
+            stats["pairs"] += 1
+    finally:
+        if args.output:
+            out.close()
+
+    print(
+        f"{len(profiles)} descriptions, {stats['candidates']} candidate pairs checked, "
+        f"{stats['pairs']} pairs >= {args.threshold:g}% in {time.monotonic() - started:.2f}s",
+        file=sys.stderr,
+    )
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,208 @@
+import html
+import re
+from typing import Dict, List, Optional
+
+# One pattern per runner; fed blocks of complete lines from commands.stream_command. The
+# *_suite/group alternatives are the lines that say which package, file or describe block
+# the test lines after them belong to.
+TEST_LINE = re.compile(
+    r"^(?:"
+    r"(?P<pytest_name>\S+::\S+) (?P<pytest_verbose>PASSED|FAILED|ERROR|SKIPPED|XFAIL|XPASS|RERUN)\b"
+    r"|(?P<pytest_short>PASSED|FAILED|ERROR|XFAIL|XPASS|RERUN) (?P<pytest_short_name>\S+::\S+)"
+    r"|\s*--- (?P<go>PASS|FAIL|SKIP): (?P<go_name>\S+)"
+    r"|(?:ok  |FAIL)\t(?P<go_package>\S+)"
+    r"|test (?P<cargo_name>.+?) \.\.\. (?P<cargo>ok|FAILED|ignored)"
+    r"|[ \t]+(?:Running (?:unittests )?|(?P<cargo_doc>Doc-tests) )(?P<cargo_suite>.+?)[ \t]*$"
+    r"|[ \t]+(?P<jest>[✓✕○√×]) (?P<jest_name>.+?)(?: \(\d+(?:\.\d+)? m?s\))?[ \t]*$"
+    r"| ?(?:PASS|FAIL) +(?P<jest_suite>\S+)"
+    r"|[ \t]+(?P<jest_group>[^\s✓✕○√×●].*?)[ \t]*$"
+    r")",
+    re.MULTILINE,
+)
+OUTCOME = {
+    "PASSED": "passed", "XPASS": "passed", "PASS": "passed", "ok": "passed", "✓": "passed", "√": "passed",
+    "FAILED": "failed", "FAIL": "failed", "✕": "failed", "×": "failed",
+    "ERROR": "error",
+    "SKIPPED": "skipped", "XFAIL": "skipped", "SKIP": "skipped", "ignored": "skipped", "○": "skipped",
+}
+# A test reported more than once in a run keeps its worst outcome. pytest's RERUN lines are
+# not outcomes: the attempt after them reports one.
+SEVERITY = {"skipped": 0, "passed": 1, "failed": 2, "error": 2}
+# cargo test binaries end in a build hash, e.g. target/debug/deps/foo-0123456789abcdef.
+CARGO_HASH = re.compile(r"-[0-9a-f]{16}\b")
+# JUnit XML printed by test.sh, e.g. `cat report.xml`; elements may span several blocks.
+TESTCASE = re.compile(r"<testcase\b([^>]*?)(?:/>|>(.*?)</testcase>)", re.DOTALL)
+XML_ATTR = re.compile(r'(\w+)="([^"]*)"')
+XML_PENDING_LIMIT = 1024 * 1024
+ANSI_ESCAPE = re.compile(r"\x1b\[[0-9;]*[A-Za-z]")
+FAILING = {"failed", "error"}
+
+# Each pair runs the same ./test.sh mode before and after the solution.
+PAIRS = {
+    "new": ("new_without_solution", "new_with_solution"),
+    "base": ("base_only", "base_with_solution"),
+}
+CATEGORIES = ("fail_to_pass", "pass_to_fail", "always_fail", "always_pass", "not_run")
+CATEGORY_LABELS = {
+    "fail_to_pass": "fail->pass",
+    "pass_to_fail": "pass->fail",
+    "always_fail": "always-fail",
+    "always_pass": "always-pass",
+    "not_run": "not run",
+}
+
+
+def new_run() -> Dict:
+    # go names the package after its tests, so their names are qualified once it does.
+    return {"tests": {}, "xml": "", "cargo_suite": None, "jest_suite": None, "jest_groups": [], "go_unqualified": []}
+
+
+def record(run: Dict, name: str, outcome: Optional[str]) -> None:
+    if outcome is None:
+        return
+    tests = run["tests"]
+    previous = tests.get(name)
+    # e.g. pytest reports a teardown error as a second result for a test that passed.
+    if previous is None or SEVERITY[outcome] > SEVERITY[previous]:
+        tests[name] = outcome
+
+
+def _qualify_go(run: Dict, package: str) -> None:
+    tests = run["tests"]
+    for name in run["go_unqualified"]:
+        if name in tests:
+            record(run, f"{package}::{name}", tests.pop(name))
+    run["go_unqualified"] = []
+
+
+def _jest_scope(run: Dict, indent: int) -> List[str]:
+    """The test file and enclosing describe blocks of a jest line indented by indent."""
+    groups = run["jest_groups"]
+    while groups and groups[-1][0] >= indent:
+        groups.pop()
+    return ([run["jest_suite"]] if run["jest_suite"] else []) + [name for _, name in groups]
+
+
+def _feed_xml(run: Dict, text: str) -> None:
+    buffer = run["xml"] + text if run["xml"] else text[text.find("<testcase"):]
+    end = 0
+    for m in TESTCASE.finditer(buffer):
+        attrs = {k: html.unescape(v) for k, v in XML_ATTR.findall(m.group(1))}
+        body = m.group(2) or ""
+        if "<failure" in body:
+            outcome = "failed"
+        elif "<error" in body:
+            outcome = "error"
+        elif "<skipped" in body:
+            outcome = "skipped"
+        else:
+            outcome = "passed"
+        name = attrs.get("name", "")
+        if attrs.get("classname"):
+            name = f"{attrs['classname']}::{name}"
+        record(run, name, outcome)
+        end = m.end()
+    rest = buffer[end:]
+    start = rest.find("<testcase")
+    rest = rest[start:] if start >= 0 else ""
+    run["xml"] = rest if len(rest) <= XML_PENDING_LIMIT else ""
+
+
+def feed_text(run: Dict, text: str) -> None:
+    """Record the per-test outcomes in a block of complete lines of runner output."""
+    if "\x1b" in text:
+        text = ANSI_ESCAPE.sub("", text)
+    for m in TEST_LINE.finditer(text):
+        kind = m.lastgroup
+        if kind == "pytest_verbose":
+            record(run, m.group("pytest_name"), OUTCOME.get(m.group(kind)))
+        elif kind == "pytest_short_name":
+            record(run, m.group(kind), OUTCOME.get(m.group("pytest_short")))
+        elif kind == "go_name":
+            name = m.group(kind)
+            if name not in run["tests"]:
+                run["go_unqualified"].append(name)
+            record(run, name, OUTCOME[m.group("go")])
+        elif kind == "go_package":
+            _qualify_go(run, m.group(kind))
+        elif kind == "cargo":
+            name = m.group("cargo_name")
+            record(run, f"{run['cargo_suite']}::{name}" if run["cargo_suite"] else name, OUTCOME[m.group(kind)])
+        elif kind == "cargo_suite":
+            suite = CARGO_HASH.sub("", m.group(kind))
+            run["cargo_suite"] = f"doc {suite}" if m.group("cargo_doc") else suite
+        elif kind == "jest_name":
+            scope = _jest_scope(run, m.start("jest") - m.start())
+            record(run, " › ".join(scope + [m.group(kind)]), OUTCOME[m.group("jest")])
+        elif kind == "jest_suite":
+            run["jest_suite"], run["jest_groups"] = m.group(kind), []
+        elif kind == "jest_group" and run["jest_suite"]:
+            indent = m.start(kind) - m.start()
+            _jest_scope(run, indent)
+            run["jest_groups"].append((indent, m.group(kind)))
+    if run["xml"] or "<testcase" in text:
+        _feed_xml(run, text)
+
+
+def classify(before: Optional[str], after: Optional[str]) -> str:
+    if before is None or after is None or "skipped" in (before, after):
+        return "not_run"
+    if before in FAILING:
+        return "always_fail" if after in FAILING else "fail_to_pass"
+    return "pass_to_fail" if after in FAILING else "always_pass"
+
+
+def differential(phase_tests: Dict[str, Optional[Dict[str, str]]], exit_codes: Optional[Dict[str, Optional[int]]] = None) -> Dict[str, Dict]:
+    """Compare per-test outcomes before and after the solution for the new and base tests.
+
+    phase_tests maps a phase log key to its {test name: outcome}. A pair is left out when a
+    phase did not run, or when neither run printed anything a parser recognized. When the
+    run before the solution exited non-zero (exit_codes), the tests it never reported count
+    as failing there: a new test usually cannot build or import before its code exists.
+    """
+    exit_codes = exit_codes or {}
+    matrix = {}
+    for group, (pre, post) in PAIRS.items():
+        before, after = phase_tests.get(pre), phase_tests.get(post)
+        if before is None or after is None or not (before or after):
+            continue
+        unreported = "error" if exit_codes.get(pre) not in (None, 0) else None
+        cells: Dict = {category: [] for category in CATEGORIES}
+        for name in sorted(before.keys() | after.keys()):
+            cells[classify(before.get(name, unreported), after.get(name))].append(name)
+        cells.update(before=len(before), after=len(after))
+        matrix[group] = cells
+    return matrix
+
+
+def stability(runs: List[Dict]) -> Dict:
+    """Per-test pass rates over repeated runs of one phase; each run is {"exit_code", "tests"}."""
+    counts: Dict[str, Dict[str, int]] = {}
+    for run in runs:
+        for name, outcome in run["tests"].items():
+            if outcome == "skipped":
+                continue
+            c = counts.setdefault(name, {"passed": 0, "runs": 0})
+            c["runs"] += 1
+            c["passed"] += outcome == "passed"
+    tests = {name: {"runs": c["runs"], "pass_rate": round(c["passed"] / c["runs"], 3)} for name, c in counts.items()}
+    unstable = sorted(name for name, t in tests.items() if 0 < t["pass_rate"] < 1)
+    exit_codes = [run["exit_code"] for run in runs]
+    return {
+        "runs": len(runs),
+        "tests": tests,
+        "unstable": unstable,
+        "exit_codes": exit_codes,
+        "exit_stable": len({code == 0 for code in exit_codes}) <= 1,
+    }
+
+
+def format_matrix(cells: Dict) -> str:
+    return ", ".join(f"{len(cells[c])} {CATEGORY_LABELS[c]}" for c in CATEGORIES)
+
+
+def sample(names: List[str], limit: int = 3) -> str:
+    shown = ", ".join(names[:limit]).encode("ascii", "replace").decode("ascii")
+    if len(names) > limit:
+        shown += f" (+{len(names) - limit} more)"
+    return shown
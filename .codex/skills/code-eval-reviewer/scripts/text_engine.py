@@ -0,0 +1,158 @@
+import re
+from functools import lru_cache
+from typing import Dict, FrozenSet, Iterable, List, Tuple
+
+STOP_WORDS = frozenset({
+    "the", "and", "or", "to", "of", "a", "an", "is", "are", "be", "in", "on",
+    "for", "with", "by", "as", "at", "from", "that", "this", "it", "its", "if",
+    "then", "else", "when", "while", "should", "must", "shall", "may", "can",
+    "not", "no", "yes", "do", "does", "did", "done", "into", "out", "up", "down",
+})
+
+WORD = re.compile(r"[a-z0-9_]+")
+SENTENCE_BREAK = re.compile(r"[.!?]\s+")
+REQUIREMENT = re.compile(r"\b(must|should|shall|needs to|required to|must not|should not)\b", re.IGNORECASE)
+COMPOUND_BREAK = re.compile(r"\b(and|or|,|;)\b")
+CODE_FENCE = re.compile(r"```[\s\S]*?```")
+INLINE_CODE = re.compile(r"`[^`]+`")
+BACKTICKED = re.compile(r"`([^`]+)`")
+IDENTIFIER = re.compile(r"\b[a-zA-Z_][a-zA-Z0-9_]*\b")
+CAMEL_CASE = re.compile(r"\b[a-z]+[A-Z][a-zA-Z0-9]*\b")
+
+# Regex checks: each check's alternatives are merged into one pattern, and each pattern is
+# guarded by literals that any match must contain. Patterns are lower-case and run against
+# the lower-cased text, which is much cheaper than re.IGNORECASE; the literal guards mean
+# most checks never run their regex at all.
+PATTERN_CHECKS: Dict[str, Tuple[Tuple[str, ...], "re.Pattern[str]"]] = {
+    "external_reference": (("see", "refer to", "as described in"), re.compile(r"\b(?:see|refer to|as described in)\b")),
+    "prescriptive": (
+        ("must be called", "locate", "return type", "step ", "algorithm", "implement using"),
+        re.compile(r"must be called \w+|located? (?:at|in) [\w/\.]+|return type|step \d|algorithm|implement using"),
+    ),
+    "narrative": (("background", "story", "narrative"), re.compile(r"\b(?:background|story|narrative)\b")),
+    "heading": (("#",), re.compile(r"^#+\s", re.MULTILINE)),
+    "bullet": (("\n",), re.compile(r"\n\s*[-*]\s")),
+    "contract_language": (
+        ("invariant", "reach", "definitions", "contract", "implies"),
+        re.compile(r"\b(?:invariant|must\s+reach|may\s+reach|definitions|contract|implies)\b"),
+    ),
+    "definitions_field": (("define",), re.compile(r"\bdefines?\s+the\s+definitions?\s+field\b")),
+    "schema": (
+        ("dataclass", "frozen", "schema", "field", "type", "struct", "class"),
+        re.compile(r"\b(?:dataclass|frozen|schema|fields?|typed?|struct|class\s+name)\b"),
+    ),
+    "clarified": (("explicitly", "defined", "clarify"), re.compile(r"\b(?:explicitly|defined|clarify)\b")),
+}
+# Case-sensitive on purpose: "todo" in prose is not a placeholder.
+PLACEHOLDER = re.compile(r"\b(TBD|TODO|WIP)\b")
+REQUIREMENT_WORDS = ("must", "should", "shall", "needs to", "required to")
+MARKUP_TO_SPACE = str.maketrans({c: " " for c in "#*_[]()>-"})
+
+# Similarity view name -> token_profile key.
+SIMILARITY_VIEWS = {
+    "behavioural": "requirement_tokens",
+    "implementation": "identifier_tokens",
+    "requirement": "tokens",
+}
+
+# Plain substring checks against the lower-cased text. A combined regex over these is
+# slower than CPython's substring search, so they stay as term tuples.
+TERM_CHECKS: Dict[str, Tuple[str, ...]] = {
+    "ambiguous_language": (
+        "maybe", "probably", "approximately", "around", "as needed", "as appropriate",
+        "if possible", "etc", "and so on", "ideally", "best effort", "reasonable",
+    ),
+    "scope_blowup": ("rewrite", "entire", "whole system", "from scratch"),
+    "philosophy_violation": ("new framework", "different framework", "ignore existing", "custom runtime"),
+    "ambiguous_semantics": (
+        "path-sensitive", "path sensitive", "may", "must", "order", "duplicate", "empty",
+        "undefined", "unspecified", "implied", "invariant",
+    ),
+}
+
+
+def count_words(text: str) -> int:
+    if "`" in text:
+        text = CODE_FENCE.sub("", text)
+        text = INLINE_CODE.sub("", text)
+    return len(text.translate(MARKUP_TO_SPACE).split())
+
+
+def tokenize(text: str) -> List[str]:
+    return [t for t in WORD.findall(text.lower()) if len(t) > 2 and t not in STOP_WORDS]
+
+
+def sentences(text: str) -> List[str]:
+    return [s.strip() for s in SENTENCE_BREAK.split(text) if s.strip()]
+
+
+def is_requirement(text: str) -> bool:
+    lower = text.lower()
+    return any(word in lower for word in REQUIREMENT_WORDS) and bool(REQUIREMENT.search(text))
+
+
+def requirement_sentences(text: str) -> List[str]:
+    return [s for s in sentences(text) if is_requirement(s)]
+
+
+def split_compound_requirements(sentences: List[str]) -> List[str]:
+    parts = []
+    for s in sentences:
+        for c in COMPOUND_BREAK.split(s):
+            c = c.strip()
+            if len(c) > 8 and is_requirement(c):
+                parts.append(c)
+    return parts or sentences
+
+
+def identifier_tokens(text: str) -> List[str]:
+    tokens = BACKTICKED.findall(text) + IDENTIFIER.findall(text) + CAMEL_CASE.findall(text)
+    return tokenize(" ".join(tokens))
+
+
+@lru_cache(maxsize=256)
+def document(text: str) -> Dict:
+    """Split and scan a text once; the problem heuristics read from the returned structure.
+
+    Cached by text because the same description feeds the problem, test and similarity
+    checks, so callers must treat the returned entry as read-only.
+    """
+    lower = text.lower()
+    requirements = requirement_sentences(text)
+    flags = {
+        name: any(literal in lower for literal in literals) and bool(pattern.search(lower))
+        for name, (literals, pattern) in PATTERN_CHECKS.items()
+    }
+    flags["placeholder"] = any(word in text for word in ("TBD", "TODO", "WIP")) and bool(PLACEHOLDER.search(text))
+    flags["structured"] = flags["heading"] or flags["bullet"]
+    for name, terms in TERM_CHECKS.items():
+        flags[name] = any(term in lower for term in terms)
+    return {
+        "text": text,
+        "word_count": count_words(text),
+        "requirements": tuple(requirements),
+        "contracts": tuple(split_compound_requirements(requirements)),
+        "flags": flags,
+    }
+
+
+@lru_cache(maxsize=256)
+def token_profile(text: str) -> Dict[str, FrozenSet[str]]:
+    # Token sets for overlap and similarity scoring, kept apart from document() so the
+    # problem checks do not pay for tokenizing.
+    return {
+        "tokens": frozenset(tokenize(text)),
+        "requirement_tokens": frozenset(tokenize(" ".join(document(text)["requirements"]))),
+        "identifier_tokens": frozenset(identifier_tokens(text)),
+    }
+
+
+def jaccard(a: Iterable[str], b: Iterable[str]) -> float:
+    sa, sb = set(a), set(b)
+    if not sa and not sb:
+        return 0.0
+    return len(sa & sb) / max(1, len(sa | sb))
+
+
+def profile_similarity(a: Dict[str, FrozenSet[str]], b: Dict[str, FrozenSet[str]]) -> Dict[str, float]:
+    return {view: jaccard(a[key], b[key]) * 100 for view, key in SIMILARITY_VIEWS.items()}
@@ -0,0 +1,78 @@
+import hashlib
+import json
+import math
+import os
+import time
+from pathlib import Path
+from typing import Dict, Optional
+
+from cache_dirs import cache_dir, file_lock
+
+# Per phase: (limit before there is enough history, floor, ceiling), in seconds.
+LIMITS = {
+    "clone": (900, 60, 3600),
+    "fetch": (600, 60, 3600),
+    "build:base": (1800, 120, 7200),
+    "build:layer": (600, 60, 3600),
+    # One per ./test.sh run, so a fast failure before the solution does not shape the limit
+    # (or reset the backoff) of a slow run after it.
+    "test:base_only": (900, 60, 3600),
+    "test:new_without_solution": (900, 60, 3600),
+    "test:base_with_solution": (900, 60, 3600),
+    "test:new_with_solution": (900, 60, 3600),
+}
+# A learned limit is this many times the p99 of the recorded durations.
+FACTOR = 3
+MIN_SAMPLES = 3
+SAMPLES_KEPT = 50
+
+
+def history_path(repo: Optional[str]) -> Path:
+    key = hashlib.sha256(str(repo).encode("utf-8")).hexdigest()[:24]
+    return cache_dir("timings") / f"{key}.json"
+
+
+def _load(path: Path) -> Dict:
+    try:
+        return json.loads(path.read_text(encoding="utf-8"))
+    except (OSError, ValueError):
+        return {"phases": {}}
+
+
+def p99(samples) -> float:
+    ordered = sorted(samples)
+    return ordered[max(0, math.ceil(0.99 * len(ordered)) - 1)]
+
+
+def limit(repo: Optional[str], phase: str) -> Dict:
+    """Timeout for phase on repo: {"seconds", "samples", "learned"}.
+
+    With at least MIN_SAMPLES recorded durations it is FACTOR x their p99, clamped to the
+    phase's floor and ceiling; before that, the phase default. Each consecutive timeout
+    doubles it (up to the ceiling), so a repo that is slow rather than hung gets through.
+    """
+    default, floor, ceiling = LIMITS[phase]
+    entry = _load(history_path(repo))["phases"].get(phase) or {"samples": [], "timeouts": 0}
+    samples = entry["samples"]
+    learned = len(samples) >= MIN_SAMPLES
+    seconds = min(max(p99(samples) * FACTOR, floor), ceiling) if learned else default
+    seconds = min(seconds * 2 ** entry["timeouts"], max(ceiling, default))
+    return {"seconds": int(math.ceil(seconds)), "samples": len(samples), "learned": learned}
+
+
+def record(repo: Optional[str], phase: str, seconds: float, timed_out: bool = False) -> None:
+    """Add a completed run's duration; a timed-out run only counts towards the backoff."""
+    path = history_path(repo)
+    with file_lock(path.with_suffix(".lock")):
+        history = _load(path)
+        history["repo"] = repo
+        entry = history["phases"].setdefault(phase, {"samples": [], "timeouts": 0})
+        if timed_out:
+            entry["timeouts"] += 1
+        else:
+            entry["samples"] = (entry["samples"] + [round(seconds, 3)])[-SAMPLES_KEPT:]
+            entry["timeouts"] = 0
+        entry["updated"] = time.time()
+        tmp = path.with_suffix(f".{os.getpid()}.tmp")
+        tmp.write_text(json.dumps(history), encoding="utf-8")
+        os.replace(tmp, path)
@@ -0,0 +1,124 @@
+import functools
+import json
+import os
+import resource
+import threading
+import time
+from contextlib import contextmanager
+from pathlib import Path
+from typing import Callable, Dict, List, Optional
+
+TRACE_VERSION = 1
+
+_lock = threading.Lock()
+_state: Dict = {"active": False, "origin": 0.0, "started": 0.0, "events": []}
+
+
+def start() -> None:
+    with _lock:
+        _state.update(active=True, origin=time.perf_counter(), started=time.time(), events=[])
+
+
+def stop() -> List[Dict]:
+    with _lock:
+        _state["active"] = False
+        return list(_state["events"])
+
+
+def peak_rss_kb() -> int:
+    return resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+
+
+@contextmanager
+def span(name: str, category: str, **fields):
+    """Record wall time, CPU time of the calling thread and peak RSS around a block.
+
+    The yielded dict is merged into the event, so callers can attach results such as exit
+    codes or byte counts. When tracing is off this is a no-op.
+    """
+    info: Dict = {}
+    if not _state["active"]:
+        yield info
+        return
+    wall0 = time.perf_counter()
+    cpu0 = time.thread_time()
+    error = None
+    try:
+        yield info
+    except BaseException as e:
+        error = f"{type(e).__name__}: {e}"
+        raise
+    finally:
+        event = {
+            "name": name,
+            "cat": category,
+            "start": round(wall0 - _state["origin"], 6),
+            "wall": round(time.perf_counter() - wall0, 6),
+            "cpu": round(time.thread_time() - cpu0, 6),
+            "peak_rss_kb": peak_rss_kb(),
+            "thread": threading.current_thread().name,
+        }
+        event.update(fields)
+        event.update(info)
+        if error:
+            event["error"] = error
+        with _lock:
+            if _state["active"]:
+                _state["events"].append(event)
+
+
+def traced(category: str) -> Callable:
+    def decorate(fn: Callable) -> Callable:
+        @functools.wraps(fn)
+        def wrapper(*args, **kwargs):
+            with span(fn.__name__, category):
+                return fn(*args, **kwargs)
+        return wrapper
+    return decorate
+
+
+def summarize(events: List[Dict]) -> Dict[str, Dict]:
+    totals: Dict[str, Dict] = {}
+    for event in events:
+        key = f"{event['cat']}:{event['name']}"
+        t = totals.setdefault(key, {"count": 0, "wall": 0.0, "cpu": 0.0})
+        t["count"] += 1
+        t["wall"] = round(t["wall"] + event["wall"], 6)
+        t["cpu"] = round(t["cpu"] + event["cpu"] + event.get("child_cpu", 0.0), 6)
+    return dict(sorted(totals.items(), key=lambda item: item[1]["wall"], reverse=True))
+
+
+def write_trace(path: Path, events: List[Dict], metadata: Optional[Dict] = None) -> None:
+    trace = {
+        "version": TRACE_VERSION,
+        "started": _state["started"],
+        "pid": os.getpid(),
+        "metadata": metadata or {},
+        "peak_rss_kb": peak_rss_kb(),
+        "summary": summarize(events),
+        "events": sorted(events, key=lambda e: e["start"]),
+    }
+    path.write_text(json.dumps(trace, indent=2), encoding="utf-8")
+
+
+def write_chrome_trace(path: Path, events: List[Dict]) -> None:
+    # Complete ("X") events in the Trace Event Format, viewable in chrome://tracing or Perfetto.
+    pid = os.getpid()
+    threads: Dict[str, int] = {}
+    trace_events = []
+    for event in sorted(events, key=lambda e: e["start"]):
+        tid = threads.setdefault(event["thread"], len(threads) + 1)
+        args = {k: v for k, v in event.items() if k not in {"name", "cat", "start", "wall", "thread"}}
+        trace_events.append({
+            "name": event["name"],
+            "cat": event["cat"],
+            "ph": "X",
+            "ts": int(event["start"] * 1e6),
+            "dur": int(event["wall"] * 1e6),
+            "pid": pid,
+            "tid": tid,
+            "args": args,
+        })
+    for thread_name, tid in threads.items():
+        trace_events.append({"name": "thread_name", "ph": "M", "pid": pid, "tid": tid, "args": {"name": thread_name}})
+    path.write_text(json.dumps({"traceEvents": trace_events}), encoding="utf-8")
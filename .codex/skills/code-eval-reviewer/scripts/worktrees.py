@@ -0,0 +1,108 @@
+import json
+import os
+import shutil
+from pathlib import Path
+from typing import Dict, Iterable, List, Optional
+
+from cache_dirs import cache_dir
+from commands import run_command
+
+# Kept work trees (--keep-worktrees) for this many recent states.
+KEPT_STATES = 5
+
+
+def _reflink(src: Path, dest: Path) -> bool:
+    code, _, _ = run_command(["cp", "-a", "--reflink=always", f"{src}/.", str(dest)])
+    return code == 0
+
+
+def _hardlink(src: Path, dest: Path) -> bool:
+    try:
+        shutil.copytree(src, dest, symlinks=True, copy_function=os.link, dirs_exist_ok=True)
+        return True
+    except (OSError, shutil.Error):
+        return False
+
+
+def privatize(tree: Path, paths: Iterable[str]) -> None:
+    """Give each existing file in paths its own inode, so writing it cannot reach the source tree."""
+    for rel in paths:
+        path = tree / rel
+        if path.is_symlink() or not path.is_file() or path.stat().st_nlink == 1:
+            continue
+        tmp = path.with_name(path.name + ".cow-tmp")
+        shutil.copy2(path, tmp)
+        os.replace(tmp, path)
+
+
+def refresh_index(tree: Path, paths: List[str]) -> None:
+    """Re-stat paths in the git index of tree, so `git apply --index` accepts the copies."""
+    # Tracked paths only: update-index refuses untracked or missing ones.
+    code, out, _ = run_command(["git", "ls-files", "-z", "--"] + paths, cwd=str(tree))
+    tracked = [p for p in out.split("\0") if p]
+    if code == 0 and tracked:
+        run_command(["git", "update-index", "-q", "--"] + tracked, cwd=str(tree))
+
+
+def snapshot(src: Path, dest: Path, private: Iterable[str] = ()) -> str:
+    """Materialize dest as a copy-on-write copy of src and return the method used.
+
+    Reflinks are tried first (btrfs, XFS), then a hardlink farm on the same filesystem, then a
+    plain copy. Hardlinked files named in private are copied, since the caller will modify
+    them; everything else in a snapshot must be treated as read-only.
+    """
+    private = list(private)
+    dest.mkdir(parents=True)
+    if _reflink(src, dest):
+        method = "reflink"
+    else:
+        shutil.rmtree(dest, ignore_errors=True)
+        dest.mkdir(parents=True)
+        if _hardlink(src, dest):
+            privatize(dest, private)
+            method = "hardlink"
+        else:
+            shutil.rmtree(dest, ignore_errors=True)
+            shutil.copytree(src, dest, symlinks=True)
+            method = "copy"
+    if private and (dest / ".git").exists():
+        refresh_index(dest, private)
+    return method
+
+
+def write_private(path: Path, data: bytes) -> None:
+    # Replaces the directory entry instead of writing through a possibly shared inode.
+    tmp = path.with_name(path.name + ".cow-tmp")
+    tmp.write_bytes(data)
+    os.replace(tmp, path)
+
+
+def _marker(tree: Path) -> Path:
+    return tree.with_name(tree.name + ".ready")
+
+
+def mark_ready(tree: Path, record: Dict) -> None:
+    """Record that tree is fully prepared, with what preparing it reported."""
+    _marker(tree).write_text(json.dumps(record), encoding="utf-8")
+
+
+def ready_record(tree: Path) -> Optional[Dict]:
+    """The record stored by mark_ready, or None when tree was never completed."""
+    try:
+        record = json.loads(_marker(tree).read_text(encoding="utf-8"))
+    except (OSError, ValueError):
+        return None
+    return record if tree.is_dir() else None
+
+
+def kept_root(key: str) -> Path:
+    """Directory for the kept work trees of one state chain, pruning the oldest others."""
+    root = cache_dir("worktrees")
+    path = root / key
+    others: List[Path] = sorted((p for p in root.iterdir() if p.is_dir() and p != path), key=lambda p: p.stat().st_mtime, reverse=True)
+    for old in others[KEPT_STATES - 1:]:
+        shutil.rmtree(old, ignore_errors=True)
+        old.with_name(old.name + ".lock").unlink(missing_ok=True)
+    path.mkdir(parents=True, exist_ok=True)
+    os.utime(path)
+    return path
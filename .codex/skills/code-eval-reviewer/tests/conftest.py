@@ -0,0 +1,46 @@
+import json
+import sys
+from pathlib import Path
+
+import pytest
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent / "scripts"))
+
+import github_client  # noqa: E402
+
+
+@pytest.fixture(autouse=True)
+def cache_root(tmp_path, monkeypatch):
+    """Every test gets its own cache root, so nothing touches ~/.cache."""
+    root = tmp_path / "cache"
+    monkeypatch.setenv("CODE_EVAL_CACHE_DIR", str(root))
+    return root
+
+
+class FakeGitHub:
+    """Transport that answers from a queue of (status, headers, body) or exceptions."""
+
+    def __init__(self):
+        self.responses = []
+        self.requests = []
+        self.sleeps = []
+
+    def reply(self, status=200, headers=None, body=None):
+        self.responses.append((status, headers or {}, json.dumps(body if body is not None else {}).encode("utf-8")))
+
+    def __call__(self, method, url, headers):
+        self.requests.append((url, dict(headers)))
+        response = self.responses.pop(0)
+        if isinstance(response, Exception):
+            raise response
+        return response
+
+
+@pytest.fixture
+def github(monkeypatch):
+    for key in ("base_url", "token", "transport", "sleep"):
+        monkeypatch.setitem(github_client._config, key, github_client._config[key])
+    fake = FakeGitHub()
+    github_client.configure("https://api.test", "", fake, fake.sleeps.append)
+    yield fake
+    github_client.configure()
@@ -0,0 +1,37 @@
+import json
+
+import batch_review
+
+DESCRIPTION = """\
+# Parse durations
+
+The `parse_duration` function must accept values such as `1h30m` and must return the total
+number of seconds. It should reject negative values with a ValueError.
+"""
+
+
+def test_discover_from_a_directory_or_a_manifest(tmp_path):
+    for name in ("b", "a", ".hidden"):
+        (tmp_path / name).mkdir()
+    (tmp_path / "notes.txt").write_text("")
+    assert batch_review.discover_problem_dirs(tmp_path) == [tmp_path / "a", tmp_path / "b"]
+    manifest = tmp_path / "manifest.txt"
+    manifest.write_text(f"# problems\nb\n\n{tmp_path / 'a'}\n")
+    assert batch_review.discover_problem_dirs(manifest) == [tmp_path / "b", tmp_path / "a"]
+
+
+def test_batch_reviews_each_problem_and_records_failures(tmp_path):
+    good, broken = tmp_path / "good", tmp_path / "broken"
+    good.mkdir()
+    broken.mkdir()
+    (good / "Problem-Description.txt").write_text(DESCRIPTION)
+    results = tmp_path / "results.ndjson"
+    entries = batch_review.run_batch(
+        [good, broken], workers=1, docker_workers=1, skip_docker=True, output_name="feedback.md",
+        docker_options={}, index_path=tmp_path / "index.sqlite", results_path=results,
+    )
+    assert [e["status"] for e in entries] == ["done", "error"]
+    assert entries[1]["error"] == "FileNotFoundError: No problem description found"
+    assert (good / "feedback.md").exists() and (good / "feedback.json").exists()
+    lines = results.read_text().splitlines()
+    assert len(lines) == 1 and json.loads(lines[0])["decision"] == entries[0]["decision"]
@@ -0,0 +1,57 @@
+import subprocess
+
+import clone_cache
+
+
+def commit(repo, name, content):
+    (repo / name).write_text(content)
+    subprocess.run(["git", "-C", str(repo), "add", "."], check=True)
+    subprocess.run(["git", "-C", str(repo), "-c", "user.name=t", "-c", "user.email=t@t", "commit", "-qm", name], check=True)
+    return subprocess.run(["git", "-C", str(repo), "rev-parse", "HEAD"], check=True, capture_output=True, text=True).stdout.strip()
+
+
+def upstream(tmp_path, name="upstream"):
+    repo = tmp_path / name
+    repo.mkdir()
+    subprocess.run(["git", "init", "-q", str(repo)], check=True)
+    return repo
+
+
+def test_mirror_key_normalizes_the_url():
+    key = clone_cache.mirror_key("https://github.com/Owner/Repo.git/")
+    assert key == clone_cache.mirror_key("https://github.com/owner/repo")
+    assert key.startswith("owner-repo-")
+
+
+def test_checkout_fetches_commits_the_mirror_lacks(tmp_path, cache_root):
+    repo = upstream(tmp_path)
+    first = commit(repo, "a.txt", "one\n")
+    with clone_cache.checkout(str(repo), first) as (work, error):
+        assert error == ""
+        assert (work / "a.txt").read_text() == "one\n"
+    second = commit(repo, "b.txt", "two\n")
+    with clone_cache.checkout(str(repo), second) as (work, error):
+        assert error == "" and (work / "b.txt").exists()
+        work_dir = work.parent
+    assert not work_dir.exists()
+    assert len(list((cache_root / "mirrors").glob("*.git"))) == 1
+
+
+def test_unreachable_repo_reports_an_error(tmp_path):
+    with clone_cache.checkout(str(tmp_path / "missing"), "0" * 40) as (work, error):
+        assert work is None
+        assert error.startswith("Git clone failed")
+
+
+def test_least_recently_used_mirrors_are_evicted(tmp_path, cache_root):
+    repos = []
+    for name in ("one", "two", "three"):
+        repo = upstream(tmp_path, name)
+        with clone_cache.checkout(str(repo), commit(repo, "f", name)) as (_, error):
+            assert error == ""
+        repos.append(repo)
+    root = cache_root / "mirrors"
+    keep = clone_cache.mirror_key(str(repos[0]))
+    evicted = clone_cache.evict_mirrors(root, 0, keep=keep)
+    assert evicted == [clone_cache.mirror_key(str(r)) for r in repos[1:]]
+    assert [p.stem for p in root.glob("*.git")] == [keep]
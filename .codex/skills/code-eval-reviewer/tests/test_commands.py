@@ -0,0 +1,52 @@
+import os
+import subprocess
+import time
+
+import pytest
+
+import commands
+
+
+def test_run_command_captures_output():
+    assert commands.run_command(["sh", "-c", "echo out; echo err >&2; exit 3"]) == (3, "out\n", "err\n")
+
+
+def test_run_command_kills_at_the_deadline():
+    started = time.monotonic()
+    assert commands.run_command(["sleep", "30"], timeout=1) == (-1, "", "Command timed out")
+    assert time.monotonic() - started < 10
+
+
+def test_exit_before_a_late_timer_is_not_a_timeout():
+    proc = subprocess.Popen(["true"])
+
+    def drain():
+        # Hold the exited child unreaped until the timer has fired.
+        os.waitid(os.P_PID, proc.pid, os.WEXITED | os.WNOWAIT)
+        time.sleep(1.3)
+
+    timed_out, _ = commands._supervise(proc, 1, drain)
+    assert not timed_out
+    assert proc.returncode == 0
+
+
+def test_failing_drain_kills_and_reaps_the_child():
+    proc = subprocess.Popen(["sleep", "30"])
+
+    def drain():
+        raise RuntimeError("reader failed")
+
+    with pytest.raises(RuntimeError):
+        commands._supervise(proc, 60, drain)
+    assert proc.returncode == -9
+
+
+def test_stream_command_survives_a_failing_callback(tmp_path):
+    def on_text(text):
+        raise ValueError("parser failed")
+
+    started = time.monotonic()
+    result = commands.stream_command(["sh", "-c", "echo hi; sleep 30"], tmp_path / "run.log", timeout=60, on_text=on_text)
+    assert result["exit_code"] == -1
+    assert result["output"] == "parser failed"
+    assert time.monotonic() - started < 10
@@ -0,0 +1,92 @@
+import pytest
+
+import github_client
+import review_problem
+
+REPO = {"stargazers_count": 900, "language": "Python", "license": {"spdx_id": "MIT"}, "pushed_at": "2099-01-01T00:00:00Z"}
+
+
+@pytest.fixture
+def clock(monkeypatch):
+    now = [1_000_000.0]
+    monkeypatch.setattr(github_client.time, "time", lambda: now[0])
+    return now
+
+
+def test_stale_entry_is_revalidated_with_its_etag(github, clock):
+    github.reply(200, {"etag": '"v1"'}, {"id": 1})
+    assert github_client.get_json("repos/o/r") == {"id": 1}
+    clock[0] += 7 * 3600
+    github.reply(304)
+    assert github_client.get_json("repos/o/r") == {"id": 1}
+    assert github.requests[1][1]["If-None-Match"] == '"v1"'
+    # The 304 refreshed the entry, so the next call is served without a request.
+    assert github_client.get_json("repos/o/r") == {"id": 1}
+    assert len(github.requests) == 2
+
+
+def test_entries_expire_by_endpoint_ttl(github, clock):
+    github.reply(200, {}, {"total_count": 0})
+    github.reply(200, {}, {"id": 1})
+    github_client.get_json("search/issues?q=x")
+    github_client.get_json("repos/o/r")
+    clock[0] += 2 * 3600
+    github_client.configure()  # drops the in-memory copies; the disk cache still answers
+    github.reply(200, {}, {"total_count": 3})
+    assert github_client.get_json("search/issues?q=x") == {"total_count": 3}
+    assert github_client.get_json("repos/o/r") == {"id": 1}
+    assert len(github.requests) == 3
+
+
+def test_rate_limited_responses_wait_for_the_reset(github, clock):
+    github.reply(429, {"retry-after": "30"})
+    github.reply(403, {"x-ratelimit-remaining": "0", "x-ratelimit-reset": str(clock[0] + 10)})
+    github.reply(200, {}, {"id": 1})
+    assert github_client.get_json("repos/o/r") == {"id": 1}
+    assert github.sleeps == [30.0, 11.0]
+
+
+def test_low_remaining_quota_spaces_out_requests(github, clock):
+    github.reply(200, {"x-ratelimit-remaining": "4", "x-ratelimit-reset": str(clock[0] + 100)}, {"id": 1})
+    github.reply(200, {}, {"id": 2})
+    github_client.get_json("repos/o/a")
+    assert github.sleeps == []
+    github_client.get_json("repos/o/b")
+    assert github.sleeps == [25.0]
+
+
+def test_throttling_past_the_limit_raises(github):
+    github.reply(429, {"retry-after": str(github_client.MAX_RATE_LIMIT_WAIT + 1)})
+    with pytest.raises(github_client.GitHubError) as err:
+        github_client.get_json("repos/o/r")
+    assert err.value.status == 429
+
+
+def test_network_and_server_errors_are_retried(github):
+    github.responses.append(OSError("reset"))
+    github.reply(502)
+    github.reply(200, {}, {"id": 1})
+    assert github_client.get_json("repos/o/r") == {"id": 1}
+    assert github.sleeps == [1, 2]
+
+
+def test_transient_lookup_failure_is_not_a_reject(github):
+    github.reply(429, {"retry-after": str(github_client.MAX_RATE_LIMIT_WAIT + 1)})
+    result = review_problem.validate_repo("https://github.com/o/r", "Add a flag.")
+    assert result["reject_reasons"] == []
+    assert result["unavailable"] == ["GitHub API lookup unavailable (rate limited); repository requirements not checked"]
+    assert result["issues"] == []
+
+
+def test_missing_repository_is_a_reject(github):
+    github.reply(404)
+    result = review_problem.validate_repo("https://github.com/o/r", "Add a flag.")
+    assert result["reject_reasons"] == ["GitHub repository not found (HTTP 404)"]
+    assert result["unavailable"] == []
+
+
+def test_repository_requirements_are_checked(github):
+    github.reply(200, {}, dict(REPO, stargazers_count=10))
+    github.reply(200, {}, {"total_count": 0})
+    result = review_problem.validate_repo("https://github.com/o/r", "Add a retry flag to the parser command.")
+    assert result["reject_reasons"] == ["Repository has fewer than 500 stars"]
@@ -0,0 +1,67 @@
+import json
+import os
+import subprocess
+import time
+
+import pytest
+
+import host_scheduler
+
+
+@pytest.fixture(autouse=True)
+def host(monkeypatch):
+    monkeypatch.setenv("CODE_EVAL_HOST_CPUS", "4")
+    monkeypatch.setenv("CODE_EVAL_HOST_MEMORY_MB", "8192")
+    monkeypatch.setenv("CODE_EVAL_MIN_FREE_DISK_MB", "1")
+
+
+def ticket(name, cpus, memory_mb=1024, queued=None, pid=None):
+    return {"id": name, "pid": pid or os.getpid(), "kind": "run", "cpus": cpus, "memory_mb": memory_mb, "queued": queued or time.time()}
+
+
+def ledger(cache_root):
+    return json.loads((cache_root / "scheduler" / "ledger.json").read_text())
+
+
+def test_parse_memory_and_container_limits():
+    assert [host_scheduler.parse_memory_mb(v) for v in ("512m", "4g", "1.5G", "1073741824", "100", "lots", None)] == [512, 4096, 1536, 1024, 1, None, None]
+    assert host_scheduler.container_limits(None, None) == {"cpus": 2.0, "memory_mb": 4096, "memory": "4096m"}
+    assert host_scheduler.container_limits("1.5", "2g") == {"cpus": 1.5, "memory_mb": 2048, "memory": "2g"}
+
+
+def test_admission_is_first_come_first_served():
+    big, small = ticket("b", 3, queued=2.0), ticket("c", 1, queued=3.0)
+    assert host_scheduler.try_admit(ticket("a", 2, queued=1.0))
+    assert not host_scheduler.try_admit(big)
+    # c would fit beside a, but b has waited longer.
+    assert not host_scheduler.try_admit(small)
+    host_scheduler.release("a")
+    assert host_scheduler.try_admit(big)
+    assert host_scheduler.try_admit(small)
+
+
+def test_an_idle_host_admits_an_oversized_job(cache_root):
+    assert host_scheduler.try_admit(ticket("huge", 64, memory_mb=10 ** 6))
+    assert not host_scheduler.try_admit(ticket("next", 0.5))
+    assert [w["id"] for w in ledger(cache_root)["waiting"]] == ["next"]
+
+
+def test_low_disk_holds_back_all_but_the_first_job(monkeypatch):
+    monkeypatch.setenv("CODE_EVAL_MIN_FREE_DISK_MB", str(10 ** 12))
+    assert host_scheduler.try_admit(ticket("a", 1))
+    assert not host_scheduler.try_admit(ticket("b", 1))
+
+
+def test_entries_of_dead_processes_are_dropped(cache_root):
+    proc = subprocess.Popen(["true"])
+    proc.wait()
+    assert host_scheduler.try_admit(ticket("gone", 4, pid=proc.pid))
+    assert host_scheduler.try_admit(ticket("next", 4))
+    assert [e["id"] for e in ledger(cache_root)["admitted"]] == ["next"]
+
+
+def test_admit_holds_the_budget_for_the_block(cache_root):
+    with host_scheduler.admit("build", 2, 1024) as info:
+        assert info["waited"] >= 0
+        assert len(ledger(cache_root)["admitted"]) == 1
+    assert ledger(cache_root)["admitted"] == []
@@ -0,0 +1,85 @@
+import image_cache
+
+FIXTURE_DOCKERFILE = """\
+FROM python:3.11-slim
+WORKDIR /app
+COPY requirements.txt .
+RUN pip install -r requirements.txt
+COPY . .
+RUN mkdir build && python setup.py build_ext -i
+RUN useradd app
+USER app
+"""
+
+
+def test_plan_replays_only_rerunnable_steps():
+    plan = image_cache.plan_thin_layer(
+        "FROM python:3.11\nWORKDIR /app\nCOPY . .\nRUN pip install -e . && mkdir -p out\nENV X=1\n"
+    )
+    assert plan["dest"] == "/app"
+    assert plan["tail"] == ["RUN pip install -e . && mkdir -p out", "ENV X=1"]
+    assert plan["inputs"] == []
+
+
+def test_plan_refuses_steps_that_fail_when_rerun():
+    assert image_cache.plan_thin_layer(FIXTURE_DOCKERFILE) is None
+    assert not image_cache.replayable("RUN mkdir build")
+    assert not image_cache.replayable("RUN useradd app")
+    assert not image_cache.replayable("USER app")
+    assert not image_cache.replayable("RUN curl -s https://example.com/x | sh")
+    assert image_cache.replayable("RUN python -m pip install -e .")
+
+
+def test_plan_records_the_user_and_earlier_copies():
+    plan = image_cache.plan_thin_layer("FROM node:20\nUSER node\nWORKDIR /w\nCOPY package.json ./\nRUN npm ci\nCOPY . .\n")
+    assert plan["user"] == "node"
+    assert plan["inputs"] == ["package.json"]
+
+
+def test_copies_path_and_is_ignored():
+    assert image_cache.copies_path("requirements.txt", "requirements.txt")
+    assert image_cache.copies_path("./src/", "src/pkg/mod.py")
+    assert image_cache.copies_path("req*.txt", "requirements.txt")
+    assert not image_cache.copies_path("requirements.txt", "src/requirements.txt")
+    assert image_cache.is_ignored("node_modules/x/index.js", ["node_modules"])
+    # As in Docker, `*` does not cross a slash.
+    assert not image_cache.is_ignored("docs/a.md", ["*.md"])
+    assert image_cache.is_ignored("docs/a.md", ["**/*.md"])
+    assert image_cache.is_ignored("a.md", ["**/*.md"])
+    assert image_cache.is_ignored("a.md", ["*.md"])
+
+
+def _repo(tmp_path, dockerfile):
+    repo = tmp_path / "repo"
+    repo.mkdir()
+    (repo / "Dockerfile").write_text(dockerfile)
+    (repo / "setup.py").write_text("print('v2')\n")
+    return repo
+
+
+def test_fixture_dockerfile_is_built_in_full(tmp_path, monkeypatch):
+    repo = _repo(tmp_path, FIXTURE_DOCKERFILE)
+    builds = []
+    monkeypatch.setattr(image_cache, "build_image", lambda tag, context, repo, phase: builds.append(context) or (0, "", ""))
+    code, _, thin = image_cache.build_variant(repo, "base:1", ["setup.py"], "variant:1")
+    assert (code, thin) == (0, False)
+    assert builds == [repo]
+
+
+def test_failed_thin_layer_falls_back_to_a_full_build(tmp_path, monkeypatch):
+    repo = _repo(tmp_path, "FROM python:3.11\nUSER app\nWORKDIR /app\nCOPY . .\nRUN pip install -e .\n")
+    builds = []
+
+    def build_image(tag, context, repo, phase):
+        builds.append((phase, (context / "Dockerfile").read_text()))
+        return (1, "", "layer failed") if phase == "build:layer" else (0, "", "")
+
+    monkeypatch.setattr(image_cache, "build_image", build_image)
+    code, _, thin = image_cache.build_variant(repo, "base:1", ["setup.py", "gone.py"], "variant:1")
+    assert (code, thin) == (0, False)
+    assert [phase for phase, _ in builds] == ["build:layer", "build:base"]
+    layer = builds[0][1].splitlines()
+    # Cleanup runs as root; the replayed steps run as the image's own user again.
+    assert layer[:3] == ["FROM base:1", "USER root", "WORKDIR /app"]
+    assert layer[-2:] == ["USER app", "RUN pip install -e ."]
+    assert any(line.startswith("RUN rm -rf -- /app/gone.py") for line in layer)
@@ -0,0 +1,83 @@
+import subprocess
+import time
+
+import pytest
+
+import commands
+import image_pool
+
+
+class FakeDocker:
+    """Answers the docker commands image_pool runs from an in-memory tag -> size table."""
+
+    def __init__(self, images):
+        self.images = dict(images)
+        self.calls = []
+
+    def __call__(self, cmd, cwd=None, **kwargs):
+        if cmd[0] != "docker":
+            return commands.run_command(cmd, cwd=cwd, **kwargs)
+        self.calls.append(cmd[1:])
+        if cmd[1:3] == ["image", "inspect"]:
+            tag = cmd[-1]
+            return (0, f"{self.images[tag]}\n", "") if tag in self.images else (1, "", "No such image")
+        if cmd[1] == "tag":
+            self.images[cmd[3]] = self.images[cmd[2]]
+            return 0, "", ""
+        if cmd[1] == "rmi":
+            for tag in cmd[2:]:
+                self.images.pop(tag, None)
+            return 0, "", ""
+        raise AssertionError(cmd)
+
+
+@pytest.fixture
+def docker(monkeypatch):
+    fake = FakeDocker({"base:1": 1000, "base:2": 1300, "base:3": 500})
+    monkeypatch.setattr(image_pool, "run_command", fake)
+    return fake
+
+
+def test_dependency_key_follows_manifests_only(tmp_path):
+    repo = tmp_path / "repo"
+    repo.mkdir()
+    (repo / "requirements.txt").write_text("requests\n")
+    (repo / "app.py").write_text("x = 1\n")
+    subprocess.run(["git", "init", "-q", str(repo)], check=True)
+    subprocess.run(["git", "-C", str(repo), "add", "."], check=True)
+    assert image_pool.manifest_paths(repo) == ["requirements.txt"]
+    key = image_pool.dependency_key("o/r", ["RUN pip install -r requirements.txt"], repo)
+    (repo / "app.py").write_text("x = 2\n")
+    assert image_pool.dependency_key("o/r", ["RUN pip install -r requirements.txt"], repo) == key
+    assert image_pool.dependency_key("o/r", ["RUN pip install ."], repo) != key
+    (repo / "requirements.txt").write_text("requests\nflask\n")
+    assert image_pool.dependency_key("o/r", ["RUN pip install -r requirements.txt"], repo) != key
+    assert image_pool.warm_tag(key) == f"shipd-cache/warm:{key}"
+
+
+def test_first_full_build_becomes_the_warm_image(docker):
+    image_pool.register("base:1", "k", "o/r", "c1")
+    image_pool.register("base:2", "k", "o/r", "c2", donor="base:1")
+    assert docker.images[image_pool.warm_tag("k")] == 1000
+    donor = image_pool.warm_donor("k")
+    assert (donor["tag"], donor["commit"]) == ("base:1", "c1")
+    # Layered images are charged only for what they add to their donor.
+    assert image_pool._load(image_pool._pool_path())["images"]["base:2"]["size_bytes"] == 300
+    assert image_pool.warm_donor("other") is None
+
+
+def test_evict_removes_idle_images_oldest_first(docker, monkeypatch):
+    for tag, commit in (("base:1", "c1"), ("base:3", "c3"), ("base:2", "c2")):
+        image_pool.register(tag, tag, "o/r", commit)
+    later = time.time() + image_pool.IN_USE_SECONDS + 1
+    monkeypatch.setattr(image_pool.time, "time", lambda: later)
+    assert image_pool.evict(budget_bytes=1400, keep="base:1") == ["base:3", "base:2"]
+    assert ["rmi", "base:3", image_pool.warm_tag("base:3")] in docker.calls
+    assert image_pool.warm_donor("base:1")["tag"] == "base:1"
+    assert image_pool.warm_donor("base:3") is None
+
+
+def test_recently_used_images_are_not_evicted(docker):
+    image_pool.register("base:1", "k", "o/r", "c1")
+    assert image_pool.evict(budget_bytes=0) == []
+    assert "base:1" in docker.images
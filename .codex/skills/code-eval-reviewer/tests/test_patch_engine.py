@@ -0,0 +1,82 @@
+import subprocess
+
+import patch_engine
+
+EDIT = b"""\
+--- a/app.py
++++ b/app.py
+@@ -1,3 +1,3 @@
+ def main():
+-    return 1
++    return 2
+
+"""
+
+
+def write(root, files):
+    for name, content in files.items():
+        (root / name).write_bytes(content)
+    return root
+
+
+def test_hunks_apply_at_an_offset_into_the_overlay(tmp_path):
+    write(tmp_path, {"app.py": b"import os\n\ndef main():\n    return 1\n\n"})
+    overlay = {}
+    result = patch_engine.apply_to_overlay(EDIT, tmp_path, overlay)
+    assert result["ok"] and result["hunks"][0]["offset"] == 2
+    assert overlay == {"app.py": b"import os\n\ndef main():\n    return 2\n\n"}
+    assert (tmp_path / "app.py").read_bytes() == b"import os\n\ndef main():\n    return 1\n\n"
+
+
+def test_a_failing_hunk_leaves_the_overlay_alone(tmp_path):
+    write(tmp_path, {"app.py": b"def main():\n    return 3\n\n"})
+    overlay = {}
+    result = patch_engine.apply_to_overlay(EDIT, tmp_path, overlay)
+    assert not result["ok"]
+    assert result["errors"] == ["app.py: @@ -1,3 +1,3 @@: context does not match"]
+    assert patch_engine.failed_hunks(result) == result["hunks"]
+    assert overlay == {}
+
+
+def test_crlf_files_keep_their_line_endings(tmp_path):
+    write(tmp_path, {"app.py": b"def main():\r\n    return 1\r\n\r\n"})
+    overlay = {}
+    assert patch_engine.apply_to_overlay(EDIT, tmp_path, overlay)["ok"]
+    assert overlay["app.py"] == b"def main():\r\n    return 2\r\n\r\n"
+
+
+def test_added_deleted_and_renamed_files(tmp_path):
+    write(tmp_path, {"old.txt": b"gone\n", "a.py": b"x = 1\n"})
+    patch = (
+        b"diff --git a/new.txt b/new.txt\nnew file mode 100644\n--- /dev/null\n+++ b/new.txt\n@@ -0,0 +1 @@\n+hello\n"
+        b"diff --git a/old.txt b/old.txt\ndeleted file mode 100644\n--- a/old.txt\n+++ /dev/null\n@@ -1 +0,0 @@\n-gone\n"
+        b"diff --git a/a.py b/b.py\nsimilarity index 100%\nrename from a.py\nrename to b.py\n"
+    )
+    overlay = {}
+    assert patch_engine.apply_to_overlay(patch, tmp_path, overlay)["ok"]
+    patch_engine.write_overlay(overlay, tmp_path)
+    assert sorted(p.name for p in tmp_path.iterdir()) == ["b.py", "new.txt"]
+    assert (tmp_path / "new.txt").read_bytes() == b"hello\n"
+
+
+def test_apply_patch_with_git_and_crlf_retry(tmp_path):
+    repo = tmp_path / "repo"
+    repo.mkdir()
+    write(repo, {"app.py": b"def main():\n    return 1\n\n"})
+    subprocess.run(["git", "init", "-q", str(repo)], check=True)
+    subprocess.run(["git", "-C", str(repo), "add", "."], check=True)
+    patch = tmp_path / "solution.patch"
+    patch.write_bytes(EDIT.replace(b"\n", b"\r\n"))
+    result = patch_engine.apply_patch(patch, repo)
+    assert (result["ok"], result["method"], result["normalized_crlf"]) == (True, "git", True)
+    assert (repo / "app.py").read_bytes() == b"def main():\n    return 2\n\n"
+    assert patch.read_bytes() == EDIT.replace(b"\n", b"\r\n")
+
+
+def test_apply_patch_without_git_uses_the_python_applier(tmp_path):
+    write(tmp_path, {"app.py": b"def main():\n    return 1\n\n"})
+    patch = tmp_path / "solution.patch"
+    patch.write_bytes(EDIT)
+    result = patch_engine.apply_patch(patch, tmp_path)
+    assert (result["ok"], result["method"]) == (True, "python")
+    assert (tmp_path / "app.py").read_bytes() == b"def main():\n    return 2\n\n"
@@ -0,0 +1,67 @@
+from patch_model import parse_patch
+
+PATCH = """\
+From 1234 Mon Sep 17 00:00:00 2001
+Subject: [PATCH] change things
+
+diff --git a/src/app.py b/src/app.py
+index 1111111..2222222 100644
+--- a/src/app.py
++++ b/src/app.py
+@@ -1,3 +1,3 @@
+ import os
+--- a SQL comment that was removed
++++ a SQL comment that was added
+ print(os.name)
+diff --git a/tests/test_app.py b/tests/test_app.py
+new file mode 100644
+--- /dev/null
++++ b/tests/test_app.py
+@@ -0,0 +1,2 @@
++def test_app():
++    assert True
+\\ No newline at end of file
+diff --git a/old.txt b/old.txt
+deleted file mode 100644
+--- a/old.txt
++++ /dev/null
+@@ -1 +0,0 @@
+-gone
+diff --git a/a.py b/b.py
+similarity index 100%
+rename from a.py
+rename to b.py
+"""
+
+
+def test_files_statuses_and_counts():
+    model = parse_patch(PATCH)
+    assert [(f["path"], f["status"], f["added"], f["removed"]) for f in model["files"]] == [
+        ("src/app.py", "modified", 1, 1),
+        ("tests/test_app.py", "added", 2, 0),
+        ("old.txt", "deleted", 0, 1),
+        ("b.py", "renamed", 0, 0),
+    ]
+    assert (model["added"], model["removed"]) == (3, 2)
+    assert model["files"][0]["hunks"][0]["old_start"] == 1
+    assert "lines" not in model["files"][0]["hunks"][0]
+
+
+def test_hunk_lines_go_to_the_visitor_and_the_rest_to_on_header():
+    seen = []
+    headers = []
+    parse_patch(PATCH, on_hunk=lambda f, h: seen.append((f["new_path"], h["lines"])), on_header=headers.append)
+    assert seen[0] == ("src/app.py", [(" ", "import os"), ("-", "-- a SQL comment that was removed"), ("+", "++ a SQL comment that was added"), (" ", "print(os.name)")])
+    assert headers[1] == "Subject: [PATCH] change things"
+    assert not any(line.startswith("+def") for line in headers)
+
+
+def test_path_and_crlf_sources_parse_the_same(tmp_path):
+    path = tmp_path / "change.patch"
+    path.write_bytes(PATCH.replace("\n", "\r\n").encode("utf-8"))
+    assert parse_patch(path) == parse_patch(PATCH)
+
+
+def test_plain_unified_diff_without_git_headers():
+    model = parse_patch("--- a.txt\n+++ a.txt\n@@ -1 +1,2 @@\n one\n+two\n--- b.txt\n+++ b.txt\n@@ -1 +1 @@\n-x\n+y\n")
+    assert [(f["path"], f["added"], f["removed"]) for f in model["files"]] == [("a.txt", 1, 0), ("b.txt", 1, 1)]
@@ -0,0 +1,53 @@
+import threading
+
+import pytest
+
+from phase_scheduler import run_phases
+
+
+def test_steps_wait_for_their_dependencies():
+    order = []
+    steps = {
+        "build": (lambda: order.append("build"), []),
+        "tree": (lambda: order.append("tree"), []),
+        "layer": (lambda: order.append("layer"), ["build", "tree"]),
+        "run": (lambda: order.append("run") or 7, ["layer"]),
+    }
+    outcomes = run_phases(steps, max_workers=2)
+    assert order.index("layer") > max(order.index("build"), order.index("tree"))
+    assert order[-1] == "run"
+    assert outcomes["run"]["value"] == 7
+    assert all(o["ok"] and o["seconds"] is not None for o in outcomes.values())
+
+
+def test_independent_steps_run_concurrently():
+    barrier = threading.Barrier(2, timeout=5)
+    outcomes = run_phases({"a": (barrier.wait, []), "b": (barrier.wait, [])}, max_workers=2)
+    assert outcomes["a"]["ok"] and outcomes["b"]["ok"]
+
+
+def test_failures_skip_dependents_and_timeouts_are_marked():
+    def fail():
+        raise RuntimeError("Docker build failed")
+
+    def slow():
+        raise TimeoutError("./test.sh new timed out")
+
+    outcomes = run_phases({
+        "build": (fail, []),
+        "run": (lambda: None, ["build"]),
+        "report": (lambda: None, ["run"]),
+        "other": (slow, []),
+    })
+    assert outcomes["build"] == {"ok": False, "error": "Docker build failed", "timed_out": False, "seconds": outcomes["build"]["seconds"]}
+    assert outcomes["run"] == {"ok": False, "skipped": True, "error": "dependency failed"}
+    assert outcomes["report"]["skipped"]
+    assert outcomes["other"]["timed_out"]
+
+
+def test_unknown_dependencies_and_cycles():
+    with pytest.raises(ValueError, match="unknown phases: missing"):
+        run_phases({"a": (lambda: None, ["missing"])})
+    outcomes = run_phases({"a": (lambda: None, ["b"]), "b": (lambda: None, ["a"]), "c": (lambda: None, [])})
+    assert outcomes["a"]["error"] == outcomes["b"]["error"] == "dependency cycle"
+    assert outcomes["c"]["ok"]
@@ -0,0 +1,35 @@
+import result_cache
+
+
+def test_cache_key_separates_parts():
+    assert result_cache.cache_key("ab", "c") != result_cache.cache_key("a", "bc")
+    assert result_cache.cache_key(b"x", 1) == result_cache.cache_key("x", "1")
+
+
+def test_put_get_and_ttl(monkeypatch):
+    key = result_cache.cache_key("problem")
+    assert result_cache.get("analyze_problem", key) is None
+    result_cache.put("analyze_problem", key, {"issues": ["vague"]})
+    assert result_cache.get("analyze_problem", key) == {"issues": ["vague"]}
+    now = result_cache.time.time()
+    monkeypatch.setattr(result_cache.time, "time", lambda: now + 120)
+    assert result_cache.get("analyze_problem", key, ttl=60) is None
+    assert result_cache.get("analyze_problem", key, ttl=600) == {"issues": ["vague"]}
+
+
+def test_corrupt_entries_are_misses():
+    key = result_cache.cache_key("docker")
+    path = result_cache.entry_path("docker", key)
+    path.parent.mkdir(parents=True)
+    path.write_text("{truncated")
+    assert result_cache.get("docker", key) is None
+
+
+def test_stats_count_entries_and_session_counters(monkeypatch):
+    monkeypatch.setattr(result_cache, "_session", {})
+    result_cache.put("github", result_cache.cache_key("repos/o/r"), {"body": {}})
+    result_cache.get("github", result_cache.cache_key("repos/o/r"))
+    result_cache.get("github", result_cache.cache_key("repos/o/missing"))
+    report = result_cache.stats()["github"]
+    assert (report["entries"], report["hits"], report["misses"], report["stores"]) == (1, 1, 1, 1)
+    assert result_cache.format_stats({"github": report})[1].startswith("- github: hits=1 misses=1 stores=1 entries=1")
@@ -0,0 +1,97 @@
+import threading
+from http.server import ThreadingHTTPServer
+
+import pytest
+
+import daemon_client
+import review_daemon
+
+
+def queue_with(*jobs, workers=1):
+    queue = review_daemon.new_queue(workers)
+    submitted = [review_daemon.submit(queue, {"problem_dir": f"/p/{name}", "repo_url": repo, "priority": priority}) for name, repo, priority in jobs]
+    return queue, submitted
+
+
+def test_pick_orders_by_priority_then_running_jobs_per_repo():
+    queue, (a1, a2, b1, urgent) = queue_with(("a1", "repo-a", 0), ("a2", "repo-a", 0), ("b1", "repo-b", 0), ("u", "repo-a", 5))
+    assert review_daemon.take(queue) is urgent
+    # repo-a already has a job running, so repo-b goes next despite submitting later.
+    assert review_daemon.take(queue) is b1
+    assert review_daemon.take(queue) is a1
+    assert a2["state"] == "queued"
+
+
+def test_pick_prefers_the_repo_that_least_recently_started():
+    queue, (c1, d1) = queue_with(("c1", "repo-c", 0), ("d1", "repo-d", 0))
+    queue["last_started"]["repo-c"] = 99
+    assert review_daemon.take(queue) is d1
+
+
+def test_status_reports_queue_position_and_hides_the_spec():
+    queue, (low, high) = queue_with(("low", "r", 0), ("high", "r", 1))
+    assert review_daemon.job_status(queue, low)["position"] == 2
+    status = review_daemon.job_status(queue, high)
+    assert status["position"] == 1
+    assert "spec" not in status and "seq" not in status
+
+
+def test_finished_jobs_are_trimmed(monkeypatch):
+    monkeypatch.setattr(review_daemon, "JOBS_KEPT", 2)
+    queue, jobs = queue_with(*[(str(n), "r", 0) for n in range(4)])
+    for _ in jobs:
+        review_daemon.finish(queue, review_daemon.take(queue), state="done")
+    assert sorted(queue["jobs"]) == sorted(j["id"] for j in jobs[2:])
+
+
+@pytest.fixture
+def daemon(tmp_path, monkeypatch):
+    def run_job(spec):
+        if spec.get("fail"):
+            raise RuntimeError("review crashed")
+        return {"output": "feedback.md", "json_output": None, "decision": "Approve", "quality_score": 6, "text": "ok", "result": {}}
+
+    monkeypatch.setattr(review_daemon, "run_job", run_job)
+    server = review_daemon.bind_socket(tmp_path / "d.sock")
+    server.token = None
+    server.queue = review_daemon.new_queue(1)
+    threading.Thread(target=review_daemon.worker, args=(server.queue,), daemon=True).start()
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    yield str(tmp_path / "d.sock")
+    server.shutdown()
+    server.server_close()
+
+
+def test_jobs_run_through_the_socket(daemon, tmp_path):
+    assert daemon_client.find_daemon(daemon)[1]["workers"] == 1
+    job = daemon_client.submit(daemon, {"problem_dir": str(tmp_path), "repo_url": "r"})
+    assert daemon_client.wait(daemon, job["id"], timeout=10)["decision"] == "Approve"
+    status, result = daemon_client.request(daemon, "GET", f"/jobs/{job['id']}/result")
+    assert (status, result["text"]) == (200, "ok")
+
+    failed = daemon_client.submit(daemon, {"problem_dir": str(tmp_path), "repo_url": "r", "fail": True})
+    assert daemon_client.wait(daemon, failed["id"], timeout=10)["error"] == "RuntimeError: review crashed"
+    assert daemon_client.request(daemon, "GET", f"/jobs/{failed['id']}/result")[0] == 409
+    assert daemon_client.request(daemon, "GET", "/jobs/nope")[0] == 404
+
+
+def test_bad_submissions_are_rejected(daemon, tmp_path):
+    with pytest.raises(daemon_client.DaemonError) as err:
+        daemon_client.submit(daemon, {"problem_dir": str(tmp_path / "missing")})
+    assert err.value.status == 400
+
+
+def test_tcp_requests_need_the_token():
+    server = ThreadingHTTPServer(("127.0.0.1", 0), review_daemon.Handler)
+    port = server.server_address[1]
+    server.token = review_daemon.write_token(daemon_client.token_path(port))
+    server.queue = review_daemon.new_queue(1)
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    try:
+        address = f"http://127.0.0.1:{port}"
+        assert daemon_client.health(address)["ok"]
+        daemon_client.token_path(port).unlink()
+        assert daemon_client.request(address, "GET", "/health")[0] == 401
+    finally:
+        server.shutdown()
+        server.server_close()
@@ -0,0 +1,52 @@
+import subprocess
+
+import review_problem
+
+SUBMISSION = {"has_test_patch": True, "has_solution_patch": True}
+ENOUGH = {"added": review_problem.MIN_SOLUTION_LOC}
+
+
+def test_only_hard_requirements_exit_early():
+    soft = {"reject_reasons": ["Potential matching PR found by keyword search"], "hard_failures": []}
+    assert review_problem.early_exit_reasons(SUBMISSION, soft, ENOUGH) == []
+    hard = {"reject_reasons": ["Repository has fewer than 500 stars"], "hard_failures": ["Repository has fewer than 500 stars"]}
+    assert review_problem.early_exit_reasons(SUBMISSION, hard, ENOUGH) == ["hard requirement failed (Repository has fewer than 500 stars)"]
+
+
+def test_unavailable_lookup_does_not_exit_early(github):
+    github.responses.extend([OSError("unreachable")] * 4)
+    unavailable = review_problem.validate_repo("https://github.com/o/r", "")
+    assert unavailable["unavailable"] and not unavailable["hard_failures"]
+    assert review_problem.early_exit_reasons(SUBMISSION, unavailable, ENOUGH) == []
+
+
+def test_short_solution_and_missing_patches_exit_early():
+    reasons = review_problem.early_exit_reasons({"has_test_patch": False, "has_solution_patch": True}, {}, {"added": 3})
+    assert reasons == ["required patch files are missing", f"solution adds 3 lines, below the {review_problem.MIN_SOLUTION_LOC} LOC minimum"]
+
+
+def test_test_dirs_include_directories_added_by_the_test_patch(tmp_path, monkeypatch):
+    repo = tmp_path / "clone" / "repo"
+    (repo / "src").mkdir(parents=True)
+    (repo / "src" / "app.py").write_text("x = 1\n")
+    subprocess.run(["git", "init", "-q", str(repo)], check=True)
+    problem = tmp_path / "problem"
+    problem.mkdir()
+    (problem / "Dockerfile").write_text("FROM python:3.11\nCOPY . /app\n")
+    (problem / "test.patch").write_text(
+        "diff --git a/spec/test_app.py b/spec/test_app.py\nnew file mode 100644\n"
+        "--- /dev/null\n+++ b/spec/test_app.py\n@@ -0,0 +1 @@\n+assert True\n"
+    )
+    monkeypatch.setattr(review_problem.image_cache, "ensure_base_image", lambda *args: ("base:1", "built", ""))
+    monkeypatch.setattr(review_problem.image_cache, "build_variant", lambda *args: (0, "", True))
+    monkeypatch.setattr(review_problem.image_cache, "remove_images", lambda images: None)
+    monkeypatch.setattr(review_problem, "run_test_script", lambda *args, **kwargs: {
+        "exit_code": 1, "timed_out": False, "log_path": "", "total_bytes": 0, "output": "", "truncated": False, "queued": 0,
+    })
+    results = {"logs": {}, "test_summaries": {}, "test_outcomes": {}, "exit_codes": {}, "patches": {}, "worktrees": {}}
+    review_problem.verify_checkout(
+        repo, repo.parent, problem / "Dockerfile", problem / "test.patch", None, "https://github.com/o/r", "abc", results, {}, {},
+    )
+    assert results["patches"]["test.patch"]["ok"]
+    assert results["test_dirs"] == ["spec"]
+    assert not (repo / "spec").exists()
@@ -0,0 +1,47 @@
+import json
+
+import pytest
+
+import review_problem
+import review_schema
+
+
+def test_validate_reports_paths():
+    schema = {
+        "type": "object",
+        "required": ["name", "count"],
+        "properties": {
+            "name": {"type": ["string", "null"]},
+            "count": {"type": "integer", "minimum": 0},
+            "kind": {"enum": ["a", "b"]},
+            "tags": {"type": "array", "items": {"type": "string"}},
+        },
+    }
+    assert review_schema.validate({"name": None, "count": 2, "kind": "a", "tags": ["x"]}, schema) == []
+    assert review_schema.validate({"count": -1, "kind": "c", "tags": ["x", 3]}, schema) == [
+        "$: missing name",
+        "$.count: below 0",
+        "$.kind: 'c' is not one of ['a', 'b']",
+        "$.tags[1]: expected string",
+    ]
+
+
+def test_booleans_are_not_numbers():
+    assert review_schema.validate(True, {"type": "integer"}) == ["$: expected integer"]
+    assert review_schema.validate(1.5, {"type": "number"}) == []
+
+
+def test_a_real_review_matches_the_schema(tmp_path):
+    problem = tmp_path / "problem"
+    problem.mkdir()
+    (problem / "Problem-Description.txt").write_text("Add a --retries flag to the download command.\n")
+    submission = review_problem.load_submission(problem)
+    review = review_problem.review_submission(submission, skip_docker=True, index_path=tmp_path / "index.sqlite")
+    result = json.loads(review_schema.dumps(review["result"]))
+    assert result["schema_version"] == review_schema.SCHEMA_VERSION
+    assert result["decision"] == "Reject"
+
+
+def test_dumps_refuses_a_result_that_does_not_match():
+    with pytest.raises(ValueError, match="does not match schema version"):
+        review_schema.dumps({"schema_version": review_schema.SCHEMA_VERSION})
@@ -0,0 +1,40 @@
+import review_state
+
+INPUTS = {name: f"hash-{name}" for name in review_state.BUNDLE_INPUTS}
+
+
+def previous_review(**stages):
+    return {"inputs": dict(INPUTS), "stages": {stage: {"options": options, "value": {"stage": stage}} for stage, options in stages.items()}}
+
+
+def test_hash_files_follows_content(tmp_path):
+    a, b = tmp_path / "a", tmp_path / "b"
+    a.write_text("one")
+    b.write_text("two")
+    assert review_state.hash_files() is None
+    assert review_state.hash_files(a, None) == review_state.hash_files(a)
+    assert review_state.hash_files(a, b) != review_state.hash_files(b, a)
+
+
+def test_save_and_load_per_directory(tmp_path):
+    review_state.save(tmp_path / "p1", {"inputs": INPUTS})
+    assert review_state.load(tmp_path / "p1") == {"inputs": INPUTS}
+    assert review_state.load(tmp_path / "p2") is None
+
+
+def test_only_stages_reading_a_changed_input_go_stale():
+    previous = previous_review(**{"similarity": None, "docker:base_only": "opts", "docker:new_with_solution": "opts"})
+    inputs = dict(INPUTS, **{"solution.patch": "edited"})
+    assert review_state.changed_inputs(previous, inputs) == ["solution.patch"]
+    assert review_state.stale_stages(previous, inputs) == {"docker:base_with_solution", "docker:new_with_solution"}
+    assert review_state.reusable(previous, inputs, "docker:base_only", "opts") == {"stage": "docker:base_only"}
+    assert review_state.reusable(previous, inputs, "docker:new_with_solution", "opts") is None
+    assert sorted(review_state.carry_over(previous, inputs)) == ["docker:base_only", "similarity"]
+
+
+def test_changed_options_or_no_previous_review_reuse_nothing():
+    previous = previous_review(**{"docker:base_only": {"cpus": "2"}})
+    assert review_state.reusable(previous, INPUTS, "docker:base_only", {"cpus": "4"}) is None
+    assert review_state.reusable(None, INPUTS, "docker:base_only", {"cpus": "2"}) is None
+    assert review_state.stale_stages(None, INPUTS) == set(review_state.STAGE_INPUTS)
+    assert review_state.carry_over(None, INPUTS) == {}
@@ -0,0 +1,33 @@
+import runner_summary
+
+
+def summarize(text):
+    summary = runner_summary.new_summary()
+    runner_summary.feed_text(summary, text)
+    return summary
+
+
+def test_pytest_summary_lines():
+    assert summarize("\x1b[31m===== 1 failed, 10 passed, 2 skipped, 1 error, 3 warnings in 0.52s =====\x1b[0m\n") == {
+        "runners": ["pytest"], "passed": 10, "failed": 1, "skipped": 2, "errors": 1,
+    }
+    assert summarize("4 passed, 1 xfailed, 1 xpassed in 1.20s\n")["passed"] == 5
+
+
+def test_go_counts_top_level_results_only():
+    summary = summarize("--- PASS: TestA (0.00s)\n--- FAIL: TestB (0.01s)\n    --- PASS: TestB/sub (0.00s)\n--- SKIP: TestC (0.00s)\n")
+    assert (summary["passed"], summary["failed"], summary["skipped"]) == (1, 1, 1)
+
+
+def test_cargo_and_jest_summaries_add_up():
+    summary = summarize(
+        "test result: FAILED. 5 passed; 1 failed; 2 ignored; 0 measured; 0 filtered out\n"
+        "Tests:       1 failed, 2 skipped, 1 todo, 10 passed, 14 total\n"
+    )
+    assert summary == {"runners": ["cargo test", "jest"], "passed": 15, "failed": 2, "skipped": 5, "errors": 0}
+    assert runner_summary.format_summary(summary) == "cargo test+jest: 15 passed, 2 failed, 5 skipped, 0 errors"
+
+
+def test_unrelated_output_is_ignored():
+    assert summarize("Downloaded 3 crates in 2.5s\nchecked 12 files in 0.4s\n")["runners"] == []
+    assert runner_summary.format_summary(runner_summary.new_summary()) is None
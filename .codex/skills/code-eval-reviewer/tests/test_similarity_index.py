@@ -0,0 +1,70 @@
+import threading
+from contextlib import closing
+
+import similarity_index
+
+PARSER = (
+    "Add a streaming CSV parser that reads quoted fields spanning several lines, reports the line "
+    "number of malformed rows, and exposes parse_rows(reader) returning dictionaries keyed by header."
+)
+PARSER_REWORDED = PARSER.replace("Add a streaming", "Implement a streaming")
+SCHEDULER = (
+    "Teach the cron scheduler to skip jobs whose previous run is still active, record skipped runs in "
+    "the job history table, and expose next_fire_time(job) for the dashboard."
+)
+
+
+def test_screen_finds_near_duplicates_and_records_the_problem(tmp_path):
+    with closing(similarity_index.open_index(tmp_path / "index.sqlite")) as conn:
+        assert similarity_index.screen(conn, "a", PARSER) == ([], {})
+        matches, checked = similarity_index.screen(conn, "b", PARSER_REWORDED)
+        assert [m["label"] for m in matches] == ["a"]
+        assert max(matches[0]["metrics"].values()) >= similarity_index.SIMILARITY_THRESHOLD
+        assert set(checked) == {"a"}
+        # Unrelated text does not share enough buckets to reach the exact re-check.
+        assert similarity_index.screen(conn, "c", SCHEDULER)[0] == []
+        # A problem re-screened under its own label does not match itself.
+        assert [m["label"] for m in similarity_index.screen(conn, "a", PARSER)[0]] == ["b"]
+
+
+def test_known_candidates_reuse_their_metrics_until_reindexed(tmp_path):
+    with closing(similarity_index.open_index(tmp_path / "index.sqlite")) as conn:
+        similarity_index.screen(conn, "a", PARSER)
+        _, checked = similarity_index.screen(conn, "b", PARSER_REWORDED)
+        fake = {"behavioural": 99.0, "implementation": 99.0, "requirement": 99.0}
+        known = {"a": dict(checked["a"], metrics=fake)}
+        matches, _ = similarity_index.screen(conn, "b", PARSER_REWORDED, known=known)
+        assert matches[0]["metrics"] == fake
+        similarity_index.screen(conn, "a", PARSER)
+        matches, _ = similarity_index.screen(conn, "b", PARSER_REWORDED, known=known)
+        assert matches[0]["metrics"] != fake
+
+
+def test_concurrent_screens_of_duplicates_catch_each_other(tmp_path):
+    path = tmp_path / "index.sqlite"
+    similarity_index.open_index(path).close()
+    barrier = threading.Barrier(4)
+    found = {}
+
+    def review(label):
+        with closing(similarity_index.open_index(path)) as conn:
+            barrier.wait()
+            found[label] = similarity_index.screen(conn, label, PARSER)[0]
+
+    threads = [threading.Thread(target=review, args=(f"p{n}",)) for n in range(4)]
+    for t in threads:
+        t.start()
+    for t in threads:
+        t.join()
+    # Screens are serialized: every problem but the first sees at least one earlier one.
+    assert sorted(len(m) for m in found.values()) == [0, 1, 2, 3]
+
+
+def test_index_from_another_signature_scheme_is_rebuilt(tmp_path):
+    path = tmp_path / "index.sqlite"
+    with closing(similarity_index.open_index(path)) as conn:
+        similarity_index.screen(conn, "a", PARSER)
+        with conn:
+            conn.execute("UPDATE meta SET value = 'minhash-old' WHERE key = 'scheme'")
+    with closing(similarity_index.open_index(path)) as conn:
+        assert conn.execute("SELECT COUNT(*) FROM problems").fetchone() == (0,)
@@ -0,0 +1,58 @@
+import json
+import random
+import sys
+
+import pytest
+
+import similarity_sweep
+from text_engine import SIMILARITY_VIEWS, profile_similarity
+
+
+def random_profiles(count, seed=7):
+    rng = random.Random(seed)
+    vocab = [f"w{n}" for n in range(40)]
+    profiles = []
+    for _ in range(count):
+        # A few shared themes make near-duplicates common enough to exercise the pruning.
+        theme = rng.randrange(4)
+        words = vocab[theme * 8:theme * 8 + 12]
+        profiles.append({key: frozenset(rng.sample(words, rng.randint(0, 10)) + rng.sample(vocab, 2)) for key in SIMILARITY_VIEWS.values()})
+    return profiles
+
+
+def brute_force(profiles, threshold):
+    return [
+        (j, i)
+        for i in range(len(profiles))
+        for j in range(i)
+        if any(value >= threshold - 1e-9 for value in profile_similarity(profiles[j], profiles[i]).values())
+    ]
+
+
+@pytest.mark.parametrize("threshold", [25.0, 60.0, 100.0])
+def test_matches_the_brute_force_join(threshold):
+    profiles = random_profiles(120)
+    profiles += [dict(profiles[n]) for n in (3, 50, 99)]
+    stats = {"candidates": 0}
+    pairs = list(similarity_sweep.similar_pairs(profiles, threshold, stats))
+    assert [(j, i) for j, i, _ in pairs] == brute_force(profiles, threshold)
+    assert stats["candidates"] < len(profiles) * (len(profiles) - 1) // 2
+    for j, i, metrics in pairs:
+        assert metrics == profile_similarity(profiles[j], profiles[i])
+
+
+def test_empty_profiles_never_match():
+    empty = {key: frozenset() for key in SIMILARITY_VIEWS.values()}
+    assert list(similarity_sweep.similar_pairs([empty, empty], 60.0, {"candidates": 0})) == []
+
+
+def test_cli_writes_ndjson(tmp_path, monkeypatch):
+    text = "The export command must accept a --format flag with csv and json values and reject others."
+    for name, desc in (("p1", text), ("p2", text + " It prints the file path."), ("p3", "Unrelated: speed up the tokenizer cache.")):
+        (tmp_path / name).mkdir()
+        (tmp_path / name / "Problem-Description.txt").write_text(desc)
+    out = tmp_path / "pairs.ndjson"
+    monkeypatch.setattr(sys, "argv", ["similarity_sweep.py", str(tmp_path), "--output", str(out)])
+    similarity_sweep.main()
+    records = [json.loads(line) for line in out.read_text().splitlines()]
+    assert [(r["a"].rsplit("/", 1)[1], r["b"].rsplit("/", 1)[1]) for r in records] == [("p1", "p2")]
@@ -0,0 +1,70 @@
+import test_results
+
+
+def feed(*blocks):
+    run = test_results.new_run()
+    for block in blocks:
+        test_results.feed_text(run, block)
+    return run["tests"]
+
+
+def test_pytest_lines_keep_the_worst_outcome():
+    tests = feed(
+        "tests/test_a.py::test_one PASSED [ 50%]\n\x1b[31mtests/test_a.py::test_two FAILED\x1b[0m [100%]\n",
+        "ERROR tests/test_a.py::test_one - RuntimeError: teardown\nRERUN tests/test_a.py::test_two\n",
+    )
+    assert tests == {"tests/test_a.py::test_one": "error", "tests/test_a.py::test_two": "failed"}
+
+
+def test_go_tests_are_qualified_by_package():
+    tests = feed("=== RUN   TestParse\n--- PASS: TestParse (0.00s)\n    --- FAIL: TestParse/empty (0.00s)\nFAIL\tgithub.com/o/r/parser\t0.01s\n")
+    assert tests == {"github.com/o/r/parser::TestParse": "passed", "github.com/o/r/parser::TestParse/empty": "failed"}
+
+
+def test_cargo_tests_are_qualified_by_binary():
+    tests = feed(
+        "     Running unittests src/lib.rs (target/debug/deps/demo-0123456789abcdef)\ntest parse::works ... ok\n",
+        "   Doc-tests demo\ntest src/lib.rs - add (line 3) ... ignored\n",
+    )
+    assert tests == {
+        "src/lib.rs (target/debug/deps/demo)::parse::works": "passed",
+        "doc demo::src/lib.rs - add (line 3)": "skipped",
+    }
+
+
+def test_jest_tests_are_qualified_by_file_and_describe():
+    tests = feed("PASS src/sum.test.js\n  sum\n    adds\n      ✓ two numbers (3 ms)\n    ✕ rejects strings\n")
+    assert tests == {"src/sum.test.js › sum › adds › two numbers": "passed", "src/sum.test.js › sum › rejects strings": "failed"}
+
+
+def test_junit_xml_split_across_blocks():
+    tests = feed(
+        '<testsuite><testcase classname="pkg.A" name="ok"/><testcase classname="pkg.A" name="bad">',
+        '<failure message="x"/></testcase><testcase name="&lt;skip&gt;"><skipped/></testcase></testsuite>\n',
+    )
+    assert tests == {"pkg.A::ok": "passed", "pkg.A::bad": "failed", "<skip>": "skipped"}
+
+
+def test_differential_cells():
+    before = {"a": "failed", "b": "passed", "c": "passed", "d": "failed", "e": "skipped"}
+    after = {"a": "passed", "b": "failed", "c": "passed", "d": "error", "e": "passed"}
+    cells = test_results.differential({"new_without_solution": before, "new_with_solution": after})["new"]
+    assert {c: cells[c] for c in test_results.CATEGORIES} == {
+        "fail_to_pass": ["a"], "pass_to_fail": ["b"], "always_fail": ["d"], "always_pass": ["c"], "not_run": ["e"],
+    }
+
+
+def test_tests_missing_from_a_failed_run_count_as_failing():
+    phases = {"new_without_solution": {}, "new_with_solution": {"t::new": "passed"}, "base_only": {"t::old": "passed"}}
+    matrix = test_results.differential(phases, {"new_without_solution": 2})
+    assert matrix["new"]["fail_to_pass"] == ["t::new"]
+    assert "base" not in matrix
+    assert test_results.differential(phases, {"new_without_solution": 0})["new"]["not_run"] == ["t::new"]
+
+
+def test_stability_flags_tests_that_both_pass_and_fail():
+    runs = [{"exit_code": 0, "tests": {"a": "passed", "b": "passed"}}, {"exit_code": 1, "tests": {"a": "passed", "b": "failed"}}]
+    report = test_results.stability(runs)
+    assert report["unstable"] == ["b"]
+    assert report["tests"]["b"] == {"runs": 2, "pass_rate": 0.5}
+    assert not report["exit_stable"]
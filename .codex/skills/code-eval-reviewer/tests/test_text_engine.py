@@ -0,0 +1,36 @@
+import text_engine
+
+
+def test_tokenize_drops_stop_words_and_short_tokens():
+    assert text_engine.tokenize("The parser MUST reject an empty_input at EOF.") == ["parser", "reject", "empty_input", "eof"]
+
+
+def test_count_words_ignores_code_and_markup():
+    assert text_engine.count_words("# Title\n- one `two three`\n```\nfour five\n```\nsix") == 3
+
+
+def test_document_splits_requirements_and_contracts():
+    doc = text_engine.document("Intro text. The parser must reject empty input and must report the line. Nothing else")
+    assert doc["requirements"] == ("The parser must reject empty input and must report the line",)
+    assert doc["contracts"] == ("The parser must reject empty input", "must report the line")
+
+
+def test_document_flags():
+    flags = text_engine.document("## Steps\nSee the TODO list; maybe rewrite the entire module.")["flags"]
+    assert flags["heading"] and flags["structured"] and flags["external_reference"] and flags["placeholder"]
+    assert flags["ambiguous_language"] and flags["scope_blowup"]
+    assert not text_engine.document("Fix the todo handling.")["flags"]["placeholder"]
+
+
+def test_identifier_tokens_weight_backticked_and_camel_case_names():
+    tokens = text_engine.identifier_tokens("Call `parse_file` then readHeader on it.")
+    assert tokens == ["parse_file", "call", "parse_file", "readheader", "readheader"]
+
+
+def test_profile_similarity_views():
+    a = text_engine.token_profile("The cache must evict stale entries.")
+    b = text_engine.token_profile("The cache must evict stale entries.")
+    c = text_engine.token_profile("Render the chart legend.")
+    assert text_engine.profile_similarity(a, b) == {"behavioural": 100.0, "implementation": 100.0, "requirement": 100.0}
+    assert text_engine.profile_similarity(a, c)["requirement"] == 0.0
+    assert text_engine.jaccard([], []) == 0.0
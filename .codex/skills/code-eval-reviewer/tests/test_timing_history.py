@@ -0,0 +1,41 @@
+import timing_history
+
+REPO = "https://github.com/o/r"
+
+
+def test_default_until_enough_samples():
+    timing_history.record(REPO, "build:layer", 100)
+    timing_history.record(REPO, "build:layer", 100)
+    assert timing_history.limit(REPO, "build:layer") == {"seconds": 600, "samples": 2, "learned": False}
+
+
+def test_learned_limit_is_clamped_p99():
+    for seconds in (10, 12, 40):
+        timing_history.record(REPO, "test:base_only", seconds)
+    assert timing_history.limit(REPO, "test:base_only")["seconds"] == 120
+    for seconds in (1, 1, 1):
+        timing_history.record(REPO, "clone", seconds)
+    assert timing_history.limit(REPO, "clone")["seconds"] == 60
+    for seconds in (2000, 2000, 2000):
+        timing_history.record(REPO, "fetch", seconds)
+    assert timing_history.limit(REPO, "fetch")["seconds"] == 3600
+
+
+def test_timeouts_double_the_limit_until_a_run_completes():
+    for seconds in (10, 10, 10):
+        timing_history.record(REPO, "test:base_only", seconds)
+    timing_history.record(REPO, "test:base_only", 60, timed_out=True)
+    timing_history.record(REPO, "test:base_only", 60, timed_out=True)
+    assert timing_history.limit(REPO, "test:base_only") == {"seconds": 240, "samples": 3, "learned": True}
+    for _ in range(10):
+        timing_history.record(REPO, "test:base_only", 60, timed_out=True)
+    assert timing_history.limit(REPO, "test:base_only")["seconds"] == 3600
+    timing_history.record(REPO, "test:base_only", 10)
+    assert timing_history.limit(REPO, "test:base_only")["seconds"] == 60
+
+
+def test_history_is_per_repo_and_bounded():
+    for seconds in range(timing_history.SAMPLES_KEPT + 10):
+        timing_history.record(REPO, "build:base", seconds)
+    assert timing_history.limit(REPO, "build:base")["samples"] == timing_history.SAMPLES_KEPT
+    assert timing_history.limit("https://github.com/o/other", "build:base")["samples"] == 0
@@ -0,0 +1,75 @@
+import json
+import threading
+
+import pytest
+
+import tracing
+
+
+@pytest.fixture(autouse=True)
+def stopped():
+    yield
+    tracing.stop()
+
+
+def test_spans_are_a_no_op_when_tracing_is_off():
+    with tracing.span("idle", "test") as info:
+        info["rc"] = 0
+    tracing.start()
+    assert tracing.stop() == []
+
+
+def test_span_records_fields_results_and_errors():
+    tracing.start()
+    with tracing.span("run", "docker", image="img") as info:
+        info["rc"] = 3
+    with pytest.raises(ValueError):
+        with tracing.span("boom", "docker"):
+            raise ValueError("bad")
+    ok, failed = tracing.stop()
+    assert (ok["name"], ok["cat"], ok["image"], ok["rc"]) == ("run", "docker", "img", 3)
+    assert ok["wall"] >= 0 and ok["peak_rss_kb"] > 0 and "error" not in ok
+    assert failed["error"] == "ValueError: bad"
+
+
+def test_traced_names_the_span_after_the_function():
+    @tracing.traced("analyzer")
+    def analyze(x):
+        return x + 1
+
+    tracing.start()
+    assert analyze(1) == 2
+    assert [e["name"] for e in tracing.stop()] == ["analyze"]
+
+
+def test_summary_totals_per_span_including_child_cpu():
+    events = [
+        {"name": "a", "cat": "c", "wall": 1.0, "cpu": 0.5},
+        {"name": "a", "cat": "c", "wall": 2.0, "cpu": 0.5, "child_cpu": 1.0},
+        {"name": "b", "cat": "c", "wall": 5.0, "cpu": 0.1},
+    ]
+    assert tracing.summarize(events) == {
+        "c:b": {"count": 1, "wall": 5.0, "cpu": 0.1},
+        "c:a": {"count": 2, "wall": 3.0, "cpu": 2.0},
+    }
+
+
+def test_trace_files(tmp_path):
+    def side():
+        with tracing.span("side", "phase"):
+            pass
+
+    tracing.start()
+    with tracing.span("main", "phase"):
+        worker = threading.Thread(target=side, name="worker")
+        worker.start()
+        worker.join()
+    events = tracing.stop()
+    tracing.write_trace(tmp_path / "trace.json", events, {"problem": "p1"})
+    trace = json.loads((tmp_path / "trace.json").read_text())
+    assert trace["version"] == tracing.TRACE_VERSION and trace["metadata"] == {"problem": "p1"}
+    assert [e["name"] for e in trace["events"]] == ["main", "side"]
+    tracing.write_chrome_trace(tmp_path / "chrome.json", events)
+    chrome = json.loads((tmp_path / "chrome.json").read_text())["traceEvents"]
+    assert [e["ph"] for e in chrome] == ["X", "X", "M", "M"]
+    assert {e["args"]["name"] for e in chrome if e["ph"] == "M"} == {"MainThread", "worker"}
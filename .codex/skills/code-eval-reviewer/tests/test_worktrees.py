@@ -0,0 +1,51 @@
+import subprocess
+
+import patch_engine
+import worktrees
+
+
+def git_repo(path, files):
+    path.mkdir()
+    for name, content in files.items():
+        (path / name).write_text(content)
+    subprocess.run(["git", "init", "-q", str(path)], check=True)
+    subprocess.run(["git", "-C", str(path), "add", "."], check=True)
+    subprocess.run(["git", "-C", str(path), "-c", "user.name=t", "-c", "user.email=t@t", "commit", "-qm", "base"], check=True)
+    return path
+
+
+def test_private_files_can_be_changed_without_touching_the_source(tmp_path):
+    src = git_repo(tmp_path / "base", {"app.py": "x = 1\n", "other.py": "y = 1\n"})
+    dest = tmp_path / "test"
+    assert worktrees.snapshot(src, dest, private=["app.py"]) in ("reflink", "hardlink", "copy")
+    with open(dest / "app.py", "a") as fh:
+        fh.write("x = 2\n")
+    assert (src / "app.py").read_text() == "x = 1\n"
+    assert (dest / "other.py").read_text() == "y = 1\n"
+
+
+def test_git_apply_index_accepts_a_snapshot(tmp_path):
+    src = git_repo(tmp_path / "base", {"app.py": "x = 1\n"})
+    patch = tmp_path / "test.patch"
+    patch.write_text("--- a/app.py\n+++ b/app.py\n@@ -1 +1 @@\n-x = 1\n+x = 2\n")
+    dest = tmp_path / "test"
+    worktrees.snapshot(src, dest, private=["app.py"])
+    result = patch_engine.apply_patch(patch, dest)
+    assert (result["ok"], result["method"]) == (True, "git")
+    assert (src / "app.py").read_text() == "x = 1\n"
+
+
+def test_ready_markers(tmp_path):
+    tree = tmp_path / "solution"
+    tree.mkdir()
+    assert worktrees.ready_record(tree) is None
+    worktrees.mark_ready(tree, {"ok": True})
+    assert worktrees.ready_record(tree) == {"ok": True}
+    tree.rmdir()
+    assert worktrees.ready_record(tree) is None
+
+
+def test_kept_roots_are_pruned_to_the_newest(cache_root):
+    roots = [worktrees.kept_root(f"chain{n}") for n in range(worktrees.KEPT_STATES + 2)]
+    kept = sorted(p.name for p in (cache_root / "worktrees").iterdir() if p.is_dir())
+    assert kept == sorted(p.name for p in roots[-worktrees.KEPT_STATES:])